@@ -0,0 +1,3 @@
+"""
+Замеры производительности (запускаются вручную, в тесты не входят)
+"""
@@ -0,0 +1,104 @@
+"""
+Сравнение синхронного SQLiteRepository и AsyncSQLiteRepository,
+вызываемых из цикла событий asyncio: N_QUERIES агрегирующих запросов
+с полным просмотром таблицы из N_ROWS расходов. Пока запросы
+выполняются, задача-пульс просыпается каждые TICK секунд и замеряет,
+насколько цикл событий опоздал ее разбудить (так же опаздывала бы
+перерисовка интерфейса). Синхронный репозиторий блокирует цикл событий
+на время каждого запроса, асинхронный выполняет запросы в потоках чтения.
+Общее время параллельных чтений зависит от числа ядер процессора.
+
+Запуск (из корневой папки проекта):
+    poetry run python -m benchmarks.bench_async_repository
+"""
+import asyncio
+import os
+import tempfile
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.async_repository import AsyncSQLiteRepository
+from bookkeeper.repository.filters import Contains
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+N_ROWS = 200_000
+N_QUERIES = 32
+TICK = 0.01
+
+
+def prepare_db(db_file: str) -> None:
+    """ Заполняет базу данных расходами """
+    with SQLiteRepository[Expense](db_file=db_file, cls=Expense) as repo:  # type: ignore
+        repo.add_many(Expense(i % 1000, i % 20, comment=f'comment {i}')
+                      for i in range(N_ROWS))
+
+
+def query(i: int) -> tuple[str, str, Contains]:
+    """ Параметры i-го запроса: сумма расходов с подстрокой в комментарии """
+    return 'sum', 'amount', Contains('comment', str(i))
+
+
+async def measure(queries: Callable[[], Awaitable[Any]]) -> tuple[float, float]:
+    """
+    Выполняет queries и возвращает общее время и наибольшую задержку
+    пульса цикла событий (в секундах)
+    """
+    stalls = [0.0]
+    done = asyncio.Event()
+
+    async def heartbeat() -> None:
+        while not done.is_set():
+            start = perf_counter()
+            await asyncio.sleep(TICK)
+            stalls.append(perf_counter() - start - TICK)
+
+    pulse = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0)
+    start = perf_counter()
+    await queries()
+    elapsed = perf_counter() - start
+    done.set()
+    await pulse
+    return elapsed, max(stalls)
+
+
+async def run_sync(db_file: str) -> tuple[float, float]:
+    """ Запросы синхронным репозиторием по очереди в цикле событий """
+    with SQLiteRepository[Expense](db_file=db_file, cls=Expense) as repo:  # type: ignore
+        async def queries() -> None:
+            for i in range(N_QUERIES):
+                repo.aggregate(*query(i))
+                await asyncio.sleep(0)
+        return await measure(queries)
+
+
+async def run_async(db_file: str, readers: int) -> tuple[float, float]:
+    """ Запросы асинхронным репозиторием конкурентно """
+    async with AsyncSQLiteRepository[Expense](  # type: ignore
+            db_file, Expense, readers) as repo:
+        await repo.get(1)
+
+        async def queries() -> None:
+            await asyncio.gather(*(repo.aggregate(*query(i))
+                                   for i in range(N_QUERIES)))
+        return await measure(queries)
+
+
+def main() -> None:
+    """ Точка входа """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'bench.db')
+        prepare_db(db_file)
+        print(f'{N_QUERIES} queries over {N_ROWS} rows (cpu count: {os.cpu_count()})')
+        elapsed, stall = asyncio.run(run_sync(db_file))
+        print(f'sync:            {elapsed:.3f} s, max event loop stall '
+              f'{stall * 1e3:.0f} ms')
+        for readers in (1, 2, 4, 8):
+            elapsed, stall = asyncio.run(run_async(db_file, readers))
+            print(f'async, {readers} readers: {elapsed:.3f} s, max event loop stall '
+                  f'{stall * 1e3:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
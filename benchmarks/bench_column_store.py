@@ -0,0 +1,71 @@
+"""
+Суммы трат за период по категориям и по дням в поколоночном хранилище
+ExpenseColumnStore (N_ROWS трат) и в MemoryRepository (N_MEMORY трат,
+перебор объектов). Нужен numpy.
+
+Запуск (из корневой папки проекта):
+    poetry run python -m benchmarks.bench_column_store
+"""
+from itertools import islice
+from time import perf_counter
+from typing import Any, Callable, Iterator
+
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.abstract_repository import AbstractRepository
+from bookkeeper.repository.column_store import ExpenseColumnStore
+from bookkeeper.repository.filters import Between
+from bookkeeper.repository.memory_repository import MemoryRepository
+
+N_ROWS = 10_000_000
+N_MEMORY = 1_000_000
+N_CATEGORIES = 20
+BATCH = 100_000
+REPEAT = 5
+MONTH = Between('expense_date', '2023-06-', '2023-07-')
+QUERIES: dict[str, Callable[[AbstractRepository[Any]], Any]] = {
+    'month by category': lambda repo: repo.sum('amount', MONTH, group_by='category'),
+    'year total': lambda repo: repo.sum('amount'),
+    'month by day': lambda repo: repo.sum('amount', MONTH, group_by='expense_date'),
+}
+
+
+def expenses(count: int) -> Iterator[Expense]:
+    """ Траты за 2023 год по N_CATEGORIES категориям """
+    for i in range(count):
+        yield Expense(i % 1000, i % N_CATEGORIES,
+                      expense_date=f'2023-{i % 12 + 1:02}-{i % 28 + 1:02}\t10:00')
+
+
+def fill(repo: AbstractRepository[Any], count: int) -> None:
+    """ Добавляет count трат пакетами по BATCH """
+    objs = expenses(count)
+    while batch := list(islice(objs, BATCH)):
+        repo.add_many(batch)
+
+
+def timed(query: Callable[[], Any]) -> tuple[float, Any]:
+    """ Среднее время запроса (в секундах) и его результат """
+    start = perf_counter()
+    for _ in range(REPEAT):
+        result = query()
+    return (perf_counter() - start) / REPEAT, result
+
+
+def run(name: str, repo: AbstractRepository[Any], count: int) -> None:
+    """ Заполняет репозиторий и печатает среднее время запросов QUERIES """
+    start = perf_counter()
+    fill(repo, count)
+    print(f'{name}: {count} rows added in {perf_counter() - start:.1f} s')
+    for query_name, query in QUERIES.items():
+        elapsed, _ = timed(lambda: query(repo))  # pylint: disable=cell-var-from-loop
+        print(f'  {query_name}: {elapsed * 1e3:.1f} ms')
+
+
+def main() -> None:
+    """ Точка входа """
+    run('ExpenseColumnStore', ExpenseColumnStore(), N_ROWS)
+    run('MemoryRepository', MemoryRepository(), N_MEMORY)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Прокрутка модели таблицы расходов по N_ROWS тратам в SQLite:
+время загрузки страниц (fetchMore) и обращения к строкам
+и объем памяти, занятой моделью.
+
+Запуск (из корневой папки проекта):
+    QT_QPA_PLATFORM=offscreen poetry run python -m benchmarks.bench_expenses_model
+"""
+# pylint: disable=no-name-in-module
+# pylint: disable=c-extension-no-member
+import os
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+from PySide6 import QtWidgets
+
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+from bookkeeper.view.expenses import ExpensesTableModel
+
+N_ROWS = 1_000_000
+PAGE_SIZE = 50
+
+
+def main() -> None:
+    """ Точка входа """
+    app = QtWidgets.QApplication([])  # noqa: F841 pylint: disable=unused-variable
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'bench.db')
+        with SQLiteRepository[Expense](db_file, Expense) as repo:  # type: ignore
+            repo.add_many(Expense(i % 1000, i % 20, comment=str(i),
+                                  expense_date=f'2023-{i % 12 + 1:02}-{i % 28 + 1:02}')
+                          for i in range(N_ROWS))
+
+            def pager(after: Expense | None) -> list[Expense]:
+                cursor = None if after is None else (after.expense_date, after.pk)
+                return repo.get_page('expense_date', PAGE_SIZE, cursor)[0]
+
+            model = ExpensesTableModel(str, lambda *args: None)
+            model.set_pager(pager)
+            tracemalloc.start()
+            model.set_expenses(pager(None))
+            start = perf_counter()
+            slowest = 0.0
+            while model.canFetchMore():
+                fetch_start = perf_counter()
+                model.fetchMore()
+                row = model.rowCount() - 1
+                for column in range(model.columnCount()):
+                    model.data(model.index(row, column))
+                slowest = max(slowest, perf_counter() - fetch_start)
+            total = perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    pages = N_ROWS // PAGE_SIZE
+    print(f'scrolled {model.rowCount()} rows in {pages} pages: {total:.2f} s')
+    print(f'page fetch: mean {total / pages * 1e3:.2f} ms, max {slowest * 1e3:.2f} ms')
+    print(f'peak traced memory: {peak / 2 ** 20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
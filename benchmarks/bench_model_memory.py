@@ -0,0 +1,71 @@
+"""
+Замер памяти (tracemalloc) на N_ROWS трат и категорий, прочитанных
+из SQLite методом get_all: байт на объект вместе со значениями полей
+и элементом списка - для моделей со __slots__ и для тех же моделей
+с __dict__ (прежнее представление).
+
+Запуск (из корневой папки проекта):
+    poetry run python -m benchmarks.bench_model_memory
+"""
+import gc
+import os
+import tempfile
+import tracemalloc
+from dataclasses import field, fields, make_dataclass
+from sys import getsizeof
+from typing import Any, Iterator
+
+from bookkeeper.models.category import Category
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+N_ROWS = 1_000_000
+
+
+def with_dict(model: type) -> type:
+    """ Вариант модели с __dict__ и теми же полями (имя таблицы то же) """
+    return make_dataclass(model.__name__,
+                          [(f.name, f.type, field(default=f.default))
+                           for f in fields(model)])
+
+
+def rows(model: type) -> Iterator[Any]:
+    """ Объекты модели для заполнения таблицы """
+    if model is Expense:
+        return (Expense(i % 1000, i % 20, comment=str(i)) for i in range(N_ROWS))
+    return (Category(f'category {i}', i // 10 or None) for i in range(N_ROWS))
+
+
+def measure(db_file: str, model: type) -> tuple[float, int]:
+    """
+    Возвращает байт на объект при чтении всех строк таблицы модели
+    и размер самого объекта (без значений полей)
+    """
+    with SQLiteRepository[Any](db_file, model) as repo:
+        gc.collect()
+        tracemalloc.start()
+        objs = repo.get_all()
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = getsizeof(objs[0])
+        if hasattr(objs[0], '__dict__'):
+            size += getsizeof(objs[0].__dict__)
+        del objs
+    return used / N_ROWS, size
+
+
+def main() -> None:
+    """ Точка входа """
+    with tempfile.TemporaryDirectory() as tmp:
+        for model in (Expense, Category):
+            db_file = os.path.join(tmp, f'{model.__name__}.db')
+            with SQLiteRepository[Any](db_file, model) as repo:
+                repo.add_many(rows(model))
+            for name, cls in (('__slots__', model), ('__dict__', with_dict(model))):
+                per_object, size = measure(db_file, cls)
+                print(f'{N_ROWS} {model.__name__} with {name}: '
+                      f'{per_object:.0f} B/object (object itself {size} B)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Вычисление бюджетов по N_ROWS тратам в SQLite: по таблице трат
+и по сводной таблице сумм трат по дням (dailytotal).
+
+Запуск (из корневой папки проекта):
+    poetry run python -m benchmarks.bench_rollup
+"""
+import os
+import tempfile
+from datetime import datetime
+from time import perf_counter
+
+from bookkeeper.models.budget import Budget
+from bookkeeper.models.budget_evaluator import BudgetEvaluator
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.rollup import DailyTotalRepository
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+N_ROWS = 1_000_000
+N_CATEGORIES = 20
+REPEAT = 5
+NOW = datetime(2023, 12, 15)
+
+
+def main() -> None:
+    """ Точка входа """
+    budgets = [Budget(0, period, category=category)
+               for period in ('day', 'week', 'month', 'quarter', 'year', '30d')
+               for category in (None, *range(N_CATEGORIES))]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'bench.db')
+        with SQLiteRepository[Expense](db_file, Expense) as exp_repo:  # type: ignore
+            start = perf_counter()
+            totals_repo = DailyTotalRepository(db_file, exp_repo.connection)
+            exp_repo.add_many(
+                Expense(i % 1000, i % N_CATEGORIES,
+                        expense_date=f'2023-{i % 12 + 1:02}-{i % 28 + 1:02}\t10:00')
+                for i in range(N_ROWS))
+            print(f'insert {N_ROWS} rows with triggers: {perf_counter() - start:.2f} s')
+            print(f'{totals_repo.count()} rollup rows')
+            for name, repo in (('expense', None), ('dailytotal', totals_repo)):
+                start = perf_counter()
+                for _ in range(REPEAT):
+                    BudgetEvaluator(budgets, now=NOW).evaluate(exp_repo, repo)
+                spent = [budget.spent for budget in budgets]
+                elapsed = (perf_counter() - start) / REPEAT
+                print(f'{len(budgets)} budgets from {name}: {elapsed * 1e3:.1f} ms')
+            start = perf_counter()
+            totals_repo.rebuild()
+            print(f'rebuild: {perf_counter() - start:.2f} s')
+            BudgetEvaluator(budgets, now=NOW).evaluate(exp_repo, totals_repo)
+            assert spent == [budget.spent for budget in budgets]
+
+
+if __name__ == '__main__':
+    main()
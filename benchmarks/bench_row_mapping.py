@@ -0,0 +1,53 @@
+"""
+Замер времени создания объектов из строк таблицы: выборка N_ROWS
+расходов методом get_all и отдельно преобразование уже прочитанных
+строк - позиционным конструктором модели и прежним способом
+(словарь полей, конструктор по именам, затем запись pk).
+
+Запуск (из корневой папки проекта):
+    poetry run python -m benchmarks.bench_row_mapping
+"""
+# pylint: disable=protected-access
+import os
+import tempfile
+from time import perf_counter
+from typing import Any
+
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+N_ROWS = 1_000_000
+
+
+def row2obj_by_name(fields: list[str], row: tuple[Any, ...]) -> Expense:
+    """ Прежний способ: словарь полей, конструктор по именам, затем pk """
+    obj = Expense(**dict(zip(fields, row[:-1])))
+    obj.pk = row[-1]
+    return obj
+
+
+def main() -> None:
+    """ Точка входа """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'bench.db')
+        with SQLiteRepository[Expense](db_file, Expense) as repo:  # type: ignore
+            repo.add_many(Expense(i % 1000, i % 20, comment=str(i))
+                          for i in range(N_ROWS))
+            start = perf_counter()
+            repo.get_all()
+            total = perf_counter() - start
+            rows = repo.connection.execute(repo._select_sql).fetchall()
+        fields = list(repo.fields)
+        start = perf_counter()
+        list(repo._make_objs(rows))
+        positional = perf_counter() - start
+        start = perf_counter()
+        list(map(row2obj_by_name, [fields] * len(rows), rows))
+        by_name = perf_counter() - start
+    print(f'get_all of {N_ROWS} rows:   {total:.3f} s')
+    print(f'rows -> objects, positional: {positional:.3f} s')
+    print(f'rows -> objects, by name:    {by_name:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Замер времени одиночных операций SQLiteRepository:
+10 000 добавлений и 10 000 чтений по одной записи.
+
+Запуск (из корневой папки проекта):
+    poetry run python -m benchmarks.bench_sqlite_connection
+"""
+import os
+import sqlite3
+import tempfile
+from time import perf_counter
+
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+N_ROWS = 10_000
+
+
+def prepare_db(db_file: str) -> None:
+    """ Создает таблицу расходов в пустой базе данных """
+    with sqlite3.connect(db_file) as con:
+        con.execute('CREATE TABLE IF NOT EXISTS '
+                    'expense(amount, category, expense_date, added_date, comment)')
+    con.close()
+
+
+def run(db_file: str) -> tuple[float, float]:
+    """ Возвращает время (в секундах) N_ROWS добавлений и N_ROWS чтений """
+    repo = SQLiteRepository[Expense](db_file=db_file, cls=Expense)  # type: ignore
+    start = perf_counter()
+    pks = [repo.add(Expense(100, 1, comment=str(i))) for i in range(N_ROWS)]
+    add_time = perf_counter() - start
+    start = perf_counter()
+    for pk in pks:
+        repo.get(pk)  # type: ignore
+    get_time = perf_counter() - start
+    repo.close()
+    return add_time, get_time
+
+
+def main() -> None:
+    """ Точка входа """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'bench.db')
+        prepare_db(db_file)
+        add_time, get_time = run(db_file)
+    print(f'{N_ROWS} add: {add_time:.3f} s ({add_time / N_ROWS * 1e6:.1f} us/op)')
+    print(f'{N_ROWS} get: {get_time:.3f} s ({get_time / N_ROWS * 1e6:.1f} us/op)')
+
+
+if __name__ == '__main__':
+    main()
@@ -13,9 +13,12 @@ from bookkeeper.repository.factory import repository_factory
 
 app = QApplication(sys.argv)
 view = View()
-repo_gen = repository_factory(SQLiteRepository, db_file="database/bookkeeper.db")
+repo_gen = repository_factory(SQLiteRepository, db_file="database/bookkeeper.db",
+                              cache_size=256, track_changes=True)
 bookkeeper_app = Bookkeeper(view, repo_gen)
 bookkeeper_app.show()
 print("Application is running")
-print(f"Application ends with exit status {app.exec()}")
+exit_status = app.exec()
+repo_gen.close()
+print(f"Application ends with exit status {exit_status}")
 sys.exit()
@@ -2,30 +2,42 @@
 Модуль описывает реализацию Presenter из модели MVP
 """
 # mypy: disable-error-code="attr-defined"
+from contextlib import nullcontext
+from copy import copy
 from datetime import datetime
 from typing import Any, Iterable
 from collections.abc import Callable
 
 from bookkeeper.view.abstract_view import AbstractView
 from bookkeeper.models.category import Category
+from bookkeeper.models.category_index import CategoryIndex
+from bookkeeper.models.category_tree import CategoryTree
 from bookkeeper.models.expense import Expense
 from bookkeeper.models.budget import Budget
+from bookkeeper.models.budget_engine import BudgetEngine
+from bookkeeper.models.budget_evaluator import BudgetEvaluator
 
 
-class Bookkeeper:
+class Bookkeeper:  # pylint: disable=too-many-instance-attributes
     """
     Presenter из модели MVP; работает с любым типом репозитория,
     наследованным от AbstractRepository; работает с GUI,
     основанным на протоколе AbstartView
     """
+    # количество последних трат, которые показываются в таблице
+    expenses_page_size = 50
 
     def __init__(self,
                  view: AbstractView,
                  repository_factory: Callable[[Any], Any]):
         self.view = view
+        # единица работы: несколько изменений в репозиториях одной транзакцией
+        self.transaction = getattr(repository_factory, 'transaction', nullcontext)
         self.category_rep = repository_factory(Category)
-        self.categories = self.category_rep.get_all()
-        self.view.set_categories(self.categories)
+        # индекс категорий по названию и id, общий с view
+        self.category_index = CategoryIndex(self.category_rep.get_all())
+        self.view.set_category_index(self.category_index)
+        self.update_categories()
         self.view.set_cat_adder(self.add_category)
         self.view.set_cat_modifier(self.modify_category)
         self.view.set_cat_deleter(self.delete_category)
@@ -36,6 +48,13 @@ class Bookkeeper:
         self.view.set_bdg_modifier(self.modify_budget)
 
         self.expense_rep = repository_factory(Expense)
+        # сводная таблица сумм трат по дням, если она включена в фабрике
+        self.totals_rep = getattr(repository_factory, 'daily_totals', lambda: None)()
+        # суммы трат за периоды бюджетов, запрос к репозиторию - только здесь
+        self.budget_engine = BudgetEngine(self.expense_rep, totals_repo=self.totals_rep)
+        # остальные бюджеты (по категориям, другие периоды)
+        self.budget_evaluator = BudgetEvaluator([])
+        self.view.set_exp_pager(self.expenses_page)
         self.update_expenses()
         self.view.set_exp_adder(self.add_expense)
         self.view.set_exp_deleter(self.delete_expenses)
@@ -49,70 +68,100 @@ class Bookkeeper:
     #     self.category_rep.update(cat)
     #     self.view.set_categories(self.categories)
 
+    def update_categories(self) -> None:
+        """
+        Обновляет список и дерево категорий по индексу категорий
+        (после каждого изменения категорий) и то, что от них зависит
+        """
+        self.categories = list(self.category_index)
+        self.category_tree = CategoryTree(self.categories)
+        self.view.set_categories(self.categories)
+
+    def find_category(self, cat_name: str) -> Category:
+        """ Возвращает категорию по названию (без учета регистра) """
+        cat = self.category_index.find(cat_name)
+        if cat is None:
+            raise ValueError(f'Категории "{cat_name}" не существует в этой копьютерной симуляции')
+        return cat
+
     def cat_checker(self, cat_name: str) -> None:
         """ Проверяет, что имя категории (cat_name) есть в репозитории """
-        if cat_name not in [c.name for c in self.categories]:
-            raise ValueError(f'Категории "{cat_name}" не существует в этой копьютерной симуляции')
+        self.find_category(cat_name)
 
     def add_category(self, name: str, parent: str | None) -> None:
         """ Добавляет категорию с названием name и названием родителя parent"""
-        if name in [c.name for c in self.categories]:
+        if name in self.category_index:
             raise ValueError(f'Категория "{name}" уже существует в этой копьютерной симуляции')
-        if parent is not None:
-            if parent not in [c.name for c in self.categories]:
-                raise ValueError(f'Категории "{parent}" не существует в этой копьютерной симуляции')
-            parent_pk = self.category_rep.get_all(where={'name': parent})[0].pk
-        else:
-            parent_pk = None
+        parent_pk = None if parent is None else self.find_category(parent).pk
         cat = Category(name, parent_pk)
         self.category_rep.add(cat)
-        self.categories = self.category_rep.get_all()
-        self.view.set_categories(self.categories)
+        self.category_index.add(cat)
+        self.update_categories()
 
     def modify_category(self, cat_name: str, new_name: str,
                         new_parent: str | None) -> None:
         """ Изменяет имя и родителя категории """
-        if cat_name not in [c.name for c in self.categories]:
-            raise ValueError(f'Категории "{cat_name}" не существует в этой копьютерной симуляции')
-        if new_name != cat_name:
-            if new_name in [c.name for c in self.categories]:
-                raise ValueError(f'Категория "{new_name}" уже существует в этой копьютерной симуляции')
-        if new_parent is not None:
-            if new_parent not in [c.name for c in self.categories]:
-                raise ValueError(f'Категории "{new_parent}" не существует в этой копьютерной симуляции')
-            parent_pk = self.category_rep.get_all(where={'name': new_parent})[0].pk
-        else:
-            parent_pk = None
-        cat = self.category_rep.get_all(where={'name': cat_name})[0]
+        cat = copy(self.find_category(cat_name))
+        other = self.category_index.find(new_name)
+        if other is not None and other.pk != cat.pk:
+            raise ValueError(f'Категория "{new_name}" уже существует в этой копьютерной симуляции')
         cat.name = new_name
-        cat.parent = parent_pk
+        cat.parent = None if new_parent is None else self.find_category(new_parent).pk
         self.category_rep.update(cat)
-        self.categories = self.category_rep.get_all()
-        self.view.set_categories(self.categories)
+        self.category_index.update(cat)
+        self.update_categories()
+        self.update_budgets()
 
     def delete_category(self, cat_name: str) -> None:
-        """ Удаляет категорию с названием cat_name """
-        cat = self.category_rep.get_all(where={"name": cat_name})
-        if len(cat) == 0:
-            raise ValueError(f'Категории "{cat_name}" не существует в этой копьютерной симуляции')
-        cat = cat[0]
-        self.category_rep.delete(cat.pk)
-        for child in self.category_rep.get_all(where={'parent': cat.pk}):
+        """
+        Удаляет категорию с названием cat_name: подкатегории переходят
+        к ее родителю, траты остаются без категории, бюджеты категории
+        удаляются
+        """
+        cat = self.find_category(cat_name)
+        # подкатегории, траты и бюджеты изменяются по одному запросу на таблицу,
+        # сколько бы их ни было
+        with self.transaction():
+            self.category_rep.update_where({'parent': cat.pk}, {'parent': cat.parent})
+            detached = self.expense_rep.update_where({'category': cat.pk},
+                                                     {'category': None})
+            self.budget_rep.delete_where({'category': cat.pk})
+            self.category_rep.delete(cat.pk)
+        for child_pk in self.category_tree.children.get(cat.pk, []):
+            child = copy(self.category_index.by_pk[child_pk])
             child.parent = cat.parent
-            self.category_rep.update(child)
-        self.categories = self.category_rep.get_all()
-        self.view.set_categories(self.categories)
-        for exp in self.expense_rep.get_all(where={'category': cat.pk}):
-            exp.category = None
-            self.expense_rep.update(exp)
-        self.update_expenses()
+            self.category_index.update(child)
+        self.category_index.remove(cat.pk)
+        self.update_categories()
+        if detached:
+            self.update_expenses()
+        else:
+            self.update_budgets()
+
+    @property
+    def expenses(self) -> list[Expense]:
+        """ Первая страница последних трат """
+        return self.expenses_page(None)
 
     def update_expenses(self) -> None:
-        """ Обновляет список трат и то, что он него зависит """
-        self.expenses = self.expense_rep.get_all()
+        """
+        Обновляет список последних трат (первую страницу по дате траты,
+        следующие view запрашивает через expenses_page) и то, что он него зависит
+        """
         self.view.set_expenses(self.expenses)
         self.update_budgets()
 
+    def expenses_page(self, after: Expense | None) -> list[Expense]:
+        """
+        Возвращает страницу трат (по убыванию даты траты),
+        следующих за тратой after (None - первую страницу)
+        """
+        cursor = None if after is None else (after.expense_date, after.pk)
+        page: list[Expense]
+        page, _ = self.expense_rep.get_page('expense_date', self.expenses_page_size,
+                                            cursor)
+        return page
+
     def add_expense(self, amount: str,
                     cat_name: str,
                     comment: str = "") -> None:
@@ -126,14 +175,12 @@ class Bookkeeper:
             raise ValueError('Наш магазин принимает только целые числа!') from err
         if amount_int <= 0:
             raise ValueError('Хошо придумали, но деньги не могут быть отрицательными!')
-        cat = self.category_rep.get_all(where={"name": cat_name.lower()})
-        if len(cat) == 0:
-            raise ValueError(f'Категории "{cat_name}" не существует в этой копьютерной симуляции')
-        cat = cat[0]
+        cat = self.find_category(cat_name)
         new_exp = Expense(amount_int, cat.pk, comment=comment)
         self.expense_rep.add(new_exp)
-        self.update_expenses()
-        if len([b for b in self.budgets if b.spent > b.limitation]) != 0:
+        self.view.expense_added(new_exp)
+        self.expenses_changed([], [new_exp])
+        if self.budget_engine.is_over() or self.budget_evaluator.is_over():
             self.view.death()
 
     def modify_expense(self, pk: int, attr: str, new_val: str) -> None:
@@ -141,21 +188,17 @@ class Bookkeeper:
         Изменяет трату по id (pk):
         устанавливает в атрибут attr новое значение new_val
         """
-        exp = self.expense_rep.get(pk)
+        old_exp = self.expense_rep.get(pk)
+        # изменяется копия, чтобы view мог найти прежний вариант траты
+        exp = copy(old_exp)
         if attr == "category":
-            val_cat = new_val.lower()
-            if val_cat not in [c.name for c in self.categories]:
-                self.view.set_expenses(self.expenses)
-                raise ValueError(f'Категории "{val_cat}" не существует в этой копьютерной симуляции')
-            val_cat = self.category_rep.get_all(where={'name': val_cat})[0].pk
-            setattr(exp, attr, val_cat)
+            setattr(exp, attr, self.find_category(new_val).pk)
         elif attr == "amount":
             try:
                 val_amnt = int(new_val)
             except ValueError as err:
                 raise ValueError('Наш магазин принимает только целые числа!') from err
             if val_amnt <= 0:
-                self.view.set_expenses(self.expenses)
                 raise ValueError('Хошо придумали, но деньги не могут быть отрицательными!')
             setattr(exp, attr, val_amnt)
         elif attr == "expense_date":
@@ -163,26 +206,76 @@ class Bookkeeper:
                 val_date = datetime.fromisoformat(new_val).isoformat(
                     sep='\t', timespec='minutes')
             except ValueError as err:
-                self.view.set_expenses(self.expenses)
                 raise ValueError('Кривая дата') from err
             setattr(exp, attr, val_date)
         else:
             setattr(exp, attr, new_val)
         self.expense_rep.update(exp)
-        self.update_expenses()
+        self.view.expense_changed(old_exp, exp)
+        self.expenses_changed([old_exp], [exp])
 
     def delete_expenses(self, exp_pks: Iterable[int]) -> None:
         """ Удаляет траты по списку id (exp_pks) """
-        for pk in exp_pks:
-            self.expense_rep.delete(pk)
-        self.update_expenses()
+        exp_pks = list(exp_pks)
+        exps = self.expense_rep.get_many(exp_pks)
+        self.expense_rep.delete_many(exp_pks)
+        self.view.expenses_removed(exps)
+        self.expenses_changed(exps, [])
+
+    def expenses_changed(self, old: list[Expense], new: list[Expense]) -> None:
+        """
+        Обновляет потраченные суммы бюджетов после замены трат old
+        на траты new (добавление - old пуст, удаление - new пуст):
+        суммы изменяются только на эти траты,
+        view получает только изменившиеся бюджеты
+        """
+        before = [budget.spent for budget in self.budgets]
+        self.budget_engine.roll()
+        for exp in old:
+            self.budget_engine.remove(exp)
+        for exp in new:
+            self.budget_engine.add(exp)
+        if self.budget_evaluator.expired():
+            self._evaluate_budgets()
+        else:
+            self.budget_evaluator.apply(old, new)
+        for budget in self._store_spent(before):
+            self.view.budget_changed(budget)
+
+    def _evaluate_budgets(self) -> None:
+        """
+        Вычисляет по репозиторию суммы бюджетов, которые не ведет
+        движок бюджетов, а суммы остальных берет из движка
+        """
+        engine = self.budget_engine
+        self.budget_evaluator = BudgetEvaluator(
+            [budget for budget in self.budgets if not engine.covers(budget)],
+            self.category_tree.parent)
+        self.budget_evaluator.evaluate(self.expense_rep, self.totals_rep)
+
+    def _store_spent(self, before: list[int]) -> list[Budget]:
+        """
+        Берет суммы бюджетов движка из движка и сохраняет бюджеты,
+        суммы которых отличаются от прежних (before); возвращает их
+        """
+        for budget in self.budgets:
+            if self.budget_engine.covers(budget):
+                budget.spent = self.budget_engine.spent(budget.period)
+        changed = [budget for budget, spent in zip(self.budgets, before)
+                   if budget.spent != spent]
+        with self.transaction():
+            for budget in changed:
+                self.budget_rep.update(budget)
+        return changed
 
     def update_budgets(self) -> None:
         """ Обновляет список бюджетов и то, что он него зависит """
-        for budget in self.budget_rep.get_all():
-            budget.update_spent(self.expense_rep)
-            self.budget_rep.update(budget)
+        self.budget_engine.roll()
         self.budgets = self.budget_rep.get_all()
+        before = [budget.spent for budget in self.budgets]
+        self._evaluate_budgets()
+        self._store_spent(before)
+        self.budget_engine.set_limits(self.budgets)
         self.view.set_budgets(self.budgets)
 
     def modify_budget(self, pk: int | None,
@@ -1,52 +1,80 @@
 """
 Модель бюджета
 """
+import re
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 from bookkeeper.repository.abstract_repository import AbstractRepository
+from bookkeeper.repository.filters import prefix_bounds
 from bookkeeper.models.expense import Expense
 
 
-@dataclass
+# календарные периоды бюджетов; кроме них допускаются скользящие
+# периоды из нескольких последних дней вида "30d"
+PERIODS = ("day", "week", "month", "quarter", "year")
+_ROLLING = re.compile(r'[1-9]\d*d')
+
+
+@dataclass(slots=True)
 class Budget:
     """
    Бюджет, атрибуты:
     period - хранит название периода,
     limitation - хранит сумму затрат на период
     spent - хранит уже потраченную за период сумму
+    category - id категории, траты которой (вместе с подкатегориями)
+    учитывает бюджет (None - все траты)
+    Период проверяется при создании бюджета; бюджеты, прочитанные
+    из репозитория, создаются без проверки.
     """
+    __indexes__ = ('category',)
+
     limitation: int
     period: str
     spent: int = 0
+    category: int | None = None
     pk: int = 0
 
-    def __init__(self, limitation: int, period: str,
-                 spent: int = 0, pk: int = 0):
-        if period not in ["day", "week", "month"]:
-            raise ValueError(f'unknown period "{period}" for budget'
-                             + 'should be "day", "week" or "month"')
-        self.limitation = limitation
-        self.period = period
-        self.spent = spent
-        self.pk = pk
+    def __post_init__(self) -> None:
+        if self.period not in PERIODS and not _ROLLING.fullmatch(self.period):
+            raise ValueError(f'unknown period "{self.period}" for budget '
+                             + f'should be one of {PERIODS} or "<N>d"')
 
-    def update_spent(self, exp_repo: AbstractRepository[Expense]) -> None:  # type: ignore
-        """ Обновляет траты за период бюждетов по заданному репозиторию exp_repo """
-        date = datetime.now().isoformat()[:10]  # YYYY-MM-DD format
+    def period_bounds(self, now: datetime | None = None) -> tuple[str, str]:
+        """
+        Возвращает границы [начало, конец) текущего периода бюджета
+        в виде строк, сравнимых с датами трат в ISO формате.
+        now - текущий момент (по умолчанию datetime.now())
+        """
+        if now is None:
+            now = datetime.now()
+        date = now.isoformat()[:10]  # YYYY-MM-DD format
         if self.period.lower() == "day":
-            date_mask = f"{date}"
-            period_exps = exp_repo.get_all_like(like={"expense_date": date_mask})
-        elif self.period.lower() == "week":
-            weekday_now = datetime.now().weekday()
+            return prefix_bounds(date)
+        if self.period.lower() == "week":
             day_now = datetime.fromisoformat(date)
-            first_week_day = day_now - timedelta(days=weekday_now)
-            period_exps = []
-            for i in range(7):
-                weekday = first_week_day + timedelta(days=i)
-                date_mask = f"{weekday.isoformat()[:10]}"
-                period_exps += exp_repo.get_all_like(like={"expense_date": date_mask})
-        elif self.period.lower() == "month":
-            date_mask = f"{date[:7]}-"
-            period_exps = exp_repo.get_all_like(like={"expense_date": date_mask})
-        self.spent = sum(int(exp.amount) for exp in period_exps)
+            first_week_day = day_now - timedelta(days=now.weekday())
+            next_week_day = first_week_day + timedelta(days=7)
+            return first_week_day.isoformat()[:10], next_week_day.isoformat()[:10]
+        if self.period.lower() == "month":
+            return prefix_bounds(f"{date[:7]}-")
+        if self.period.lower() == "quarter":
+            first = (now.month - 1) // 3 * 3 + 1
+            if first == 10:
+                upper = f"{now.year + 1}-01-"
+            else:
+                upper = f"{now.year}-{first + 3:02}-"
+            return f"{now.year}-{first:02}-", upper
+        if self.period.lower() == "year":
+            return prefix_bounds(f"{date[:4]}-")
+        # скользящий период из последних N дней, включая текущий
+        day_now = datetime.fromisoformat(date)
+        first_day = day_now - timedelta(days=int(self.period[:-1]) - 1)
+        next_day = day_now + timedelta(days=1)
+        return first_day.isoformat()[:10], next_day.isoformat()[:10]
+
+    def update_spent(self, exp_repo: AbstractRepository[Expense]) -> None:  # type: ignore
+        """ Обновляет траты за период бюждетов по заданному репозиторию exp_repo """
+        lower, upper = self.period_bounds()
+        self.spent = int(exp_repo.sum("amount", between=("expense_date", lower, upper)))
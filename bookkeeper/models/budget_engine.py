@@ -0,0 +1,132 @@
+"""
+Движок бюджетов: текущие суммы трат за день, неделю и месяц,
+обновляемые по изменениям трат без запросов к репозиторию
+"""
+from datetime import datetime
+from typing import Iterable
+
+from bookkeeper.repository.abstract_repository import AbstractRepository
+from bookkeeper.repository.filters import Ge
+from bookkeeper.models.budget import Budget
+from bookkeeper.models.daily_total import DailyTotal
+from bookkeeper.models.expense import Expense
+
+
+class BudgetEngine:  # pylint: disable=too-many-instance-attributes
+    """
+    Хранит в памяти суммы трат по дням, начиная с начала текущей недели
+    или месяца (что раньше), и текущие суммы за каждый период бюджета.
+    Суммы вычисляются запросом к репозиторию трат exp_repo только при
+    создании (rebuild), затем обновляются за O(1) по добавленным (add)
+    и удаленным (remove) тратам. При наступлении нового периода (roll)
+    сумма за него складывается из сумм по дням, уже хранящихся в памяти.
+    Лимиты бюджетов (limits: id бюджета -> период и лимит, см. set_limits)
+    позволяют проверить превышение без запросов к репозиторию.
+    Если задан репозиторий сумм трат по дням totals_repo, суммы
+    при создании читаются из него.
+    """
+    periods = ('day', 'week', 'month')
+
+    def __init__(self, exp_repo: AbstractRepository[Expense],  # type: ignore
+                 now: datetime | None = None,
+                 totals_repo: AbstractRepository[DailyTotal] | None = None  # type: ignore
+                 ) -> None:
+        self.exp_repo = exp_repo
+        self.totals_repo = totals_repo
+        self.limits: dict[int, tuple[str, int]] = {}
+        self.daily: dict[str, int] = {}
+        self.bounds: dict[str, tuple[str, str]] = {}
+        self.totals: dict[str, int] = {}
+        self.start = ''
+        self.today = ''
+        self.rebuild(now)
+
+    @staticmethod
+    def _bounds(now: datetime) -> dict[str, tuple[str, str]]:
+        """ Границы [начало, конец) периодов бюджетов, содержащих now """
+        return {period: Budget(0, period).period_bounds(now)
+                for period in BudgetEngine.periods}
+
+    def rebuild(self, now: datetime | None = None) -> None:
+        """ Вычисляет суммы заново по репозиторию трат """
+        now = now or datetime.now()
+        self.today = now.isoformat()[:10]
+        self.bounds = self._bounds(now)
+        self.start = min(lower for lower, _ in self.bounds.values())
+        if self.totals_repo is None:
+            sums = self.exp_repo.sum('amount', where=Ge('expense_date', self.start),
+                                     group_by='expense_date')
+        else:
+            sums = self.totals_repo.sum('amount', where=Ge('day', self.start),
+                                        group_by='day')
+        self.daily = {}
+        for date, amount in sums.items():
+            self.daily[date[:10]] = self.daily.get(date[:10], 0) + int(amount)
+        self._sum_periods()
+
+    def _sum_periods(self) -> None:
+        """ Складывает суммы за периоды из сумм по дням """
+        self.totals = {
+            period: sum(amount for day, amount in self.daily.items()
+                        if lower <= day < upper)
+            for period, (lower, upper) in self.bounds.items()
+        }
+
+    def roll(self, now: datetime | None = None) -> None:
+        """
+        Переходит к периодам, содержащим момент now (по умолчанию - текущий).
+        Пока не наступил новый день, ничего не делает.
+        """
+        now = now or datetime.now()
+        today = now.isoformat()[:10]
+        if today == self.today:
+            return
+        bounds = self._bounds(now)
+        start = min(lower for lower, _ in bounds.values())
+        if start < self.start:
+            # часы переведены назад: нужных сумм по дням в памяти нет
+            self.rebuild(now)
+            return
+        self.today, self.bounds, self.start = today, bounds, start
+        self.daily = {day: amount for day, amount in self.daily.items()
+                      if day >= start}
+        self._sum_periods()
+
+    def _apply(self, exp: Expense, amount: int) -> None:
+        """ Прибавляет amount к суммам, в которые попадает трата exp """
+        date = exp.expense_date
+        if date is None or date < self.start:
+            return
+        self.daily[date[:10]] = self.daily.get(date[:10], 0) + amount
+        for period, (lower, upper) in self.bounds.items():
+            if lower <= date < upper:
+                self.totals[period] += amount
+
+    def add(self, exp: Expense) -> None:
+        """ Учитывает добавленную трату """
+        self._apply(exp, exp.amount)
+
+    def remove(self, exp: Expense) -> None:
+        """ Учитывает удаленную трату """
+        self._apply(exp, -exp.amount)
+
+    def spent(self, period: str) -> int:
+        """ Сумма трат за текущий период period """
+        return self.totals[period]
+
+    def covers(self, budget: Budget) -> bool:
+        """ Ведет ли движок сумму бюджета budget (все траты за период движка) """
+        return budget.category is None and budget.period in self.periods
+
+    def set_limits(self, budgets: Iterable[Budget]) -> None:
+        """
+        Запоминает лимиты бюджетов budgets, суммы которых ведет движок
+        (у нескольких бюджетов может быть один период)
+        """
+        self.limits = {budget.pk: (budget.period, budget.limitation)
+                       for budget in budgets if self.covers(budget)}
+
+    def is_over(self) -> bool:
+        """ Превышен ли лимит какого-нибудь бюджета """
+        return any(self.totals[period] > limit
+                   for period, limit in self.limits.values())
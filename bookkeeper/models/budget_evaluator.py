@@ -0,0 +1,111 @@
+"""
+Вычисление потраченных сумм множества бюджетов за один проход по тратам
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable
+
+from bookkeeper.repository.abstract_repository import AbstractRepository
+from bookkeeper.repository.filters import Between
+from bookkeeper.models.budget import Budget
+from bookkeeper.models.daily_total import DailyTotal
+from bookkeeper.models.expense import Expense
+
+# суммы трат по парам (категория, день)
+Sums = dict[tuple[int | None, str], int]
+
+
+class BudgetEvaluator:
+    """
+    Вычисляет потраченные суммы (spent) бюджетов budgets на момент now
+    (по умолчанию - текущий). parents - словарь id категории -> id родителя:
+    бюджет категории учитывает траты ее подкатегорий любого уровня.
+    Траты из самого широкого окна всех бюджетов перебираются один раз
+    и складываются по парам (категория, день), затем суммы раскладываются
+    по бюджетам через словарь категория -> номера бюджетов, в которые
+    входят ее траты. Поэтому стоимость растет с количеством трат в окне,
+    а не с произведением количества бюджетов и трат.
+    """
+
+    def __init__(self, budgets: Iterable[Budget],
+                 parents: dict[int, int | None] | None = None,
+                 now: datetime | None = None) -> None:
+        now = now or datetime.now()
+        self.today = now.isoformat()[:10]
+        self.budgets = list(budgets)
+        self.parents = parents or {}
+        self.bounds = [budget.period_bounds(now) for budget in self.budgets]
+        # самое широкое окно [начало, конец) всех бюджетов
+        self.window = (min((lower for lower, _ in self.bounds), default=''),
+                       max((upper for _, upper in self.bounds), default=''))
+        self._by_category: dict[int | None, list[int]] = defaultdict(list)
+        for i, budget in enumerate(self.budgets):
+            self._by_category[budget.category].append(i)
+        self._members: dict[int | None, list[int]] = {}
+
+    def members(self, category: int | None) -> list[int]:
+        """
+        Номера бюджетов, учитывающих траты категории category:
+        бюджеты самой категории, ее предков и бюджеты всех трат
+        """
+        if category not in self._members:
+            found = list(self._by_category.get(None, ()))
+            seen = set()
+            ancestor = category
+            while ancestor is not None and ancestor not in seen:
+                seen.add(ancestor)
+                found += self._by_category.get(ancestor, ())
+                ancestor = self.parents.get(ancestor)
+            self._members[category] = found
+        return self._members[category]
+
+    def spent_of(self, exps: Iterable[Expense]) -> list[int]:
+        """ Суммы трат exps, приходящиеся на каждый бюджет """
+        sums: Sums = defaultdict(int)
+        for exp in exps:
+            if exp.expense_date is not None:
+                sums[exp.category, exp.expense_date[:10]] += exp.amount
+        return self._spread(sums)
+
+    def _spread(self, sums: Sums) -> list[int]:
+        """ Раскладывает суммы по категориям и дням по бюджетам """
+        spent = [0] * len(self.budgets)
+        for (category, day), amount in sums.items():
+            for i in self.members(category):
+                lower, upper = self.bounds[i]
+                if lower <= day < upper:
+                    spent[i] += amount
+        return spent
+
+    def evaluate(self, exp_repo: AbstractRepository[Expense],  # type: ignore
+                 totals_repo: AbstractRepository[DailyTotal] | None = None  # type: ignore
+                 ) -> None:
+        """
+        Записывает в бюджеты суммы трат из репозитория exp_repo
+        (один запрос по диапазону дат). Если задан репозиторий сумм
+        трат по дням totals_repo, суммы читаются из него.
+        """
+        if not self.budgets:
+            return
+        if totals_repo is None:
+            exps = exp_repo.iter_all(Between('expense_date', *self.window))
+            spent = self.spent_of(exps)
+        else:
+            totals = totals_repo.iter_all(Between('day', *self.window))
+            spent = self._spread({(t.category, t.day): t.amount for t in totals})
+        for budget, value in zip(self.budgets, spent):
+            budget.spent = value
+
+    def apply(self, old: Iterable[Expense], new: Iterable[Expense]) -> None:
+        """ Изменяет суммы бюджетов на замену трат old тратами new """
+        for budget, added, removed in zip(self.budgets, self.spent_of(new),
+                                          self.spent_of(old)):
+            budget.spent += added - removed
+
+    def is_over(self) -> bool:
+        """ Превышен ли лимит какого-нибудь бюджета """
+        return any(budget.spent > budget.limitation for budget in self.budgets)
+
+    def expired(self, now: datetime | None = None) -> bool:
+        """ Наступил ли новый день (и суммы нужно вычислить заново) """
+        return (now or datetime.now()).isoformat()[:10] != self.today
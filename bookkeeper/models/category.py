@@ -1,20 +1,22 @@
 """
 Модель категории расходов
 """
-from collections import defaultdict
 from dataclasses import dataclass
 from typing import Iterator
 
 from bookkeeper.repository.abstract_repository import AbstractRepository
 
 
-@dataclass
+@dataclass(slots=True)
 class Category:
     """
     Категория расходов, хранит название в атрибуте name и ссылку (id) на
     родителя (категория, подкатегорией которой является данная) в атрибуте parent.
     У категорий верхнего уровня parent = None
     """
+    __indexes__ = ('name', 'parent')
+    __foreign_keys__ = {'parent': 'category'}
+
     name: str
     parent: int | None = None
     pk: int = 0
@@ -52,7 +54,7 @@ class Category:
         if parent is None:
             return
         yield parent
-        yield from parent.get_all_parents(repo)
+        yield from repo.get_ancestors(parent.pk)
 
     def get_subcategories(self,
                           repo: AbstractRepository['Category']  # type: ignore
@@ -67,18 +69,7 @@ class Category:
         -------
         Объекты Category, являющиеся подкатегориями разного уровня ниже данной.
         """
-
-        def get_children(graph: dict[int | None, list['Category']],
-                         root: int) -> Iterator['Category']:
-            """ dfs in graph from root """
-            for x in graph[root]:
-                yield x
-                yield from get_children(graph, x.pk)
-
-        subcats = defaultdict(list)
-        for cat in repo.get_all():
-            subcats[cat.parent].append(cat)
-        return get_children(subcats, self.pk)
+        yield from repo.get_descendants(self.pk)
 
     @classmethod
     def create_from_tree(
@@ -104,8 +95,14 @@ class Category:
         Список созданных объектов Category
         """
         created: dict[str, Category] = {}
+        batch: list[Category] = []
         for child, parent in tree:
+            if parent is not None and created[parent].pk == 0:
+                # родитель еще не сохранен - сохраняем накопленный пакет
+                repo.add_many(batch)
+                batch = []
             cat = cls(child, created[parent].pk if parent is not None else None)
-            repo.add(cat)
             created[child] = cat
-        return list(created.values())
\ No newline at end of file
+            batch.append(cat)
+        repo.add_many(batch)
+        return list(created.values())
@@ -0,0 +1,104 @@
+"""
+Индекс категорий по названию и id
+"""
+from typing import Iterable, Iterator
+
+from bookkeeper.models.category import Category
+
+
+class CategoryIndex:
+    """
+    Индекс категорий для поиска за O(1) по id (get) и по названию
+    без учета регистра (find, оператор in). Владелец индекса
+    (Presenter) обновляет его при изменении категорий методами add,
+    update и remove, поэтому индекс можно передавать другим
+    компонентам (View), не копируя.
+    Если в данных есть названия, различающиеся только регистром,
+    по названию находится первая добавленная из таких категорий
+    (остальные доступны по id), а после ее удаления или переименования -
+    следующая.
+    """
+
+    def __init__(self, cats: Iterable[Category] = ()) -> None:
+        self.by_pk: dict[int, Category] = {}
+        self.by_name: dict[str, Category] = {}
+        # ключ названия -> id категорий с этим ключом в порядке добавления
+        self._same_name: dict[str, list[int]] = {}
+        # ключ названия каждой категории
+        self._keys: dict[int, str] = {}
+        for cat in cats:
+            self.add(cat)
+
+    @staticmethod
+    def key(name: str) -> str:
+        """ Ключ поиска по названию (без учета регистра) """
+        return name.casefold()
+
+    def add(self, cat: Category) -> None:
+        """ Добавляет категорию в индекс """
+        self.by_pk[cat.pk] = cat
+        self._link(cat)
+
+    def update(self, cat: Category) -> None:
+        """
+        Обновляет категорию (в том числе после переименования),
+        не меняя ее места в порядке перебора
+        """
+        key = self._keys.get(cat.pk)
+        self.by_pk[cat.pk] = cat
+        if key != self.key(cat.name):
+            if key is not None:
+                self._unlink(cat.pk)
+            self._link(cat)
+            return
+        # название то же (с точностью до регистра): место среди
+        # одноименных категорий не меняется
+        if self.by_name[key].pk == cat.pk:
+            self.by_name[key] = cat
+
+    def remove(self, pk: int) -> None:
+        """ Удаляет категорию с id pk, если она есть """
+        if pk not in self.by_pk:
+            return
+        self._unlink(pk)
+        del self.by_pk[pk]
+
+    def _link(self, cat: Category) -> None:
+        """ Добавляет категорию cat в поиск по названию """
+        key = self.key(cat.name)
+        self._keys[cat.pk] = key
+        self._same_name.setdefault(key, []).append(cat.pk)
+        self.by_name.setdefault(key, cat)
+
+    def _unlink(self, pk: int) -> None:
+        """ Убирает категорию с id pk из поиска по названию """
+        key = self._keys.pop(pk)
+        same_name = self._same_name[key]
+        same_name.remove(pk)
+        if not same_name:
+            del self._same_name[key]
+            del self.by_name[key]
+        elif self.by_name[key].pk == pk:
+            self.by_name[key] = self.by_pk[same_name[0]]
+
+    def get(self, pk: int | None) -> Category | None:
+        """ Категория по id """
+        return None if pk is None else self.by_pk.get(pk)
+
+    def find(self, name: str) -> Category | None:
+        """ Категория по названию (без учета регистра) """
+        return self.by_name.get(self.key(name))
+
+    def name(self, pk: int | None) -> str:
+        """ Название категории по id (пустая строка, если ее нет) """
+        cat = self.get(pk)
+        return '' if cat is None else cat.name
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self.key(name) in self.by_name
+
+    def __iter__(self) -> Iterator[Category]:
+        return iter(self.by_pk.values())
+
+    def __len__(self) -> int:
+        return len(self.by_pk)
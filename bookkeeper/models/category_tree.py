@@ -0,0 +1,107 @@
+"""
+Индекс дерева категорий в оперативной памяти
+"""
+from typing import Any, Iterable, Mapping
+
+from bookkeeper.models.category import Category
+from bookkeeper.repository.abstract_repository import AbstractRepository
+from bookkeeper.repository.filters import Filter, And, Ge, Lt
+
+
+class CategoryTree:
+    """
+    Дерево категорий, построенное по списку категорий cats за один проход.
+    Хранит словари id -> категория (categories), id -> id родителя (parent),
+    id родителя -> id детей (children, категории верхнего уровня - у None),
+    глубину категорий (depth, у верхнего уровня - 0) и интервалы обхода
+    в глубину: потомки категории pk занимают в списке order позиции
+    от enter[pk] + 1 до leave[pk], поэтому проверка "является потомком"
+    выполняется за O(1), а список потомков - срезом.
+    Категории, попавшие в цикл ссылок на родителя, в обход не входят.
+    Дерево не следит за репозиторием: после изменения категорий
+    его нужно построить заново.
+    """
+
+    def __init__(self, cats: Iterable[Category]) -> None:
+        self.categories = {cat.pk: cat for cat in cats}
+        self.parent = {pk: cat.parent for pk, cat in self.categories.items()}
+        self.children: dict[int | None, list[int]] = {None: []}
+        for pk, cat in self.categories.items():
+            parent = cat.parent if cat.parent in self.categories else None
+            self.children.setdefault(parent, []).append(pk)
+        self.depth: dict[int, int] = {}
+        self.order: list[int] = []
+        self.enter: dict[int, int] = {}
+        self.leave: dict[int, int] = {}
+        # обход в глубину без рекурсии: (pk, True) - вход, (pk, False) - выход
+        stack = [(pk, True) for pk in reversed(self.children[None])]
+        while stack:
+            pk, entering = stack.pop()
+            if not entering:
+                self.leave[pk] = len(self.order)
+                continue
+            parent = self.parent[pk]
+            self.depth[pk] = 0 if parent not in self.depth else self.depth[parent] + 1
+            self.enter[pk] = len(self.order)
+            self.order.append(pk)
+            stack.append((pk, False))
+            stack += [(child, True) for child in reversed(self.children.get(pk, []))]
+
+    def __contains__(self, pk: object) -> bool:
+        return pk in self.enter
+
+    def is_descendant(self, pk: int, ancestor: int) -> bool:
+        """ Является ли категория pk потомком (любого уровня) категории ancestor """
+        if pk not in self.enter or ancestor not in self.enter:
+            return False
+        return self.enter[ancestor] < self.enter[pk] < self.leave[ancestor]
+
+    def descendants(self, pk: int) -> list[int]:
+        """ id всех потомков категории pk в порядке обхода в глубину """
+        if pk not in self.enter:
+            return []
+        return self.order[self.enter[pk] + 1:self.leave[pk]]
+
+    def ancestors(self, pk: int) -> list[int]:
+        """ id предков категории pk от родителя до категории верхнего уровня """
+        path = []
+        parent = self.parent.get(pk) if pk in self.enter else None
+        while parent in self.enter:
+            path.append(parent)
+            parent = self.parent[parent]
+        return path
+
+    def path(self, pk: int) -> list[Category]:
+        """ Категории от верхнего уровня до категории pk """
+        return [self.categories[p] for p in reversed([pk, *self.ancestors(pk)])]
+
+    def rollup(self, amounts: Mapping[int | None, int]) -> dict[int, int]:
+        """
+        Суммирует значения amounts (id категории -> сумма по самой категории)
+        по поддеревьям за один проход снизу вверх: возвращает для каждой
+        категории сумму по ней и всем ее потомкам
+        """
+        totals = {pk: amounts.get(pk, 0) for pk in self.order}
+        # в обратном порядке обхода потомки идут раньше предков
+        for pk in reversed(self.order):
+            parent = self.parent[pk]
+            if parent in totals:
+                totals[parent] += totals[pk]
+        return totals
+
+    def spent(self, repo: AbstractRepository[Any],
+              lower: str | None = None, upper: str | None = None,
+              date_field: str = 'expense_date') -> dict[int, int]:
+        """
+        Суммы трат по поддеревьям категорий за полуинтервал дат
+        [lower, upper) (None - без ограничения) одним запросом
+        с группировкой по категории. repo - репозиторий трат или
+        сводной таблицы сумм по дням (тогда date_field='day').
+        """
+        conditions: list[Filter] = []
+        if lower is not None:
+            conditions.append(Ge(date_field, lower))
+        if upper is not None:
+            conditions.append(Lt(date_field, upper))
+        amounts = repo.sum('amount', where=And(*conditions), group_by='category')
+        return self.rollup(amounts)
@@ -0,0 +1,25 @@
+"""
+Описан класс, представляющий сумму трат за день в одной категории
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class DailyTotal:
+    """
+    Сумма трат за день (строка сводной таблицы, только для чтения).
+    Траты без даты в сводную таблицу не входят.
+    day - день в формате YYYY-MM-DD
+    category - id категории расходов
+    amount - сумма трат
+    count - количество трат
+    pk - id записи в базе данных
+    """
+    __indexes__ = (('day', 'category'),)
+
+    day: str
+    category: int | None
+    amount: int = 0
+    count: int = 0
+    pk: int = 0
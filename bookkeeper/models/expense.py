@@ -17,9 +17,11 @@ class Expense:
     comment - комментарий
     pk - id записи в базе данных
     """
+    __indexes__ = ('expense_date', 'category')
+
     amount: int
     category: int
     expense_date: str = datetime.now().isoformat(sep='\t', timespec='minutes')
     added_date: str = datetime.now().isoformat(sep='\t', timespec='minutes')
     comment: str = ''
-    pk: int = 0
\ No newline at end of file
+    pk: int = 0
@@ -7,7 +7,11 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, Protocol, Any
+from heapq import nlargest, nsmallest
+from operator import attrgetter
+from typing import Generic, TypeVar, Protocol, Any, Iterable, Iterator
+
+from bookkeeper.repository.filters import Where, OrderBy, Between, select, to_filter
 
 
 class Model(Protocol):  # pylint: disable=too-few-public-methods
@@ -19,6 +23,66 @@ class Model(Protocol):  # pylint: disable=too-few-public-methods
 
 T = TypeVar('T', bound=Model)
 
+# агрегирующие функции, поддерживаемые методом aggregate
+AGGREGATES = ('sum', 'count', 'min', 'max', 'avg')
+
+# курсор постраничной выборки: (значение поля сортировки, pk) последней записи
+Cursor = tuple[Any, int]
+
+
+def paginate(objs: list[T], field: str, limit: int) -> tuple[list[T], Cursor | None]:
+    """
+    Возвращает страницу из первых limit объектов objs (упорядоченных
+    по полю field и pk) и курсор следующей страницы: (field, pk) последнего
+    объекта страницы, если за ней есть еще объекты, иначе None
+    """
+    page = objs[:limit]
+    if len(objs) <= limit or not page:
+        return page, None
+    last = page[-1]
+    return page, (getattr(last, field), last.pk)  # type: ignore
+
+
+class _Accumulator:
+    """
+    Накапливает значение агрегирующей функции func за один проход.
+    Значения None пропускаются (как в SQL).
+    """
+
+    def __init__(self, func: str) -> None:
+        if func not in AGGREGATES:
+            raise ValueError(f'unknown aggregate function "{func}"')
+        self.func = func
+        self.count = 0
+        self.value: Any = None
+
+    def add(self, value: Any) -> None:
+        """ Учитывает очередное значение """
+        if value is None:
+            return
+        self.count += 1
+        if self.value is None:
+            self.value = 1 if self.func == 'count' else value
+        elif self.func == 'count':
+            self.value += 1
+        elif self.func in ('sum', 'avg'):
+            self.value += value
+        elif self.func == 'min':
+            self.value = min(self.value, value)
+        elif self.func == 'max':
+            self.value = max(self.value, value)
+
+    def result(self) -> Any:
+        """
+        Возвращает значение функции: для пустого набора sum и count
+        возвращают 0, остальные функции - None
+        """
+        if self.count == 0:
+            return 0 if self.func in ('sum', 'count') else None
+        if self.func == 'avg':
+            return self.value / self.count
+        return self.value
+
 
 class AbstractRepository(ABC, Generic[T]):
     """
@@ -29,6 +93,13 @@ class AbstractRepository(ABC, Generic[T]):
     get_all
     update
     delete
+    Пакетные методы add_many, get_many, delete_many по умолчанию
+    вызывают одиночные методы в цикле, а запрос по диапазону get_between
+    перебирает все записи; наследники могут их переопределить для
+    выполнения одним запросом с использованием индексов.
+    Агрегирующий запрос aggregate (и его сокращения sum, count) по умолчанию
+    вычисляется за один проход по записям, постраничная выборка get_page -
+    отбором limit первых записей за один проход.
     """
 
     @abstractmethod
@@ -43,12 +114,28 @@ class AbstractRepository(ABC, Generic[T]):
         """ Получить объект по id """
 
     @abstractmethod
-    def get_all(self, where: dict[str, Any] | None = None) -> list[T]:
+    def get_all(self, where: Where = None,
+                order_by: OrderBy = None, limit: int | None = None) -> list[T]:
         """
         Получить все записи по некоторому условию
-        where - условие в виде словаря {'название_поля': значение}
+        where - условие в виде фильтра (см. модуль filters) или словаря
+        {'название_поля': значение} (равенство всех указанных полей),
         если условие не задано (по умолчанию), вернуть все записи
+        order_by - поле или список полей для сортировки,
+        префикс '-' означает сортировку по убыванию
+        limit - максимальное количество возвращаемых записей
+        """
+
+    def iter_all(self, where: Where = None,
+                 batch_size: int = 1000,  # pylint: disable=unused-argument
+                 order_by: OrderBy = None, limit: int | None = None) -> Iterator[T]:
+        """
+        Перебрать все записи по некоторому условию (как в get_all),
+        не загружая их в память целиком: объекты создаются по мере
+        перебора, из хранилища читается не более batch_size записей за раз.
+        Реализация по умолчанию перебирает результат get_all.
         """
+        yield from self.get_all(where, order_by=order_by, limit=limit)
 
     @abstractmethod
     def get_all_like(self, like: dict[str, str]) -> list[T]:
@@ -59,6 +146,122 @@ class AbstractRepository(ABC, Generic[T]):
         содержаться внутри реального значения поля
         """
 
+    def get_between(self, field: str, lower: Any, upper: Any) -> list[T]:
+        """
+        Получить все записи, у которых значение поля field лежит
+        в полуинтервале [lower, upper), в порядке возрастания значения.
+        Реализация по умолчанию перебирает все записи; наследники
+        используют для этого запроса индекс.
+        """
+        return select(self.get_all(), Between(field, lower, upper), order_by=field)
+
+    def get_descendants(self, pk: int, parent_field: str = 'parent') -> list[T]:
+        """
+        Получить всех потомков записи с id pk в иерархии, заданной
+        ссылками на id родителя в поле parent_field (детей, их детей и т.д.),
+        в порядке возрастания id. Реализация по умолчанию перебирает
+        все записи; SQLiteRepository выполняет один рекурсивный запрос.
+        """
+        children: dict[Any, list[T]] = {}
+        for obj in self.iter_all():
+            children.setdefault(getattr(obj, parent_field), []).append(obj)
+        found: dict[int, T] = {}
+        stack = [pk]
+        while stack:
+            for child in children.get(stack.pop(), ()):
+                if child.pk not in found and child.pk != pk:
+                    found[child.pk] = child  # type: ignore
+                    stack.append(child.pk)  # type: ignore
+        return [found[key] for key in sorted(found)]
+
+    def get_ancestors(self, pk: int, parent_field: str = 'parent') -> list[T]:
+        """
+        Получить предков записи с id pk в иерархии, заданной ссылками
+        на id родителя в поле parent_field, от родителя до верхнего уровня.
+        Реализация по умолчанию запрашивает записи по одной;
+        SQLiteRepository выполняет один рекурсивный запрос.
+        """
+        result: list[T] = []
+        seen = {pk}
+        obj = self.get(pk)
+        while obj is not None:
+            parent = getattr(obj, parent_field)
+            if parent is None or parent in seen:
+                break
+            seen.add(parent)
+            obj = self.get(parent)
+            if obj is not None:
+                result.append(obj)
+        return result
+
+    def get_page(self, field: str, limit: int, cursor: Cursor | None = None,
+                 where: Where = None,
+                 descending: bool = True) -> tuple[list[T], Cursor | None]:
+        """
+        Получить страницу из не более чем limit записей, упорядоченных
+        по полю field и затем по pk (по убыванию, если descending),
+        и курсор для получения следующей страницы (None - страниц больше нет).
+        Страница начинается после записи, на которой закончилась
+        предыдущая (cursor, None - с начала), поэтому время запроса
+        не зависит от номера страницы. where - условие, как в get_all.
+        Записи без значения поля field (None, в SQLite - NULL) не возвращаются
+        ни на одной странице: их нельзя сравнить с курсором. Например,
+        траты без даты не попадают в постраничную таблицу расходов
+        и доступны только через get_all.
+        """
+        key = attrgetter(field, 'pk')
+        objs = (obj for obj in self.iter_all(where) if getattr(obj, field) is not None)
+        if cursor is not None:
+            objs = (obj for obj in objs
+                    if (key(obj) < cursor if descending else key(obj) > cursor))
+        pick = nlargest if descending else nsmallest
+        return paginate(pick(limit + 1, objs, key=key), field, limit)
+
+    def aggregate(self, func: str, field: str,
+                  where: Where = None,
+                  group_by: str | None = None,
+                  between: tuple[str, Any, Any] | None = None) -> Any:
+        """
+        Вычислить агрегирующую функцию func (sum, count, min, max, avg)
+        по полю field среди записей, удовлетворяющих условию where
+        (как в get_all) и условию между between = (поле, нижняя граница,
+        верхняя граница) (как в get_between). Для count в качестве поля
+        можно передать '*' - тогда считаются все записи.
+        Если задано поле group_by, возвращает словарь
+        {значение group_by: значение функции}, иначе - одно значение.
+        """
+        empty = _Accumulator(func)
+        if between is None:
+            objs: Iterable[T] = self.iter_all(where)
+        else:
+            objs = self.get_between(*between)
+            flt = to_filter(where)
+            if flt is not None:
+                objs = (obj for obj in objs if flt.match(obj))
+        groups: dict[Any, _Accumulator] = {}
+        for obj in objs:
+            key = None if group_by is None else getattr(obj, group_by)
+            if key not in groups:
+                groups[key] = _Accumulator(func)
+            groups[key].add(1 if field == '*' else getattr(obj, field))
+        if group_by is None:
+            return groups.get(None, empty).result()
+        return {key: acc.result() for key, acc in groups.items()}
+
+    def sum(self, field: str,
+            where: Where = None,
+            group_by: str | None = None,
+            between: tuple[str, Any, Any] | None = None) -> Any:
+        """ Сумма значений поля field, см. aggregate """
+        return self.aggregate('sum', field, where, group_by, between)
+
+    def count(self,
+              where: Where = None,
+              group_by: str | None = None,
+              between: tuple[str, Any, Any] | None = None) -> Any:
+        """ Количество записей, см. aggregate """
+        return self.aggregate('count', '*', where, group_by, between)
+
     @abstractmethod
     def update(self, obj: T) -> None:
         """ Обновить данные об объекте. Объект должен содержать поле pk. """
@@ -66,3 +269,46 @@ class AbstractRepository(ABC, Generic[T]):
     @abstractmethod
     def delete(self, pk: int) -> None:
         """ Удалить запись """
+
+    def add_many(self, objs: Iterable[T]) -> list[int | None]:
+        """
+        Добавить несколько объектов в репозиторий, вернуть список их id,
+        также записать id в атрибут pk каждого объекта.
+        """
+        return [self.add(obj) for obj in objs]
+
+    def get_many(self, pks: Iterable[int]) -> list[T]:
+        """
+        Получить объекты по списку id в порядке следования id,
+        отсутствующие в репозитории id пропускаются
+        """
+        return [obj for obj in map(self.get, pks) if obj is not None]
+
+    def delete_many(self, pks: Iterable[int]) -> None:
+        """ Удалить записи по списку id """
+        for pk in pks:
+            self.delete(pk)
+
+    def update_where(self, where: Where, values: dict[str, Any]) -> int:
+        """
+        Присвоить полям values (название -> значение) всех объектов,
+        удовлетворяющих условию where, новые значения.
+        Возвращает количество измененных объектов.
+        """
+        if 'pk' in values:
+            raise ValueError('primary key cannot be updated')
+        objs = self.get_all(where)
+        for obj in objs:
+            for field, value in values.items():
+                setattr(obj, field, value)
+            self.update(obj)
+        return len(objs)
+
+    def delete_where(self, where: Where) -> int:
+        """
+        Удалить все объекты, удовлетворяющие условию where,
+        вернуть количество удаленных объектов
+        """
+        pks: list[int] = [obj.pk for obj in self.get_all(where)]  # type: ignore
+        self.delete_many(pks)
+        return len(pks)
@@ -0,0 +1,247 @@
+"""
+Модуль описывает асинхронные репозитории для работы из цикла событий asyncio:
+методы-сопрограммы не блокируют цикл событий на операциях с диском
+"""
+# pylint: disable=too-many-instance-attributes
+
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from types import TracebackType
+from typing import Any, AsyncIterator, Callable, Generic, Iterable
+
+from bookkeeper.repository.abstract_repository import AbstractRepository, T
+from bookkeeper.repository.filters import Where, OrderBy
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.sqlite_repository import SQLiteRepository, connect
+
+
+class AsyncRepository(ABC, Generic[T]):
+    """
+    Абстрактный асинхронный репозиторий.
+    Методы повторяют AbstractRepository, но являются сопрограммами,
+    перебор записей выполняется асинхронным итератором aiter_all.
+    Репозиторий закрывается методом close (или при выходе из блока
+    async with).
+    """
+
+    @abstractmethod
+    async def add(self, obj: T) -> int | None:
+        """
+        Добавить объект в репозиторий, вернуть id объекта,
+        также записать id в атрибут pk.
+        """
+
+    @abstractmethod
+    async def get(self, pk: int) -> T | None:
+        """ Получить объект по id """
+
+    @abstractmethod
+    async def get_all(self, where: Where = None,
+                      order_by: OrderBy = None, limit: int | None = None) -> list[T]:
+        """ Получить все записи по некоторому условию (см. AbstractRepository) """
+
+    @abstractmethod
+    async def get_all_like(self, like: dict[str, str]) -> list[T]:
+        """ Получить все записи по условию вхождения подстрок """
+
+    async def aiter_all(self, where: Where = None,
+                        batch_size: int = 1000,  # pylint: disable=unused-argument
+                        order_by: OrderBy = None,
+                        limit: int | None = None) -> AsyncIterator[T]:
+        """
+        Асинхронно перебрать все записи по некоторому условию (как в get_all).
+        Реализация по умолчанию перебирает результат get_all.
+        """
+        for obj in await self.get_all(where, order_by, limit):
+            yield obj
+
+    @abstractmethod
+    async def aggregate(self, func: str, field: str,
+                        where: Where = None,
+                        group_by: str | None = None,
+                        between: tuple[str, Any, Any] | None = None) -> Any:
+        """ Вычислить агрегирующую функцию (см. AbstractRepository.aggregate) """
+
+    @abstractmethod
+    async def update(self, obj: T) -> None:
+        """ Обновить данные об объекте. Объект должен содержать поле pk. """
+
+    @abstractmethod
+    async def delete(self, pk: int) -> None:
+        """ Удалить запись """
+
+    async def close(self) -> None:
+        """ Освобождает ресурсы репозитория """
+
+    async def __aenter__(self) -> 'AsyncRepository[T]':
+        return self
+
+    async def __aexit__(self, exc_type: type[BaseException] | None,
+                        exc_val: BaseException | None,
+                        exc_tb: TracebackType | None) -> None:
+        await self.close()
+
+
+class AsyncMemoryRepository(AsyncRepository[T]):
+    """
+    Асинхронный репозиторий, работающий в оперативной памяти.
+    Операции выполняются сразу (без дискового ввода-вывода)
+    над вложенным репозиторием repo (по умолчанию - новый MemoryRepository).
+    """
+
+    def __init__(self, repo: AbstractRepository[T] | None = None) -> None:
+        self.repo: AbstractRepository[T] = MemoryRepository() if repo is None else repo
+
+    async def add(self, obj: T) -> int | None:
+        return self.repo.add(obj)
+
+    async def get(self, pk: int) -> T | None:
+        return self.repo.get(pk)
+
+    async def get_all(self, where: Where = None,
+                      order_by: OrderBy = None, limit: int | None = None) -> list[T]:
+        return self.repo.get_all(where, order_by, limit)
+
+    async def get_all_like(self, like: dict[str, str]) -> list[T]:
+        return self.repo.get_all_like(like)
+
+    async def aggregate(self, func: str, field: str,
+                        where: Where = None,
+                        group_by: str | None = None,
+                        between: tuple[str, Any, Any] | None = None) -> Any:
+        return self.repo.aggregate(func, field, where, group_by, between)
+
+    async def update(self, obj: T) -> None:
+        self.repo.update(obj)
+
+    async def delete(self, pk: int) -> None:
+        self.repo.delete(pk)
+
+
+class AsyncSQLiteRepository(AsyncRepository[T]):
+    """
+    Асинхронный репозиторий, работающий c базой данных SQLite.
+    Запросы выполняет SQLiteRepository в фоновых потоках, каждый
+    со своим соединением: изменения - в одном потоке записи (по очереди),
+    чтения - в пуле из readers потоков (параллельно, журнал WAL
+    позволяет читать во время записи). Модуль sqlite3 отпускает GIL
+    на время выполнения запроса, поэтому параллельные чтения ускоряются.
+    Каждый перебор aiter_all выполняется в отдельном потоке со своим
+    соединением, пока перебор не закончится. Таблица и индексы создаются
+    при открытии первого соединения, остальные соединения схему
+    не проверяют.
+    """
+
+    def __init__(self, db_file: str, cls: type, readers: int = 4) -> None:
+        self.db_file = db_file
+        self.cls = cls
+        self._writer = ThreadPoolExecutor(max_workers=1,
+                                          thread_name_prefix='sqlite-writer')
+        self._readers = ThreadPoolExecutor(max_workers=readers,
+                                           thread_name_prefix='sqlite-reader')
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._repos: list[SQLiteRepository[T]] = []
+        self._schema_ready = False
+
+    def _open(self) -> SQLiteRepository[T]:
+        """ Создает репозиторий с новым соединением (в текущем потоке) """
+        connection = connect(self.db_file, check_same_thread=False)
+        with self._lock:
+            if not self._schema_ready:
+                repo: SQLiteRepository[T] = SQLiteRepository(self.db_file, self.cls,
+                                                             connection)
+                self._schema_ready = True
+                return repo
+        return SQLiteRepository(self.db_file, self.cls, connection, create_table=False)
+
+    def _repo(self) -> SQLiteRepository[T]:
+        """ Возвращает репозиторий текущего фонового потока """
+        repo: SQLiteRepository[T] | None = getattr(self._local, 'repo', None)
+        if repo is None:
+            repo = self._local.repo = self._open()
+            with self._lock:
+                self._repos.append(repo)
+        return repo
+
+    async def _run(self, executor: ThreadPoolExecutor, method: str,
+                   *args: Any) -> Any:
+        """ Выполняет метод method репозитория фонового потока в executor """
+        def call() -> Any:
+            return getattr(self._repo(), method)(*args)
+        return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+    async def add(self, obj: T) -> int | None:
+        return await self._run(self._writer, 'add', obj)  # type: ignore
+
+    async def add_many(self, objs: Iterable[T]) -> list[int | None]:
+        """ Добавить несколько объектов одной транзакцией """
+        return await self._run(self._writer, 'add_many', list(objs))  # type: ignore
+
+    async def get(self, pk: int) -> T | None:
+        return await self._run(self._readers, 'get', pk)  # type: ignore
+
+    async def get_all(self, where: Where = None,
+                      order_by: OrderBy = None, limit: int | None = None) -> list[T]:
+        return await self._run(  # type: ignore
+            self._readers, 'get_all', where, order_by, limit)
+
+    async def get_all_like(self, like: dict[str, str]) -> list[T]:
+        return await self._run(self._readers, 'get_all_like', like)  # type: ignore
+
+    async def aiter_all(self, where: Where = None, batch_size: int = 1000,
+                        order_by: OrderBy = None,
+                        limit: int | None = None) -> AsyncIterator[T]:
+        loop = asyncio.get_running_loop()
+
+        def run(func: Callable[..., Any], *args: Any) -> Any:
+            return loop.run_in_executor(executor, func, *args)
+
+        with ThreadPoolExecutor(max_workers=1,
+                                thread_name_prefix='sqlite-iter') as executor:
+            repo = await run(self._open)
+            objs: Any = None  # генератор SQLiteRepository.iter_all
+
+            def finish() -> None:
+                # курсор закрывается до соединения, в том же потоке
+                if objs is not None:
+                    objs.close()
+                repo.connection.close()
+
+            try:
+                objs = await run(repo.iter_all, where, batch_size, order_by, limit)
+                while batch := await run(lambda: list(islice(objs, batch_size))):
+                    for obj in batch:
+                        yield obj
+            finally:
+                await run(finish)
+
+    async def aggregate(self, func: str, field: str,
+                        where: Where = None,
+                        group_by: str | None = None,
+                        between: tuple[str, Any, Any] | None = None) -> Any:
+        return await self._run(self._readers, 'aggregate',
+                               func, field, where, group_by, between)
+
+    async def update(self, obj: T) -> None:
+        await self._run(self._writer, 'update', obj)
+
+    async def delete(self, pk: int) -> None:
+        await self._run(self._writer, 'delete', pk)
+
+    async def delete_many(self, pks: Iterable[int]) -> None:
+        """ Удалить записи по списку id одной транзакцией """
+        await self._run(self._writer, 'delete_many', list(pks))
+
+    async def close(self) -> None:
+        """ Дожидается выполнения запросов и закрывает соединения """
+        loop = asyncio.get_running_loop()
+        for executor in (self._writer, self._readers):
+            await loop.run_in_executor(None, executor.shutdown)
+        with self._lock:
+            for repo in self._repos:
+                repo.connection.close()
+            self._repos.clear()
@@ -0,0 +1,248 @@
+"""
+Модуль описывает кеширующий репозиторий - обертку над другим репозиторием,
+которая хранит результаты запросов get и get_all в оперативной памяти
+"""
+# pylint: disable=too-many-instance-attributes
+
+from collections import OrderedDict
+from copy import copy
+from sys import getsizeof
+from typing import Any, Iterable, Iterator
+
+from bookkeeper.repository.abstract_repository import AbstractRepository, T, Cursor
+from bookkeeper.repository.filters import Where, OrderBy, Filter, And, Contains, \
+    to_filter, order_fields
+
+
+def _sizeof(value: Any) -> int:
+    """
+    Оценивает объем памяти, занимаемый объектом модели
+    или списком объектов (с учетом значений их полей)
+    """
+    if isinstance(value, list):
+        return getsizeof(value) + sum(map(_sizeof, value))
+    fields = getattr(value, '__dict__', None) or {
+        name: getattr(value, name, None) for name in getattr(value, '__slots__', ())
+    }
+    return getsizeof(value) + sum(getsizeof(v) for v in fields.values())
+
+
+def _clone(obj: T) -> T:
+    """
+    Возвращает поверхностную копию объекта модели
+    (быстрее copy.copy для объектов с __dict__ или __slots__)
+    """
+    cls = type(obj)
+    slots = getattr(cls, '__slots__', None)
+    if hasattr(obj, '__dict__'):
+        clone = object.__new__(cls)
+        clone.__dict__.update(obj.__dict__)
+        return clone
+    if not isinstance(slots, tuple) or cls.__bases__ != (object,):
+        return copy(obj)
+    clone = object.__new__(cls)
+    for name in slots:
+        setattr(clone, name, getattr(obj, name))
+    return clone
+
+
+class _Entry:  # pylint: disable=too-few-public-methods
+    """
+    Запись кеша: результат запроса value, id входящих в него объектов pks,
+    условие запроса flt (для get_all) и оценка занимаемой памяти size
+    """
+
+    def __init__(self, value: Any, pks: set[int], flt: Filter | None,
+                 size: int) -> None:
+        self.value = value
+        self.pks = pks
+        self.flt = flt
+        self.size = size
+
+
+class CachedRepository(AbstractRepository[T]):
+    """
+    Репозиторий, кеширующий результаты запросов get и get_all
+    к вложенному репозиторию repo. Изменения (add, update, delete)
+    сразу передаются во вложенный репозиторий, а из кеша удаляются только
+    те результаты, на которые они могли повлиять: содержащие измененный
+    объект или с условием, которому он удовлетворяет.
+    Из кеша вытесняются давно не использованные результаты (LRU),
+    если их больше max_entries или они занимают больше max_bytes байт
+    (None - ограничения нет). Количество попаданий и промахов хранится
+    в атрибутах hits и misses.
+    Объекты возвращаются копиями, поэтому их изменение до вызова update
+    не портит кеш. Если модель ссылается внешним ключом на саму себя,
+    удаление записи очищает кеш целиком: база данных обнуляет ссылки
+    на удаленную запись. Изменения, сделанные в обход этого репозитория
+    (например, другим репозиторием той же базы данных), кеш не видит.
+    """
+
+    def __init__(self, repo: AbstractRepository[T],
+                 max_entries: int | None = 1024,
+                 max_bytes: int | None = None) -> None:
+        self.repo = repo
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._cache: OrderedDict[Any, _Entry] = OrderedDict()
+        # удаление записи может изменить ссылающиеся на нее записи
+        # этой же таблицы (внешний ключ модели на саму себя)
+        cls = getattr(repo, 'obj_cls', None)
+        foreign_keys = getattr(cls, '__foreign_keys__', None) or {}
+        self._cascades = getattr(repo, 'table_name', None) in foreign_keys.values()
+
+    def clear(self) -> None:
+        """ Очищает кеш """
+        self._cache.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def _lookup(self, key: Any) -> _Entry | None:
+        """ Возвращает запись кеша по ключу key, учитывая попадание или промах """
+        entry = self._cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._cache.move_to_end(key)
+        return entry
+
+    def _store(self, key: Any, value: Any, pks: set[int],
+               flt: Filter | None = None) -> None:
+        """ Сохраняет результат запроса в кеше и вытесняет лишние записи """
+        entry = _Entry(value, pks, flt, _sizeof(value))
+        self._cache[key] = entry
+        self.size += entry.size
+        while self._cache and (
+                (self.max_entries is not None and len(self._cache) > self.max_entries)
+                or (self.max_bytes is not None and self.size > self.max_bytes)):
+            self.size -= self._cache.popitem(last=False)[1].size
+
+    def _invalidate(self, pks: Iterable[int | None], objs: Iterable[T] = ()) -> None:
+        """
+        Удаляет из кеша результаты, которые устарели после изменения
+        объектов с id из pks: содержащие их, а также результаты get_all
+        с условием, которому удовлетворяет новый вариант объекта из objs
+        """
+        pks = set(pks)
+        objs = list(objs)
+        stale = [key for key, entry in self._cache.items()
+                 if (key[0] == 'get' and key[1] in pks) or not entry.pks.isdisjoint(pks)
+                 or (key[0] == 'all' and objs and (
+                     entry.flt is None or any(map(entry.flt.match, objs))))]
+        for key in stale:
+            self.size -= self._cache.pop(key).size
+
+    def add(self, obj: T) -> int | None:
+        pk = self.repo.add(obj)
+        self._invalidate([pk], [obj])
+        return pk
+
+    def add_many(self, objs: Iterable[T]) -> list[int | None]:
+        objs = list(objs)
+        pks = self.repo.add_many(objs)
+        self._invalidate(pks, objs)
+        return pks
+
+    def get(self, pk: int) -> T | None:
+        key = ('get', pk)
+        entry = self._lookup(key)
+        if entry is None:
+            obj = self.repo.get(pk)
+            self._store(key, obj, set() if obj is None else {pk})
+        else:
+            obj = entry.value
+        return None if obj is None else _clone(obj)
+
+    def get_many(self, pks: Iterable[int]) -> list[T]:
+        pks = list(pks)
+        found: dict[int, T | None] = {}
+        for pk in pks:
+            entry = self._lookup(('get', pk))
+            if entry is not None:
+                found[pk] = entry.value
+        missing = [pk for pk in pks if pk not in found]
+        if missing:
+            for obj in self.repo.get_many(missing):
+                found[obj.pk] = obj  # type: ignore
+                self._store(('get', obj.pk), obj, {obj.pk})  # type: ignore
+        return [_clone(obj) for obj in (found.get(pk) for pk in pks) if obj is not None]
+
+    def get_all(self, where: Where = None,
+                order_by: OrderBy = None, limit: int | None = None) -> list[T]:
+        flt = to_filter(where)
+        key = ('all', flt, tuple(order_fields(order_by)), limit)
+        entry = self._lookup(key)
+        if entry is None:
+            objs = self.repo.get_all(flt, order_by, limit)
+            self._store(key, objs, {obj.pk for obj in objs}, flt)  # type: ignore
+        else:
+            objs = entry.value
+        return list(map(_clone, objs))
+
+    def iter_all(self, where: Where = None, batch_size: int = 1000,
+                 order_by: OrderBy = None, limit: int | None = None) -> Iterator[T]:
+        # перебор предназначен для больших выборок, они не кешируются
+        return self.repo.iter_all(where, batch_size, order_by, limit)
+
+    def get_all_like(self, like: dict[str, str]) -> list[T]:
+        return self.get_all(And(*(Contains(f, v) for f, v in like.items())))
+
+    def get_between(self, field: str, lower: Any, upper: Any) -> list[T]:
+        return self.repo.get_between(field, lower, upper)
+
+    def get_descendants(self, pk: int, parent_field: str = 'parent') -> list[T]:
+        return self.repo.get_descendants(pk, parent_field)
+
+    def get_ancestors(self, pk: int, parent_field: str = 'parent') -> list[T]:
+        return self.repo.get_ancestors(pk, parent_field)
+
+    def get_page(self, field: str, limit: int, cursor: Cursor | None = None,
+                 where: Where = None,
+                 descending: bool = True) -> tuple[list[T], Cursor | None]:
+        return self.repo.get_page(field, limit, cursor, where, descending)
+
+    def aggregate(self, func: str, field: str,
+                  where: Where = None,
+                  group_by: str | None = None,
+                  between: tuple[str, Any, Any] | None = None) -> Any:
+        return self.repo.aggregate(func, field, where, group_by, between)
+
+    def update(self, obj: T) -> None:
+        self.repo.update(obj)
+        self._invalidate([obj.pk], [obj])
+
+    def _invalidate_deleted(self, pks: list[int]) -> None:
+        """ Удаляет из кеша результаты, устаревшие после удаления записей pks """
+        # измененные каскадом объекты неизвестны, кеш очищается целиком
+        if self._cascades:
+            self.clear()
+        else:
+            self._invalidate(pks)
+
+    def delete(self, pk: int) -> None:
+        self.repo.delete(pk)
+        self._invalidate_deleted([pk])
+
+    def delete_many(self, pks: Iterable[int]) -> None:
+        pks = list(pks)
+        self.repo.delete_many(pks)
+        self._invalidate_deleted(pks)
+
+    def update_where(self, where: Where, values: dict[str, Any]) -> int:
+        # измененные объекты неизвестны без лишнего запроса, кеш очищается целиком
+        updated = self.repo.update_where(where, values)
+        if updated:
+            self.clear()
+        return updated
+
+    def delete_where(self, where: Where) -> int:
+        deleted = self.repo.delete_where(where)
+        if deleted:
+            self.clear()
+        return deleted
@@ -0,0 +1,506 @@
+"""
+Модуль описывает поколоночное хранилище трат в оперативной памяти
+на массивах NumPy (numpy - необязательная зависимость, нужна только
+этому модулю; устанавливается командой poetry install --extras analytics)
+"""
+# pylint: disable=too-many-instance-attributes
+
+import operator
+from datetime import date
+from functools import reduce
+from types import SimpleNamespace
+from typing import Any, Callable, Iterable, Iterator
+
+try:
+    import numpy as np
+    import numpy.typing as npt
+except ImportError as error:
+    raise ImportError('ExpenseColumnStore requires numpy: '
+                      'poetry install --extras analytics') from error
+
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.abstract_repository import AbstractRepository, AGGREGATES
+from bookkeeper.repository.filters import Where, OrderBy, Filter, FieldFilter, And, \
+    Eq, In, Ge, Compare, Between, Prefix, Contains, to_filter, select, prefix_bounds
+
+# значение столбцов категории и дня, означающее None
+NULL = np.iinfo(np.int32).min
+
+Mask = npt.NDArray[np.bool_]
+
+_COMPARE: dict[str, Callable[[Any, Any], Any]] = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+    '==': operator.eq,
+}
+
+
+class _Dictionary:
+    """
+    Словарное кодирование значений столбца: значение хранится один раз
+    в списке values, а в столбце - его номер (код)
+    """
+
+    def __init__(self) -> None:
+        self.values: list[Any] = []
+        self.codes: dict[Any, int] = {}
+
+    def encode(self, value: Any) -> int:
+        """ Возвращает код значения value, добавляя его при необходимости """
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def table(self, predicate: Callable[[Any], bool]) -> Mask:
+        """ Таблица код -> выполнено ли условие predicate для значения """
+        return np.fromiter(map(predicate, self.values), bool, len(self.values))
+
+
+class ExpenseColumnStore(AbstractRepository[Expense]):  # type: ignore
+    """
+    Репозиторий трат для аналитических запросов: траты хранятся
+    не объектами, а параллельными типизированными массивами:
+    сумма - int64, категория - int32, день траты - порядковый номер
+    дня (int32) и остаток даты после дня (время) - код словаря,
+    дата добавления и комментарий - коды словарей. id траты - номер
+    строки + 1; удаленные строки помечаются в массиве alive и не
+    переиспользуются. Объекты Expense создаются только при выдаче
+    результатов get и get_all.
+    Условия на сумму, категорию, дату траты и pk, а также суммы
+    и группировка (aggregate, totals_by_day) вычисляются над массивами
+    целиком, условия на поля со словарями - проверкой каждого значения
+    словаря один раз. Остальные условия проверяются на объектах.
+    Дата траты должна начинаться с дня в формате YYYY-MM-DD.
+    """
+    numeric = ('amount', 'category', 'pk')
+    encoded = ('added_date', 'comment')
+    columns = ('amount', 'category', 'day', 'time', 'added_date', 'comment')
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.size = 0
+        self.amount = np.zeros(capacity, np.int64)
+        self.category = np.zeros(capacity, np.int32)
+        self.day = np.zeros(capacity, np.int32)
+        self.time = np.zeros(capacity, np.int32)
+        self.added_date = np.zeros(capacity, np.int32)
+        self.comment = np.zeros(capacity, np.int32)
+        self.alive = np.zeros(capacity, np.bool_)
+        self.dictionaries = {'time': _Dictionary(), 'added_date': _Dictionary(),
+                             'comment': _Dictionary()}
+        self._days: dict[int, str] = {}
+
+    # --- хранение ---------------------------------------------------------
+
+    def _reserve(self, count: int) -> None:
+        """ Увеличивает массивы (вдвое), чтобы в них поместилось еще count строк """
+        needed = self.size + count
+        capacity = len(self.alive)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in (*self.columns, 'alive'):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def _encode_date(self, value: str | None) -> tuple[int, int]:
+        """ Номер дня и код времени для даты траты value """
+        if value is None:
+            return NULL, self.dictionaries['time'].encode(None)
+        day = _ordinal(value[:10])
+        if day is None:
+            raise ValueError(f'expense_date "{value}" should start '
+                             'with a date in YYYY-MM-DD format')
+        return day, self.dictionaries['time'].encode(value[10:])
+
+    def _encode(self, obj: Expense) -> tuple[int, ...]:
+        """ Значения столбцов (columns) строки для траты obj """
+        return (obj.amount,
+                NULL if obj.category is None else obj.category,
+                *self._encode_date(obj.expense_date),
+                self.dictionaries['added_date'].encode(obj.added_date),
+                self.dictionaries['comment'].encode(obj.comment))
+
+    def _write(self, rows: npt.NDArray[np.int64], values: list[tuple[int, ...]]) -> None:
+        """ Записывает значения столбцов values в строки с номерами rows """
+        for i, name in enumerate(self.columns):
+            getattr(self, name)[rows] = [row[i] for row in values]
+        self.alive[rows] = True
+
+    def _day_str(self, day: int) -> str:
+        """ Дата в формате YYYY-MM-DD по порядковому номеру дня """
+        if day not in self._days:
+            self._days[day] = date.fromordinal(day).isoformat()
+        return self._days[day]
+
+    def _make(self, rows: Iterable[int]) -> Iterator[Expense]:
+        """ Создает объекты трат по номерам строк rows """
+        rows = np.fromiter(rows, np.int64)
+        times = self.dictionaries['time'].values
+        added = self.dictionaries['added_date'].values
+        comments = self.dictionaries['comment'].values
+        for row, amount, category, day, time, added_date, comment in zip(
+                rows.tolist(), self.amount[rows].tolist(),
+                self.category[rows].tolist(), self.day[rows].tolist(),
+                self.time[rows].tolist(), self.added_date[rows].tolist(),
+                self.comment[rows].tolist()):
+            expense_date = None if day == NULL else self._day_str(day) + times[time]
+            yield Expense(amount, None if category == NULL else category,  # type: ignore
+                          expense_date,  # type: ignore
+                          added[added_date], comments[comment], row + 1)
+
+    def _row(self, pk: Any) -> int | None:
+        """ Номер строки траты с id pk или None, если ее нет """
+        if not isinstance(pk, (int, np.integer)) or not 0 < pk <= self.size:
+            return None
+        return int(pk) - 1 if self.alive[pk - 1] else None
+
+    # --- условия ----------------------------------------------------------
+
+    def _numeric(self, field: str) -> npt.NDArray[Any]:
+        """ Столбец числового поля """
+        if field == 'pk':
+            return np.arange(1, self.size + 1)
+        return getattr(self, field)[:self.size]  # type: ignore
+
+    def _match_numeric(self, flt: FieldFilter) -> Mask | None:
+        """ Маска условия на числовое поле (None - условие не поддерживается) """
+        column = self._numeric(flt.field)
+        nulls = column == NULL if flt.field == 'category' \
+            else np.zeros(self.size, np.bool_)
+        if isinstance(flt, Eq):
+            return nulls if flt.value is None else column == flt.value
+        if isinstance(flt, In):
+            mask = np.isin(column, [v for v in flt.values if v is not None])
+            return mask | nulls if None in flt.values else mask
+        if isinstance(flt, Compare):
+            mask = _COMPARE[flt.operator](column, flt.value)
+        elif isinstance(flt, Between):
+            mask = (column >= flt.lower) & (column < flt.upper)
+        else:
+            return None
+        return mask & ~nulls  # type: ignore
+
+    def _compare_date(self, op: str, bound: str) -> Mask:
+        """
+        Маска сравнения op даты траты (строки "день" + "время") со строкой
+        bound. Если день не является началом bound, результат определяется
+        сравнением дня с bound (номер первого дня, не меньшего bound,
+        находится двоичным поиском), иначе - сравнением времени
+        с остатком bound (по таблице для словаря времени).
+        """
+        days = self.day[:self.size]
+        low, high = 1, date.max.toordinal() + 1
+        while low < high:
+            mid = (low + high) // 2
+            if date.fromordinal(mid).isoformat() < bound:
+                low = mid + 1
+            else:
+                high = mid
+        compare = _COMPARE[op]
+        if op in ('<', '<='):
+            mask = days < low
+        elif op in ('>', '>='):
+            mask = days >= low
+        else:
+            mask = np.zeros(self.size, np.bool_)
+        pivot = _ordinal(bound[:10])
+        if pivot is not None:
+            rest = bound[10:]
+            table = self.dictionaries['time'].table(
+                lambda t: t is not None and bool(compare(t, rest)))
+            pivot_rows = days == pivot
+            mask = np.where(pivot_rows, table[self.time[:self.size]], mask)
+        return mask & (days != NULL)  # type: ignore
+
+    def _match_date(self, flt: FieldFilter) -> Mask | None:
+        """ Маска условия на дату траты (None - условие не поддерживается) """
+        days = self.day[:self.size]
+        if isinstance(flt, Prefix):
+            flt = Between(flt.field, *prefix_bounds(flt.prefix)) if flt.prefix \
+                else Ge(flt.field, '')
+        if isinstance(flt, Eq):
+            if flt.value is None:
+                return days == NULL  # type: ignore
+            return self._compare_date('==', flt.value)
+        if isinstance(flt, In):
+            return reduce(operator.or_, (self._match_date(Eq(flt.field, value))
+                                         for value in flt.values),
+                          np.zeros(self.size, np.bool_))
+        if isinstance(flt, Compare):
+            return self._compare_date(flt.operator, flt.value)
+        if isinstance(flt, Between):
+            lower = self._compare_date('>=', flt.lower)
+            return lower & self._compare_date('<', flt.upper)
+        return None
+
+    def _match_encoded(self, flt: FieldFilter) -> Mask:
+        """ Маска условия на поле со словарем: условие проверяется на словаре """
+        table = self.dictionaries[flt.field].table(
+            lambda value: flt.match(SimpleNamespace(**{flt.field: value})))
+        return table[getattr(self, flt.field)[:self.size]]  # type: ignore
+
+    def _mask(self, flt: Filter | None) -> Mask:
+        """ Маска строк (среди неудаленных), удовлетворяющих условию flt """
+        alive = self.alive[:self.size]
+        if flt is None:
+            return alive
+        if isinstance(flt, And):
+            result = alive.copy()
+            for sub in flt.filters:
+                result &= self._mask(sub)
+            return result
+        mask: Mask | None = None
+        if isinstance(flt, FieldFilter):
+            if flt.field in self.numeric:
+                mask = self._match_numeric(flt)
+            elif flt.field == 'expense_date':
+                mask = self._match_date(flt)
+            elif flt.field in self.encoded:
+                mask = self._match_encoded(flt)
+            else:
+                raise ValueError(f'unknown field "{flt.field}"')
+        if mask is None:
+            # условие, которое не вычисляется над массивами, проверяется на объектах
+            rows = np.flatnonzero(alive)
+            mask = np.zeros(self.size, np.bool_)
+            mask[rows] = np.fromiter(map(flt.match, self._make(rows)), bool, len(rows))
+        return mask & alive
+
+    def filter(self, where: Where = None) -> npt.NDArray[np.int64]:
+        """ id трат, удовлетворяющих условию where (массив по возрастанию) """
+        return np.flatnonzero(self._mask(to_filter(where))) + 1
+
+    # --- AbstractRepository -----------------------------------------------
+
+    def add(self, obj: Expense) -> int | None:
+        return self.add_many([obj])[0]
+
+    def add_many(self, objs: Iterable[Expense]) -> list[int | None]:
+        objs = list(objs)
+        for obj in objs:
+            if getattr(obj, 'pk', None) != 0:
+                raise ValueError(f'trying to add object {obj} with filled `pk` attribute')
+        values = [self._encode(obj) for obj in objs]
+        self._reserve(len(objs))
+        first = self.size
+        self.size += len(objs)
+        self._write(np.arange(first, self.size), values)
+        for pk, obj in enumerate(objs, start=first + 1):
+            obj.pk = pk
+        return [obj.pk for obj in objs]
+
+    def get(self, pk: int) -> Expense | None:
+        row = self._row(pk)
+        return None if row is None else next(self._make([row]))
+
+    def get_many(self, pks: Iterable[int]) -> list[Expense]:
+        rows = [row for row in map(self._row, pks) if row is not None]
+        return list(self._make(rows))
+
+    def iter_all(self, where: Where = None, batch_size: int = 1000,
+                 order_by: OrderBy = None, limit: int | None = None) -> Iterator[Expense]:
+        if order_by is not None:
+            yield from self.get_all(where, order_by, limit)
+            return
+        rows = np.flatnonzero(self._mask(to_filter(where)))[:limit]
+        for start in range(0, len(rows), batch_size):
+            yield from self._make(rows[start:start + batch_size])
+
+    def get_all(self, where: Where = None,
+                order_by: OrderBy = None, limit: int | None = None) -> list[Expense]:
+        rows = np.flatnonzero(self._mask(to_filter(where)))
+        if order_by is None:
+            return list(self._make(rows[:limit]))
+        return select(self._make(rows), None, order_by, limit)
+
+    def get_all_like(self, like: dict[str, str]) -> list[Expense]:
+        return self.get_all(And(*(Contains(f, v) for f, v in like.items())))
+
+    def get_between(self, field: str, lower: Any, upper: Any) -> list[Expense]:
+        return self.get_all(Between(field, lower, upper), order_by=field)
+
+    def update(self, obj: Expense) -> None:
+        row = self._row(obj.pk)
+        if row is None:
+            raise ValueError('attempt to update object with unknown primary key')
+        self._write(np.array([row]), [self._encode(obj)])
+
+    def delete(self, pk: int) -> None:
+        self.delete_many([pk])
+
+    def delete_many(self, pks: Iterable[int]) -> None:
+        pks = set(pks)
+        rows = [row for row in map(self._row, pks) if row is not None]
+        if len(rows) != len(pks):
+            raise ValueError('attempt to delete object with unknown primary key')
+        self.alive[rows] = False
+
+    def update_where(self, where: Where, values: dict[str, Any]) -> int:
+        if 'pk' in values:
+            raise ValueError('primary key cannot be updated')
+        rows = np.flatnonzero(self._mask(to_filter(where)))
+        for field, value in values.items():
+            if field == 'expense_date':
+                self.day[rows], self.time[rows] = self._encode_date(value)
+            elif field == 'category':
+                self.category[rows] = NULL if value is None else value
+            elif field == 'amount':
+                self.amount[rows] = value
+            elif field in self.encoded:
+                getattr(self, field)[rows] = self.dictionaries[field].encode(value)
+            else:
+                raise ValueError(f'unknown field "{field}"')
+        return len(rows)
+
+    def delete_where(self, where: Where) -> int:
+        mask = self._mask(to_filter(where))
+        self.alive[:self.size] &= ~mask
+        return int(mask.sum())
+
+    # --- агрегирование ----------------------------------------------------
+
+    def _keys(self, field: str, rows: npt.NDArray[Any]
+              ) -> tuple[npt.NDArray[np.int64], Mask, Callable[[int], Any]]:
+        """
+        Ключи группировки по полю field для строк rows (номера строк
+        или маска) в виде целых чисел,
+        маска строк, где поле не заполнено (None), и функция,
+        восстанавливающая по ключу значение поля
+        """
+        if field in self.numeric:
+            keys = self._numeric(field)[rows].astype(np.int64)
+            return keys, keys == NULL, int
+        if field == 'expense_date':
+            times = self.dictionaries['time'].values
+            days = self.day[:self.size][rows].astype(np.int64)
+
+            def decode(key: int) -> Any:
+                day, time = divmod(key, len(times))
+                return self._day_str(day) + times[time]
+            keys = days * len(times) + self.time[:self.size][rows]
+            return keys, days == NULL, decode
+        if field in self.encoded:
+            keys = getattr(self, field)[:self.size][rows].astype(np.int64)
+            return keys, np.zeros(len(keys), np.bool_), \
+                self.dictionaries[field].values.__getitem__
+        raise ValueError(f'unknown field "{field}"')
+
+    def aggregate(self, func: str, field: str,
+                  where: Where = None,
+                  group_by: str | None = None,
+                  between: tuple[str, Any, Any] | None = None) -> Any:
+        if func not in AGGREGATES:
+            raise ValueError(f'unknown aggregate function "{func}"')
+        if field != '*' and field not in self.numeric:
+            return super().aggregate(func, field, where, group_by, between)
+        flt = to_filter(where)
+        if between is not None:
+            flt = Between(*between) if flt is None else flt & Between(*between)
+        mask = self._mask(flt)
+        if field == '*':
+            values = np.ones(np.count_nonzero(mask), np.int64)
+        else:
+            values = self._numeric(field)[mask]
+        valid = values != NULL if field == 'category' else None
+        if group_by is None:
+            return _reduce(func, values if valid is None else values[valid])
+        return _aggregate_groups(func, values, valid, self._keys(group_by, mask))
+
+    def totals_by_day(self, where: Where = None) -> dict[str, int]:
+        """ Суммы трат по дням (YYYY-MM-DD), удовлетворяющих условию where """
+        mask = self._mask(to_filter(where)) & (self.day[:self.size] != NULL)
+        uniques, sums = _group('sum', self.day[:self.size][mask].astype(np.int64),
+                               self.amount[:self.size][mask])
+        return dict(zip(map(self._day_str, uniques.tolist()), sums))
+
+
+def _ordinal(day: str) -> int | None:
+    """ Порядковый номер дня, заданного строкой YYYY-MM-DD, или None """
+    try:
+        ordinal = date.fromisoformat(day).toordinal()
+    except ValueError:
+        return None
+    # fromisoformat допускает и другие форматы (например, YYYYMMDD)
+    return ordinal if date.fromordinal(ordinal).isoformat() == day else None
+
+
+def _reduce(func: str, values: npt.NDArray[np.int64]) -> Any:
+    """ Значение агрегирующей функции func по всем значениям values """
+    if func == 'count':
+        return len(values)
+    if func == 'sum':
+        return int(values.sum())
+    if values.size == 0:
+        return None
+    if func == 'avg':
+        return float(values.mean())
+    return int(values.min() if func == 'min' else values.max())
+
+
+def _aggregate_groups(func: str, values: npt.NDArray[np.int64], valid: Mask | None,
+                      grouping: tuple[npt.NDArray[np.int64], Mask, Callable[[int], Any]]
+                      ) -> dict[Any, Any]:
+    """
+    Значения агрегирующей функции func по группам значений values;
+    grouping - ключи групп, маска незаполненных ключей (группа None)
+    и функция восстановления значения по ключу (см. _keys).
+    valid - маска заполненных значений: незаполненные пропускаются,
+    как в SQL, но группы из одних таких значений остаются в результате.
+    """
+    keys, nulls, decode = grouping
+    result: dict[Any, Any] = {}
+    if nulls.any():
+        in_nulls = values[nulls]
+        result[None] = _reduce(func, in_nulls if valid is None
+                               else in_nulls[valid[nulls]])
+        keys, values = keys[~nulls], values[~nulls]
+        valid = None if valid is None else valid[~nulls]
+    if valid is not None and not valid.all():
+        empty = _reduce(func, values[:0])
+        result.update(dict.fromkeys(map(decode, np.unique(keys[~valid]).tolist()),
+                                    empty))
+        keys, values = keys[valid], values[valid]
+    uniques, groups = _group(func, keys, values)
+    result.update(zip(map(decode, uniques.tolist()), groups))
+    return result
+
+
+def _group(func: str, keys: npt.NDArray[np.int64], values: npt.NDArray[np.int64]
+           ) -> tuple[npt.NDArray[np.int64], list[Any]]:
+    """
+    Значения агрегирующей функции func по группам значений values
+    с одинаковыми ключами keys: (ключи по возрастанию, значения).
+    Сумма и количество при небольшом разбросе ключей вычисляются
+    подсчетом (bincount), иначе - сортировкой по ключам.
+    """
+    if keys.size == 0:
+        return keys, []
+    low = int(keys.min())
+    span = int(keys.max()) - low + 1
+    exact = int(np.abs(values).sum()) < 2 ** 53  # суммы в float64 без потери точности
+    if func in ('sum', 'count', 'avg') and span <= max(len(keys), 1 << 16) and exact:
+        shifted = keys - low
+        counts = np.bincount(shifted, minlength=span)
+        present = np.flatnonzero(counts)
+        sums = np.rint(np.bincount(shifted, values, span)[present]).astype(np.int64)
+        counts = counts[present]
+        uniques = present + low
+    else:
+        order = np.argsort(keys, kind='stable')
+        keys, values = keys[order], values[order].astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        uniques = keys[starts]
+        counts = np.diff(np.r_[starts, len(keys)])
+        if func in ('min', 'max'):
+            ufunc = np.minimum if func == 'min' else np.maximum
+            return uniques, ufunc.reduceat(values, starts).tolist()
+        sums = np.add.reduceat(values, starts)
+    if func == 'count':
+        return uniques, counts.tolist()
+    if func == 'avg':
+        return uniques, (sums / counts).tolist()
+    return uniques, sums.tolist()
@@ -1,23 +1,144 @@
 """ Модуль, реализующий фабрику репозиториев наследованных от AbstractRepository """
-from collections.abc import Callable
-from typing import Any
+import sqlite3
+from contextlib import contextmanager
+from types import TracebackType
+from typing import Any, Iterator
 
 from bookkeeper.repository.abstract_repository import Model
+from bookkeeper.repository.cached_repository import CachedRepository
+from bookkeeper.repository.rollup import DailyTotalRepository
+from bookkeeper.repository.sqlite_repository import SQLiteRepository, connect
 
 
-def repository_factory(repo_type: Any, db_file: 'str | None' = None) -> \
-        Callable[[Model], Any]:
+class RepositoryFactory:  # pylint: disable=too-many-instance-attributes
+    """
+    Фабрика репозиториев заданного типа: repo_gen(model: Model) -> AbstractRepository
+    Если задан файл базы данных db_file, то все созданные фабрикой репозитории
+    используют одно общее соединение с базой данных, которое открывается
+    при создании первого репозитория и закрывается методом close
+    (или при выходе из блока with).
+    Если задан размер кеша cache_size (количество результатов запросов)
+    или cache_bytes (объем в байтах), то репозитории оборачиваются
+    в кеширующий репозиторий CachedRepository с такими ограничениями.
+    Метод transaction открывает единицу работы: изменения всех репозиториев
+    фабрики внутри блока with фиксируются одной транзакцией.
+    Если включена сводная таблица сумм трат по дням (rollup=True,
+    только для SQLite), метод daily_totals возвращает ее репозиторий.
+    Таблицу поддерживают триггеры, которые замедляют запись трат,
+    поэтому по умолчанию она не создается.
+    track_changes=True включает в репозиториях SQLite отслеживание
+    изменений: update записывает только изменившиеся столбцы
+    (см. SQLiteRepository).
+    """
+
+    def __init__(self, repo_type: Any,  # pylint: disable=too-many-arguments
+                 db_file: 'str | None' = None,
+                 cache_size: int | None = None,
+                 cache_bytes: int | None = None,
+                 *, rollup: bool = False,
+                 track_changes: bool = False) -> None:
+        self.repo_type = repo_type
+        self.db_file = db_file
+        self.cache_size = cache_size
+        self.cache_bytes = cache_bytes
+        self.rollup = rollup
+        self.track_changes = track_changes
+        self.connection: sqlite3.Connection | None = None
+        self._caches: list[CachedRepository[Any]] = []
+        self._sqlite_repos: list[SQLiteRepository[Any]] = []
+
+    def __call__(self, model: Model) -> Any:
+        if self.db_file is None:
+            repo = self.repo_type[model](cls=model)
+        else:
+            if self.connection is None:
+                self.connection = connect(self.db_file)
+            repo = self.repo_type[model](db_file=self.db_file, cls=model,
+                                         connection=self.connection)
+            if isinstance(repo, SQLiteRepository):
+                repo.track_changes = self.track_changes
+                self._sqlite_repos.append(repo)
+        if self.cache_size is None and self.cache_bytes is None:
+            return repo
+        cached = CachedRepository(repo, self.cache_size, self.cache_bytes)
+        self._caches.append(cached)
+        return cached
+
+    def daily_totals(self) -> DailyTotalRepository | None:
+        """
+        Возвращает репозиторий сумм трат по дням и категориям, которые
+        поддерживает база данных, или None, если сводная таблица
+        не включена (rollup=False) или репозитории фабрики не работают
+        с SQLite. Результаты запросов не кешируются.
+        """
+        if not self.rollup or self.db_file is None or not (
+                isinstance(self.repo_type, type)
+                and issubclass(self.repo_type, SQLiteRepository)):
+            return None
+        if self.connection is None:
+            self.connection = connect(self.db_file)
+        return DailyTotalRepository(self.db_file, self.connection)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Выполняет блок with как единицу работы: все изменения, сделанные
+        в нем репозиториями фабрики, фиксируются одной транзакцией
+        при успешном завершении блока и откатываются при исключении
+        (вместе с очисткой кешей репозиториев и запомненных ими
+        значений полей объектов). Вложенный блок становится
+        частью внешней транзакции. Для репозиториев без базы данных
+        (db_file не задан) блок выполняется без транзакции.
+        """
+        if self.db_file is None:
+            yield
+            return
+        if self.connection is None:
+            self.connection = connect(self.db_file)
+        if self.connection.in_transaction:
+            yield
+            return
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            for cache in self._caches:
+                cache.clear()
+            for repo in self._sqlite_repos:
+                repo.clear_snapshots()
+            raise
+        self.connection.execute('COMMIT')
+
+    def close(self) -> None:
+        """ Закрывает общее соединение с базой данных """
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self) -> 'RepositoryFactory':
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None,
+                 exc_val: BaseException | None,
+                 exc_tb: TracebackType | None) -> None:
+        self.close()
+
+
+def repository_factory(repo_type: Any,  # pylint: disable=too-many-arguments
+                       db_file: 'str | None' = None,
+                       cache_size: int | None = None,
+                       cache_bytes: int | None = None,
+                       *, rollup: bool = False,
+                       track_changes: bool = False) -> RepositoryFactory:
     """
     Возвращает функцию-фабрику репозитория по типу
     repo_gen(model: Model) -> AbstractRepository
     Для реозитория типа SQLiteRepository необходим
-    путь к файлу базы данных db_file
+    путь к файлу базы данных db_file.
+    cache_size и cache_bytes включают кеширование, rollup - сводную
+    таблицу сумм трат по дням, track_changes - отслеживание изменений
+    объектов (см. RepositoryFactory)
     """
-    if db_file is None:
-        def repo_gen_db(model: Model) -> Any:
-            return repo_type[model]()
-        return repo_gen_db
-
-    def repo_gen(model: Model) -> Any:
-        return repo_type[model](db_file=db_file, cls=model)
-    return repo_gen
+    return RepositoryFactory(repo_type, db_file, cache_size, cache_bytes,
+                             rollup=rollup, track_changes=track_changes)
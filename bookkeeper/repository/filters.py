@@ -0,0 +1,309 @@
+"""
+Модуль описывает выражения-фильтры для запросов к репозиториям.
+Фильтр умеет преобразовываться в параметризованное условие SQL,
+пригодное для использования индексов, и проверяться на объекте
+(для репозиториев в оперативной памяти).
+
+Пример:
+    repo.get_all(Eq('category', 3) & Between('expense_date', '2023-01', '2023-02'),
+                 order_by='-expense_date', limit=50)
+
+Обычный словарь {'поле': значение} по-прежнему допускается в качестве
+условия и означает равенство всех перечисленных полей.
+"""
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Sequence
+from typing import Any, Iterable
+
+# функция, возвращающая выражение SQL для поля модели (и проверяющая его)
+Column = Callable[[str], str]
+
+
+def prefix_bounds(prefix: str) -> tuple[str, str]:
+    """
+    Возвращает полуинтервал [prefix, верхняя граница) строк,
+    начинающихся с непустой строкой prefix, что позволяет заменить поиск
+    по маске запросом по диапазону.
+    """
+    if not prefix:
+        raise ValueError('prefix should not be empty')
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class Filter(ABC):
+    """ Условие отбора записей """
+
+    @abstractmethod
+    def fields(self) -> set[str]:
+        """ Возвращает названия полей, используемых в условии """
+
+    @abstractmethod
+    def to_sql(self, column: Column) -> tuple[str, list[Any]]:
+        """ Возвращает условие SQL с плейсхолдерами ? и список параметров """
+
+    @abstractmethod
+    def match(self, obj: Any) -> bool:
+        """ Проверяет, удовлетворяет ли объект obj условию """
+
+    def __and__(self, other: 'Filter') -> 'And':
+        return And(self, other)
+
+
+class FieldFilter(Filter):  # pylint: disable=abstract-method
+    """ Условие на значение одного поля """
+
+    def __init__(self, field: str) -> None:
+        self.field = field
+
+    def fields(self) -> set[str]:
+        return {self.field}
+
+    def value_of(self, obj: Any) -> Any:
+        """ Возвращает значение поля объекта """
+        return getattr(obj, self.field, None)
+
+    def __eq__(self, other: object) -> bool:
+        return type(self) is type(other) and vars(self) == vars(other)
+
+    def __hash__(self) -> int:
+        return hash((type(self), self.field))
+
+    def __repr__(self) -> str:
+        args = ', '.join(repr(v) for v in vars(self).values())
+        return f'{type(self).__name__}({args})'
+
+
+class Eq(FieldFilter):
+    """ Значение поля равно value (для None - поле не заполнено) """
+
+    def __init__(self, field: str, value: Any) -> None:
+        super().__init__(field)
+        self.value = value
+
+    def to_sql(self, column: Column) -> tuple[str, list[Any]]:
+        if self.value is None:
+            return f'{column(self.field)} IS NULL', []
+        return f'{column(self.field)} = ?', [self.value]
+
+    def match(self, obj: Any) -> bool:
+        return bool(self.value_of(obj) == self.value)
+
+
+class IsNull(Eq):
+    """ Поле не заполнено (None) """
+
+    def __init__(self, field: str) -> None:
+        super().__init__(field, None)
+
+
+class In(FieldFilter):
+    """ Значение поля входит в набор values """
+
+    def __init__(self, field: str, values: Iterable[Any]) -> None:
+        super().__init__(field)
+        self.values = frozenset(values)
+
+    def to_sql(self, column: Column) -> tuple[str, list[Any]]:
+        if not self.values:
+            return '0', []
+        questions = ', '.join('?' * len(self.values))
+        return f'{column(self.field)} IN ({questions})', list(self.values)
+
+    def match(self, obj: Any) -> bool:
+        return self.value_of(obj) in self.values
+
+
+class Compare(FieldFilter):
+    """ Сравнение значения поля с value; записи с None не подходят """
+    operator: str = ''
+
+    def __init__(self, field: str, value: Any) -> None:
+        super().__init__(field)
+        self.value = value
+
+    def to_sql(self, column: Column) -> tuple[str, list[Any]]:
+        return f'{column(self.field)} {self.operator} ?', [self.value]
+
+    def match(self, obj: Any) -> bool:
+        value = self.value_of(obj)
+        return value is not None and self.compare(value)
+
+    @abstractmethod
+    def compare(self, value: Any) -> bool:
+        """ Сравнивает заполненное значение поля с self.value """
+
+
+class Lt(Compare):
+    """ Значение поля меньше value """
+    operator = '<'
+
+    def compare(self, value: Any) -> bool:
+        return bool(value < self.value)
+
+
+class Le(Compare):
+    """ Значение поля не больше value """
+    operator = '<='
+
+    def compare(self, value: Any) -> bool:
+        return bool(value <= self.value)
+
+
+class Gt(Compare):
+    """ Значение поля больше value """
+    operator = '>'
+
+    def compare(self, value: Any) -> bool:
+        return bool(value > self.value)
+
+
+class Ge(Compare):
+    """ Значение поля не меньше value """
+    operator = '>='
+
+    def compare(self, value: Any) -> bool:
+        return bool(value >= self.value)
+
+
+class Between(FieldFilter):
+    """ Значение поля лежит в полуинтервале [lower, upper) """
+
+    def __init__(self, field: str, lower: Any, upper: Any) -> None:
+        super().__init__(field)
+        self.lower = lower
+        self.upper = upper
+
+    def to_sql(self, column: Column) -> tuple[str, list[Any]]:
+        col = column(self.field)
+        return f'{col} >= ? AND {col} < ?', [self.lower, self.upper]
+
+    def match(self, obj: Any) -> bool:
+        value = self.value_of(obj)
+        return value is not None and bool(self.lower <= value < self.upper)
+
+
+class Prefix(FieldFilter):
+    """
+    Строковое значение поля начинается с prefix.
+    В SQL выражается диапазоном, поэтому может использовать индекс.
+    """
+
+    def __init__(self, field: str, prefix: str) -> None:
+        super().__init__(field)
+        self.prefix = prefix
+
+    def to_sql(self, column: Column) -> tuple[str, list[Any]]:
+        col = column(self.field)
+        if not self.prefix:
+            # строковые значения в SQLite больше любых чисел
+            return f'{col} >= ?', ['']
+        lower, upper = prefix_bounds(self.prefix)
+        return f'{col} >= ? AND {col} < ?', [lower, upper]
+
+    def match(self, obj: Any) -> bool:
+        value = self.value_of(obj)
+        return isinstance(value, str) and value.startswith(self.prefix)
+
+
+class Contains(FieldFilter):
+    """
+    Строковое значение поля содержит подстроку value
+    (условие LIKE '%value%', индексы не используются)
+    """
+
+    def __init__(self, field: str, value: str) -> None:
+        super().__init__(field)
+        self.value = value
+
+    def to_sql(self, column: Column) -> tuple[str, list[Any]]:
+        return f'{column(self.field)} LIKE ?', [f'%{self.value}%']
+
+    def match(self, obj: Any) -> bool:
+        return self.value in self.value_of(obj)
+
+
+class And(Filter):
+    """ Выполнены все условия """
+
+    def __init__(self, *filters: Filter) -> None:
+        self.filters: list[Filter] = []
+        for flt in filters:
+            # вложенные And раскрываются в плоский список условий
+            self.filters += flt.filters if isinstance(flt, And) else [flt]
+
+    def fields(self) -> set[str]:
+        return set().union(*(flt.fields() for flt in self.filters))
+
+    def to_sql(self, column: Column) -> tuple[str, list[Any]]:
+        if not self.filters:
+            return '1', []
+        conditions = []
+        params: list[Any] = []
+        for flt in self.filters:
+            condition, flt_params = flt.to_sql(column)
+            conditions.append(condition)
+            params += flt_params
+        return ' AND '.join(conditions), params
+
+    def match(self, obj: Any) -> bool:
+        return all(flt.match(obj) for flt in self.filters)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, And) and self.filters == other.filters
+
+    def __hash__(self) -> int:
+        return hash(tuple(self.filters))
+
+    def __repr__(self) -> str:
+        return f'And({", ".join(repr(flt) for flt in self.filters)})'
+
+
+# условие запроса: фильтр, словарь равенств или None (все записи)
+Where = Filter | dict[str, Any] | None
+
+
+def to_filter(where: Where) -> Filter | None:
+    """ Приводит условие where к фильтру (словарь - к And из Eq) """
+    if where is None or isinstance(where, Filter):
+        return where
+    return And(*(Eq(field, value) for field, value in where.items()))
+
+
+# порядок сортировки: поле или последовательность полей,
+# префикс '-' означает сортировку по убыванию
+OrderBy = str | Sequence[str] | None
+
+
+def order_fields(order_by: OrderBy) -> list[tuple[str, bool]]:
+    """ Возвращает список пар (поле, по убыванию) для порядка order_by """
+    if order_by is None:
+        return []
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    return [(f[1:], True) if f.startswith('-') else (f, False) for f in order_by]
+
+
+def select(objs: Iterable[Any], where: Where = None,
+           order_by: OrderBy = None, limit: int | None = None) -> list[Any]:
+    """
+    Отбирает из objs объекты по условию where, сортирует их в порядке
+    order_by (значения None считаются наименьшими, как в SQLite)
+    и возвращает не более limit первых
+    """
+    flt = to_filter(where)
+    result = list(objs) if flt is None else [obj for obj in objs if flt.match(obj)]
+    for field, descending in reversed(order_fields(order_by)):
+        result.sort(key=sort_key(field), reverse=descending)
+    return result if limit is None else result[:limit]
+
+
+def sort_key(field: str) -> Callable[[Any], tuple[bool, Any]]:
+    """
+    Возвращает ключ сортировки объектов по полю field,
+    при котором None меньше любого значения
+    """
+    def key(obj: Any) -> tuple[bool, Any]:
+        value = getattr(obj, field, None)
+        return value is not None, value
+    return key
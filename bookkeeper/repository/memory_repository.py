@@ -2,20 +2,235 @@
 Модуль описывает репозиторий, работающий в оперативной памяти
 """
 
+from bisect import bisect_left, bisect_right, insort
+from inspect import get_annotations
 from itertools import count
-from typing import Any
+from operator import itemgetter
+from typing import Any, Iterable, Iterator, TypeVar
 
-from bookkeeper.repository.abstract_repository import AbstractRepository, T
+from bookkeeper.repository.abstract_repository import AbstractRepository, T, \
+    Cursor, paginate
+from bookkeeper.repository.filters import Where, OrderBy, Filter, And, Contains, \
+    Eq, In, Between, Lt, Le, Gt, Ge, Prefix, order_fields, prefix_bounds, select, \
+    to_filter
+
+_value = itemgetter(0)
+
+
+class _HashIndex:
+    """
+    Хеш-индекс по полю: словарь значение -> множество pk
+    и словарь pk -> значение для удаления устаревших записей
+    """
+
+    def __init__(self, field: str) -> None:
+        self.field = field
+        self.buckets: dict[Any, set[int]] = {}
+        self.values: dict[int, Any] = {}
+
+    def add(self, pk: int, obj: Any) -> None:
+        """ Добавляет объект obj с id pk в индекс """
+        value = getattr(obj, self.field, None)
+        self.buckets.setdefault(value, set()).add(pk)
+        self.values[pk] = value
+
+    def remove(self, pk: int) -> None:
+        """ Удаляет из индекса запись с id pk, если она есть """
+        if pk not in self.values:
+            return
+        value = self.values.pop(pk)
+        bucket = self.buckets[value]
+        bucket.discard(pk)
+        if not bucket:
+            del self.buckets[value]
+
+    def lookup(self, flt: Filter) -> set[int] | None:
+        """
+        Возвращает id объектов, удовлетворяющих условию равенства flt
+        (Eq или In), или None для условий другого вида
+        """
+        if isinstance(flt, Eq):
+            return set(self.buckets.get(flt.value, ()))
+        if isinstance(flt, In):
+            result: set[int] = set()
+            for value in flt.values:
+                result |= self.buckets.get(value, set())
+            return result
+        return None
+
+
+class _SortedIndex:
+    """
+    Упорядоченный индекс по полю: список пар (значение, pk), отсортированный
+    по значению, и словарь pk -> значение для удаления устаревших записей.
+    Объекты со значением None в индекс не попадают.
+    """
+
+    def __init__(self, field: str) -> None:
+        self.field = field
+        self.keys: list[tuple[Any, int]] = []
+        self.values: dict[int, Any] = {}
+
+    def add(self, pk: int, obj: Any) -> None:
+        """ Добавляет объект obj с id pk в индекс """
+        value = getattr(obj, self.field, None)
+        if value is None:
+            return
+        insort(self.keys, (value, pk))
+        self.values[pk] = value
+
+    def remove(self, pk: int) -> None:
+        """ Удаляет из индекса запись с id pk, если она есть """
+        if pk not in self.values:
+            return
+        key = (self.values.pop(pk), pk)
+        del self.keys[bisect_left(self.keys, key)]
+
+    def scan(self, lower: Any = None, upper: Any = None,
+             include_lower: bool = True, include_upper: bool = False) -> list[int]:
+        """
+        Возвращает id объектов со значением поля между lower и upper
+        (None - граница не задана) в порядке возрастания значения
+        """
+        start, stop = 0, len(self.keys)
+        if lower is not None:
+            find = bisect_left if include_lower else bisect_right
+            start = find(self.keys, lower, key=_value)
+        if upper is not None:
+            find = bisect_right if include_upper else bisect_left
+            stop = find(self.keys, upper, lo=start, key=_value)
+        return [pk for _, pk in self.keys[start:stop]]
+
+    def between(self, lower: Any, upper: Any) -> list[int]:
+        """ Возвращает id объектов со значением поля в [lower, upper) """
+        return self.scan(lower, upper)
+
+    def after(self, cursor: Cursor | None, descending: bool) -> Iterator[int]:
+        """
+        Перебирает id объектов в порядке (значение, pk), начиная
+        после пары cursor (None - с начала)
+        """
+        if descending:
+            stop = len(self.keys) if cursor is None else bisect_left(self.keys, cursor)
+            return (self.keys[i][1] for i in range(stop - 1, -1, -1))
+        start = 0 if cursor is None else bisect_right(self.keys, cursor)
+        return (self.keys[i][1] for i in range(start, len(self.keys)))
+
+    def lookup(self, flt: Filter) -> list[int] | None:
+        """
+        Возвращает id объектов, удовлетворяющих условию сравнения,
+        диапазона или префикса flt, или None для условий другого вида
+        """
+        if isinstance(flt, Eq) and flt.value is not None:
+            return self.scan(flt.value, flt.value, include_upper=True)
+        if isinstance(flt, Between):
+            return self.between(flt.lower, flt.upper)
+        if isinstance(flt, Prefix) and flt.prefix:
+            return self.between(*prefix_bounds(flt.prefix))
+        if isinstance(flt, Lt | Le) and flt.value is not None:
+            return self.scan(upper=flt.value, include_upper=isinstance(flt, Le))
+        if isinstance(flt, Gt | Ge) and flt.value is not None:
+            return self.scan(flt.value, include_lower=isinstance(flt, Ge))
+        return None
+
+
+_Index = TypeVar('_Index', _HashIndex, _SortedIndex)
 
 
 class MemoryRepository(AbstractRepository[T]):
     """
     Репозиторий, работающий в оперативной памяти. Хранит данные в словаре.
+    Может поддерживать вторичные индексы по полям: хеш-индексы
+    (hash_indexes) для условий равенства и упорядоченные индексы
+    (sorted_indexes) для условий сравнения, диапазона и префикса.
+    Индексы обновляются при добавлении, изменении и удалении объектов
+    и используются в запросах автоматически, если подходят к условию.
+    Для запросов по диапазону (get_between) упорядоченный индекс по полю
+    строится при первом запросе, если его не было.
+    Если задан класс модели cls, названия полей в запросах проверяются
+    (как в SQLiteRepository): для неизвестного поля - ValueError.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, hash_indexes: Iterable[str] = (),
+                 sorted_indexes: Iterable[str] = (),
+                 cls: type | None = None) -> None:
+        self.fields = None if cls is None else set(get_annotations(cls, eval_str=True))
         self._container: dict[int | None, T] = {}
         self._counter = count(1)
+        self._hash_indexes: dict[str, _HashIndex] = {}
+        self._sorted_indexes: dict[str, _SortedIndex] = {}
+        for field in hash_indexes:
+            self.create_index(field)
+        for field in sorted_indexes:
+            self.create_index(field, kind='sorted')
+
+    def _check(self, *fields: str | None) -> None:
+        """ Проверяет, что fields - поля модели (None пропускаются) """
+        if self.fields is None:
+            return
+        for field in fields:
+            if field is not None and field != 'pk' and field not in self.fields:
+                raise ValueError(f'unknown field "{field}"')
+
+    def create_index(self, field: str, kind: str = 'hash') -> None:
+        """
+        Создает индекс по полю field и заполняет его имеющимися объектами.
+        kind - вид индекса: 'hash' (равенство) или 'sorted' (диапазоны)
+        """
+        if kind == 'hash':
+            if field not in self._hash_indexes:
+                self._hash_indexes[field] = self._fill(_HashIndex(field))
+        elif kind == 'sorted':
+            if field not in self._sorted_indexes:
+                self._sorted_indexes[field] = self._fill(_SortedIndex(field))
+        else:
+            raise ValueError(f'unknown index kind "{kind}"')
+
+    def _fill(self, index: _Index) -> _Index:
+        """ Заполняет индекс index имеющимися объектами """
+        for pk, obj in self._container.items():
+            index.add(pk, obj)  # type: ignore
+        return index
+
+    def _index_add(self, pk: int, obj: T) -> None:
+        for index in self._hash_indexes.values():
+            index.add(pk, obj)
+        for sorted_index in self._sorted_indexes.values():
+            sorted_index.add(pk, obj)
+
+    def _index_remove(self, pk: int) -> None:
+        for index in self._hash_indexes.values():
+            index.remove(pk)
+        for sorted_index in self._sorted_indexes.values():
+            sorted_index.remove(pk)
+
+    def _lookup(self, flt: Filter) -> list[int] | set[int] | None:
+        """
+        Возвращает id объектов, которые могут удовлетворять условию flt,
+        найденные по индексу, или None, если подходящего индекса нет
+        """
+        field = getattr(flt, 'field', None)
+        if field in self._hash_indexes:
+            pks = self._hash_indexes[field].lookup(flt)
+            if pks is not None:
+                return pks
+        if field in self._sorted_indexes:
+            return self._sorted_indexes[field].lookup(flt)
+        return None
+
+    def _candidates(self, flt: Filter | None) -> Iterable[T]:
+        """
+        Возвращает объекты, среди которых нужно искать удовлетворяющие
+        условию flt: по самому избирательному из подходящих индексов
+        (в порядке добавления) или все объекты, если индекс не подходит
+        """
+        conditions = flt.filters if isinstance(flt, And) else [flt]
+        found = [pks for pks in map(self._lookup, filter(None, conditions))
+                 if pks is not None]
+        if not found:
+            return self._container.values()
+        pks = min(found, key=len)
+        return [self._container[pk] for pk in sorted(pks)]
 
     def add(self, obj: T) -> int | None:
         if getattr(obj, 'pk', None) != 0:
@@ -23,25 +238,97 @@ class MemoryRepository(AbstractRepository[T]):
         pk = next(self._counter)
         self._container[pk] = obj
         obj.pk = pk
+        self._index_add(pk, obj)
         return pk
 
+    def add_many(self, objs: Iterable[T]) -> list[int | None]:
+        objs = list(objs)
+        for obj in objs:
+            if getattr(obj, 'pk', None) != 0:
+                raise ValueError(f'trying to add object {obj} with filled `pk` attribute')
+        return [self.add(obj) for obj in objs]
+
     def get(self, pk: int) -> T | None:
         return self._container.get(pk)
 
-    def get_all(self, where: dict[str, Any] | None = None) -> list[T]:
-        if where is None:
-            return list(self._container.values())
-        return [obj for obj in self._container.values()
-                if all(getattr(obj, attr) == value for attr, value in where.items())]
+    def get_many(self, pks: Iterable[int]) -> list[T]:
+        return [self._container[pk] for pk in pks if pk in self._container]
+
+    def iter_all(self, where: Where = None, batch_size: int = 1000,
+                 order_by: OrderBy = None, limit: int | None = None) -> Iterator[T]:
+        # объекты уже находятся в памяти, batch_size не используется
+        return iter(self.get_all(where, order_by, limit))
+
+    def get_all(self, where: Where = None,
+                order_by: OrderBy = None, limit: int | None = None) -> list[T]:
+        flt = to_filter(where)
+        if flt is not None:
+            self._check(*flt.fields())
+        self._check(*(field for field, _ in order_fields(order_by)))
+        return select(self._candidates(flt), flt, order_by, limit)
 
     def get_all_like(self, like: dict[str, str]) -> list[T]:
-        return [obj for obj in self._container.values()
-                if all(value in getattr(obj, attr) for attr, value in like.items())]
+        return self.get_all(And(*(Contains(f, v) for f, v in like.items())))
+
+    def get_between(self, field: str, lower: Any, upper: Any) -> list[T]:
+        self._check(field)
+        self.create_index(field, kind='sorted')
+        index = self._sorted_indexes[field]
+        return [self._container[pk] for pk in index.between(lower, upper)]
+
+    def get_page(self, field: str, limit: int, cursor: Cursor | None = None,
+                 where: Where = None,
+                 descending: bool = True) -> tuple[list[T], Cursor | None]:
+        # упорядоченный индекс хранит пары (значение, pk) в нужном порядке
+        self._check(field)
+        flt = to_filter(where)
+        if flt is not None:
+            self._check(*flt.fields())
+        self.create_index(field, kind='sorted')
+        objs: list[T] = []
+        for pk in self._sorted_indexes[field].after(cursor, descending):
+            obj = self._container[pk]
+            if flt is None or flt.match(obj):
+                objs.append(obj)
+                if len(objs) > limit:
+                    break
+        return paginate(objs, field, limit)
+
+    def get_descendants(self, pk: int, parent_field: str = 'parent') -> list[T]:
+        self._check(parent_field)
+        return super().get_descendants(pk, parent_field)
+
+    def get_ancestors(self, pk: int, parent_field: str = 'parent') -> list[T]:
+        self._check(parent_field)
+        return super().get_ancestors(pk, parent_field)
+
+    def aggregate(self, func: str, field: str,
+                  where: Where = None,
+                  group_by: str | None = None,
+                  between: tuple[str, Any, Any] | None = None) -> Any:
+        self._check(None if field == '*' else field, group_by)
+        return super().aggregate(func, field, where, group_by, between)
+
+    def update_where(self, where: Where, values: dict[str, Any]) -> int:
+        self._check(*values)
+        return super().update_where(where, values)
 
     def update(self, obj: T) -> None:
         if obj.pk == 0:
             raise ValueError('attempt to update object with unknown primary key')
+        self._index_remove(obj.pk)  # type: ignore
         self._container[obj.pk] = obj
+        self._index_add(obj.pk, obj)  # type: ignore
 
     def delete(self, pk: int) -> None:
         self._container.pop(pk)
+        self._index_remove(pk)
+
+    def delete_many(self, pks: Iterable[int]) -> None:
+        pks = set(pks)
+        missing = pks - self._container.keys()
+        if missing:
+            raise KeyError(min(missing))
+        for pk in pks:
+            del self._container[pk]
+            self._index_remove(pk)
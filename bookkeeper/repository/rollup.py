@@ -0,0 +1,105 @@
+"""
+Модуль описывает сводную таблицу сумм трат по дням и категориям
+(dailytotal) в базе данных SQLite. Таблицу поддерживают в соответствии
+с таблицей expense триггеры на добавление, изменение и удаление трат,
+поэтому она остается согласованной при любом способе изменения трат
+(в том числе из других соединений).
+
+Пересчет сводной таблицы существующей базы данных:
+    python -m bookkeeper.repository.rollup database/bookkeeper.db
+"""
+
+import sqlite3
+import sys
+
+from bookkeeper.models.daily_total import DailyTotal
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+
+def _add_sql(row: str, sign: str) -> str:
+    """
+    Возвращает запросы, прибавляющие трату row (NEW или OLD)
+    к сумме ее дня и категории со знаком sign. Траты без даты
+    не учитываются: для них не находится и не создается запись.
+    """
+    day = f"substr({row}.expense_date, 1, 10)"
+    match = f"day = {day} AND category IS {row}.category"
+    return (f"INSERT INTO dailytotal (day, category, amount, count) "
+            f"SELECT {day}, {row}.category, 0, 0 "
+            f"WHERE {row}.expense_date IS NOT NULL "
+            f"AND NOT EXISTS (SELECT 1 FROM dailytotal WHERE {match}); "
+            f"UPDATE dailytotal SET amount = amount {sign} {row}.amount, "
+            f"count = count {sign} 1 WHERE {match}; "
+            f"DELETE FROM dailytotal WHERE {match} AND count = 0;")
+
+
+TRIGGERS = {
+    'dailytotal_insert': f"AFTER INSERT ON expense BEGIN {_add_sql('NEW', '+')} END",
+    'dailytotal_delete': f"AFTER DELETE ON expense BEGIN {_add_sql('OLD', '-')} END",
+    'dailytotal_update': ("AFTER UPDATE OF amount, category, expense_date ON expense "
+                          f"BEGIN {_add_sql('OLD', '-')} {_add_sql('NEW', '+')} END"),
+}
+
+REBUILD_SQL = ("INSERT INTO dailytotal (day, category, amount, count) "
+               "SELECT substr(expense_date, 1, 10), category, "
+               "coalesce(sum(amount), 0), count(*) "
+               "FROM expense WHERE expense_date IS NOT NULL GROUP BY 1, 2")
+
+
+class DailyTotalRepository(SQLiteRepository[DailyTotal]):  # type: ignore
+    """
+    Репозиторий сводной таблицы сумм трат по дням и категориям.
+    Таблица и триггеры создаются при первом подключении к базе данных,
+    при этом суммы вычисляются по имеющимся тратам. Записи изменяются
+    только триггерами: методы изменения репозитория не используются.
+    Запросы по периодам читают по одной записи на день и категорию
+    вместо всех трат за период.
+    """
+    # записи изменяют триггеры, запомненные значения полей устаревали бы
+    track_changes = False
+
+    def __init__(self, db_file: str,
+                 connection: sqlite3.Connection | None = None) -> None:
+        super().__init__(db_file, DailyTotal, connection)
+        # таблица трат нужна триггерам
+        SQLiteRepository(db_file, Expense, self.connection)
+        if self.install():
+            self.rebuild()
+
+    def install(self) -> bool:
+        """
+        Создает недостающие триггеры и пересоздает триггеры прежних версий,
+        возвращает True, если триггеры изменились (суммы нужно пересчитать)
+        """
+        existing = dict(self.connection.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall())
+        changed = [name for name, body in TRIGGERS.items()
+                   if existing.get(name) != f'CREATE TRIGGER {name} {body}']
+        with self._transaction() as cur:
+            for name in changed:
+                cur.execute(f'DROP TRIGGER IF EXISTS {name}')
+                cur.execute(f'CREATE TRIGGER {name} {TRIGGERS[name]}')
+        return bool(changed)
+
+    def rebuild(self) -> None:
+        """ Вычисляет сводную таблицу заново по таблице трат """
+        with self._transaction() as cur:
+            cur.execute('DELETE FROM dailytotal')
+            cur.execute(REBUILD_SQL)
+
+
+def main(argv: list[str]) -> None:
+    """ Пересчитывает сводную таблицу в базе данных argv[1] """
+    if len(argv) != 2:
+        sys.exit('usage: python -m bookkeeper.repository.rollup <db_file>')
+    repo = DailyTotalRepository(argv[1])
+    try:
+        repo.rebuild()
+        print(f'{repo.count()} daily totals rebuilt in {argv[1]}')
+    finally:
+        repo.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
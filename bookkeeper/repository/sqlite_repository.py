@@ -1,110 +1,520 @@
 """
 Модуль описывает репозиторий, работающий в БД SQLite
 """
+# pylint: disable=too-many-instance-attributes
 
-from typing import Any
-from inspect import get_annotations
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import islice, starmap
+from operator import attrgetter
+from types import TracebackType
+from typing import Any, Callable, Iterable, Iterator
+from inspect import Parameter, get_annotations, signature
 import sqlite3
 
-from bookkeeper.repository.abstract_repository import AbstractRepository, T
+from bookkeeper.repository.abstract_repository import AbstractRepository, T, \
+    AGGREGATES, Cursor, paginate
+from bookkeeper.repository.filters import Where, OrderBy, And, Between, Contains, \
+    to_filter, order_fields
+from bookkeeper.repository.sqlite_schema import create_schema
+
+
+def connect(db_file: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """
+    Открывает соединение с базой данных db_file, настроенное для работы
+    репозиториев: журнал в режиме WAL, проверка внешних ключей и режим
+    автоматической фиксации (транзакции открываются явно).
+    check_same_thread=False разрешает использовать соединение
+    (например, закрывать его) не только в создавшем его потоке.
+    """
+    con = sqlite3.connect(db_file, isolation_level=None,
+                          check_same_thread=check_same_thread)
+    con.execute('PRAGMA journal_mode = WAL')
+    con.execute('PRAGMA synchronous = NORMAL')
+    con.execute('PRAGMA foreign_keys = ON')
+    return con
+
+
+def _chunks(values: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    """ Разбивает последовательность values на списки длиной не более size """
+    iterator = iter(values)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _positional_init(cls: type, names: list[str]) -> bool:
+    """
+    Проверяет, что объект класса cls можно создать, передав значения
+    полей names позиционно (в этом порядке) и не передавая остальные
+    """
+    try:
+        params = list(signature(cls).parameters.values())
+    except (TypeError, ValueError):
+        return False
+    positional = (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD)
+    head, tail = params[:len(names)], params[len(names):]
+    return ([p.name for p in head] == names
+            and all(p.kind in positional for p in head)
+            and all(p.default is not p.empty
+                    or p.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD)
+                    for p in tail))
+
+
+def _trusted_init(cls: type, names: list[str]) -> Callable[..., Any]:
+    """
+    Возвращает функцию создания объекта cls по значениям полей names,
+    переданным позиционно, для строк, прочитанных из базы данных.
+    Если модель проверяет значения полей в __post_init__, функция
+    присваивает поля без вызова конструктора (и проверок),
+    иначе это сам конструктор cls. Таких моделей (бюджеты) немного
+    и записей в них мало, поэтому поля присваиваются простым циклом
+    (у моделей со __slots__ нет __dict__ для __dict__.update).
+    """
+    if not hasattr(cls, '__post_init__'):
+        return cls
+
+    def make(*values: Any) -> Any:
+        obj: Any = object.__new__(cls)
+        for name, value in zip(names, values):
+            setattr(obj, name, value)
+        return obj
+    return make
+
+
+def _getter(names: list[str]) -> Callable[[Any], tuple[Any, ...]]:
+    """ Возвращает функцию, извлекающую из объекта кортеж значений полей names """
+    get = attrgetter(*names)
+    if len(names) == 1:
+        return lambda obj: (get(obj),)
+    return get
 
 
 class SQLiteRepository(AbstractRepository[T]):
     """
     Репозиторий, работающий c базой данных SQLite.
+    Соединение с базой данных открывается один раз при создании репозитория
+    и закрывается методом close (или при выходе из блока with).
+    Если соединение connection передано снаружи (например, общее
+    для всех репозиториев фабрики), то репозиторий его не закрывает.
+    Таблица с типизированными столбцами и первичным ключом pk создается
+    по аннотациям модели при создании репозитория, если ее еще нет
+    (create_table=False - таблица уже создана, схема не проверяется).
+    Модель может объявить индексы в атрибуте класса __indexes__:
+    последовательность названий полей или кортежей полей (составной индекс),
+    и внешние ключи в атрибуте __foreign_keys__: словарь название поля ->
+    таблица, на первичный ключ которой оно ссылается (при удалении записи
+    ссылки на нее получают значение NULL).
+    Тексты запросов и функции преобразования объектов в строки таблицы
+    и обратно строятся один раз при создании репозитория. Если конструктор
+    модели принимает поля в порядке аннотаций и затем pk, объекты
+    создаются из строк позиционно (без проверок __post_init__: данным
+    из базы данных репозиторий доверяет), иначе - по именам полей.
+    Если включено отслеживание изменений (track_changes = True),
+    репозиторий запоминает значения полей последних max_snapshots
+    прочитанных (get, get_many, get_all, get_page) и записанных объектов,
+    и update такого объекта обновляет только изменившиеся столбцы
+    (если не изменилось ничего - только проверяет, что запись есть).
+    Изменения остальных столбцов, сделанные в обход репозитория
+    (другим соединением, триггером или каскадом внешнего ключа
+    из другой таблицы), при этом сохраняются, а не перезаписываются
+    значениями объекта; после
+    отката транзакции фабрики запомненные значения сбрасываются
+    (clear_snapshots). По умолчанию отслеживание выключено,
+    фабрика репозиториев включает его параметром track_changes.
     """
     db_file: str
     table_name: str
     fields: dict[str, Any]
+    columns: str
     obj_cls: type
+    connection: sqlite3.Connection
+    # ограничение на количество параметров в одном запросе с IN (...)
+    max_variables: int = 500
+    # количество объектов, значения полей которых запоминаются для update
+    max_snapshots: int = 10000
+    track_changes: bool = False
 
-    def __init__(self, db_file: str, cls: type) -> None:
+    def __init__(self, db_file: str, cls: type,
+                 connection: sqlite3.Connection | None = None,
+                 create_table: bool = True) -> None:
         self.db_file = db_file
         self.table_name = cls.__name__.lower()
         self.fields = get_annotations(cls, eval_str=True)
         self.fields.pop('pk')
         self.obj_cls = cls
+        self._owns_connection = connection is None
+        self.connection = connect(db_file) if connection is None else connection
+        self.columns = ', '.join(self.fields)
+        indexes = getattr(cls, '__indexes__', ())
+        foreign_keys = getattr(cls, '__foreign_keys__', None) or {}
+        if create_table:
+            create_schema(self.connection, self.table_name, self.fields, indexes,
+                          foreign_keys)
+        # удаление записи может изменить ссылающиеся на нее записи этой же таблицы
+        self._cascades = self.table_name in foreign_keys.values()
+        self._snapshots: OrderedDict[int, tuple[Any, ...]] = OrderedDict()
+        self._partial_update_sql: dict[tuple[int, ...], str] = {}
+        self._compile()
+
+    def _compile(self) -> None:
+        """
+        Строит тексты запросов и функции преобразования для модели:
+        строки таблицы выбираются в виде (поля..., ROWID)
+        """
+        names = list(self.fields)
+        table = self.table_name
+        questions = ', '.join('?' * len(names))
+        assignments = ', '.join(f'{f}=?' for f in names)
+        self._select_sql = f'SELECT {self.columns}, ROWID FROM {table}'
+        self._get_sql = f'{self._select_sql} WHERE ROWID == ?'
+        self._insert_sql = f'INSERT INTO {table} ({self.columns}) VALUES({questions})'
+        self._update_sql = f'UPDATE {table} SET {assignments} WHERE ROWID == ?'
+        self._delete_sql = f'DELETE FROM {table} WHERE ROWID == ?'
+        self._exists_sql = f'SELECT 1 FROM {table} WHERE ROWID == ?'
+        self._values = _getter(names)
+        self._values_pk = _getter([*names, 'pk'])
+        cls = self.obj_cls
+        if _positional_init(cls, [*names, 'pk']):
+            make = _trusted_init(cls, [*names, 'pk'])
+            self._make_objs: Callable[[Iterable[tuple[Any, ...]]], Iterator[T]] = \
+                lambda rows: starmap(make, rows)
+        else:
+            self._make_objs = lambda rows: (
+                self._row2obj(row[-1], row[:-1]) for row in rows)
+
+    def _remember(self, rows: Iterable[tuple[Any, ...]]) -> None:
+        """
+        Запоминает значения полей объектов по строкам таблицы (поля..., pk)
+        и забывает давно запомненные сверх max_snapshots
+        """
+        if not self.track_changes:
+            return
+        snapshots = self._snapshots
+        for row in rows:
+            pk = row[-1]
+            snapshots[pk] = row[:-1]
+            snapshots.move_to_end(pk)
+        while len(snapshots) > self.max_snapshots:
+            snapshots.popitem(last=False)
+
+    def _forget(self, pks: Iterable[int]) -> None:
+        """ Забывает значения полей удаленных объектов """
+        if self._cascades:
+            self._snapshots.clear()
+            return
+        for pk in pks:
+            self._snapshots.pop(pk, None)
+
+    def clear_snapshots(self) -> None:
+        """ Забывает значения полей всех объектов """
+        self._snapshots.clear()
+
+    def close(self) -> None:
+        """ Закрывает соединение с базой данных, если репозиторий им владеет """
+        if self._owns_connection:
+            self.connection.close()
+
+    def __enter__(self) -> 'SQLiteRepository[T]':
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None,
+                 exc_val: BaseException | None,
+                 exc_tb: TracebackType | None) -> None:
+        self.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Выполняет блок в одной транзакции: фиксирует ее при успешном
+        завершении и откатывает при исключении. Если транзакция уже открыта
+        на этом соединении (например, транзакция фабрики), блок выполняется
+        в точке сохранения (SAVEPOINT): при исключении откатываются только
+        его изменения, и внешняя транзакция не получает их части.
+        """
+        cur = self.connection.cursor()
+        if self.connection.in_transaction:
+            begin, commit = 'SAVEPOINT batch', 'RELEASE batch'
+            rollback: tuple[str, ...] = ('ROLLBACK TO batch', 'RELEASE batch')
+        else:
+            begin, commit, rollback = 'BEGIN IMMEDIATE', 'COMMIT', ('ROLLBACK',)
+        cur.execute(begin)
+        try:
+            yield cur
+        except BaseException:
+            for statement in rollback:
+                cur.execute(statement)
+            self.clear_snapshots()
+            raise
+        cur.execute(commit)
 
     def add(self, obj: T) -> int | None:
         if getattr(obj, 'pk', None) != 0:
             raise ValueError(f'trying to add object {obj} with filled `pk` attribute')
-        names = ', '.join(self.fields.keys())
-        questions = ', '.join("?" * len(self.fields))
-        values = [getattr(obj, f) for f in self.fields]
-        with sqlite3.connect(self.db_file) as con:
-            cur = con.cursor()
-            cur.execute('PRAGMA foreign_keys = ON')
-            cur.execute(
-                f'INSERT INTO {self.table_name} ({names}) VALUES({questions})',
-                values
-            )
-            obj.pk = cur.lastrowid
-        con.close()
+        values = self._values(obj)
+        cur = self.connection.execute(self._insert_sql, values)
+        obj.pk = cur.lastrowid
+        self._remember([(*values, obj.pk)])
         return obj.pk
 
-    def _row2obj(self, rowid: int, row: tuple[Any]) -> T:
-        """ Конвертирует строку из БД в объект типа Т """
+    def add_many(self, objs: Iterable[T]) -> list[int | None]:
+        objs = list(objs)
+        for obj in objs:
+            if getattr(obj, 'pk', None) != 0:
+                raise ValueError(f'trying to add object {obj} with filled `pk` attribute')
+        if not objs:
+            return []
+        with self._transaction() as cur:
+            cur.executemany(self._insert_sql, map(self._values, objs))
+            # в пределах транзакции новые строки получают ROWID подряд
+            last_pk = cur.execute('SELECT last_insert_rowid()').fetchone()[0]
+        first_pk = last_pk - len(objs) + 1
+        for pk, obj in enumerate(objs, start=first_pk):
+            obj.pk = pk
+        if len(objs) <= self.max_snapshots:
+            self._remember(map(self._values_pk, objs))
+        return [obj.pk for obj in objs]
+
+    def _row2obj(self, rowid: int, row: tuple[Any, ...]) -> T:
+        """ Конвертирует строку из БД в объект типа Т по именам полей """
         kwargs = dict(zip(self.fields, row))
         obj = self.obj_cls(**kwargs)
         obj.pk = rowid
         return obj  # type: ignore
 
     def get(self, pk: int) -> T | None:
-        with sqlite3.connect(self.db_file) as con:
-            cur = con.cursor()
-            row = cur.execute(
-                f'SELECT * FROM {self.table_name} '
-                + f'WHERE ROWID=={pk}'
-            ).fetchone()
-        con.close()
-        if row is None:
-            return None
-        obj = self._row2obj(pk, row)
-        return obj
+        rows = self.connection.execute(self._get_sql, (pk,)).fetchall()
+        self._remember(rows)
+        return next(self._make_objs(rows), None)
+
+    def get_many(self, pks: Iterable[int]) -> list[T]:
+        pks = list(pks)
+        found: dict[int, T] = {}
+        for chunk in _chunks(set(pks), self.max_variables):
+            questions = ', '.join("?" * len(chunk))
+            rows = self.connection.execute(
+                f'{self._select_sql} WHERE ROWID IN ({questions})', chunk
+            ).fetchall()
+            self._remember(rows)
+            found.update((obj.pk, obj) for obj in self._make_objs(rows))  # type: ignore
+        return [found[pk] for pk in pks if pk in found]
+
+    def _column(self, field: str) -> str:
+        """
+        Возвращает выражение SQL для поля модели (pk - ROWID), проверяя,
+        что это действительно поле модели (имена полей подставляются в SQL)
+        """
+        if field == 'pk':
+            return 'ROWID'
+        if field not in self.fields:
+            raise ValueError(f'unknown field "{field}"')
+        return field
+
+    def _conditions(self, where: Where = None,
+                    between: tuple[str, Any, Any] | None = None
+                    ) -> tuple[str, list[Any]]:
+        """ Возвращает текст условия WHERE и параметры запроса """
+        flt = to_filter(where)
+        if between is not None:
+            flt = Between(*between) if flt is None else flt & Between(*between)
+        if flt is None:
+            return '', []
+        return flt.to_sql(self._column)
+
+    def _select(self, where: Where = None, batch_size: int = 1000,
+                order_by: OrderBy = None, limit: int | None = None) -> Iterator[T]:
+        """
+        Выполняет выборку объектов по условию where в порядке order_by.
+        Строки читаются из курсора пакетами по batch_size,
+        объекты создаются по мере перебора.
+        """
+        condition, params = self._conditions(where)
+        query = self._select_sql
+        if condition:
+            query += f' WHERE {condition}'
+        order = [f'{self._column(f)} DESC' if desc else self._column(f)
+                 for f, desc in order_fields(order_by)]
+        if order:
+            query += f' ORDER BY {", ".join(order)}'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        cur = self.connection.execute(query, params)
+        try:
+            while rows := cur.fetchmany(batch_size):
+                yield from self._make_objs(rows)
+        finally:
+            cur.close()
 
-    def get_all(self, where: dict[str, Any] | None = None) -> list[T]:
-        with sqlite3.connect(self.db_file) as con:
-            cur = con.cursor()
-            if where is None:
-                rows = cur.execute(
-                    f'SELECT ROWID, * FROM {self.table_name} '
-                ).fetchall()
-            else:
-                fields = " AND ".join([f"{f} LIKE ?" for f in where.keys()])
-                rows = cur.execute(
-                    f'SELECT ROWID, * FROM {self.table_name} '
-                    + f'WHERE {fields}',
-                    list(where.values())
-                ).fetchall()
-        con.close()
-        return [self._row2obj(r[0], r[1:]) for r in rows]
+    def iter_all(self, where: Where = None, batch_size: int = 1000,
+                 order_by: OrderBy = None, limit: int | None = None) -> Iterator[T]:
+        # условие проверяется сразу, а не при первом обращении к генератору
+        self._conditions(where)
+        return self._select(where, batch_size, order_by, limit)
+
+    def get_all(self, where: Where = None,
+                order_by: OrderBy = None, limit: int | None = None) -> list[T]:
+        objs = list(self._select(where, order_by=order_by, limit=limit))
+        # значения больших выборок не запоминаются, чтобы не вытеснять остальные
+        if len(objs) <= self.max_snapshots:
+            self._remember(map(self._values_pk, objs))
+        return objs
 
     def get_all_like(self, like: dict[str, str]) -> list[T]:
-        values = [f"%{v}%" for v in like.values()]
-        where = dict(zip(like.keys(), values))
-        return self.get_all(where=where)
+        return self.get_all(And(*(Contains(f, v) for f, v in like.items())))
+
+    def get_between(self, field: str, lower: Any, upper: Any) -> list[T]:
+        return self.get_all(Between(field, lower, upper), order_by=field)
+
+    def get_descendants(self, pk: int, parent_field: str = 'parent') -> list[T]:
+        parent = self._column(parent_field)
+        table = self.table_name
+        # UNION отбрасывает повторы, поэтому циклы ссылок не зацикливают запрос
+        rows = self.connection.execute(
+            f'WITH RECURSIVE sub(id) AS ('
+            f'SELECT ROWID FROM {table} WHERE {parent} = ? '
+            f'UNION SELECT t.ROWID FROM {table} AS t JOIN sub ON t.{parent} = sub.id) '
+            f'{self._select_sql} WHERE ROWID IN sub AND ROWID != ? ORDER BY ROWID',
+            (pk, pk)
+        ).fetchall()
+        return list(self._make_objs(rows))
+
+    def get_ancestors(self, pk: int, parent_field: str = 'parent') -> list[T]:
+        parent = self._column(parent_field)
+        table = self.table_name
+        columns = ', '.join(f't.{field}' for field in self.fields)
+        # глубина ограничена числом записей на случай цикла ссылок
+        rows = self.connection.execute(
+            f'WITH RECURSIVE anc(id, depth) AS ('
+            f'SELECT {parent}, 1 FROM {table} WHERE ROWID = ? '
+            f'UNION ALL SELECT t.{parent}, anc.depth + 1 '
+            f'FROM {table} AS t JOIN anc ON t.ROWID = anc.id '
+            f'WHERE anc.depth < (SELECT count(*) FROM {table})) '
+            f'SELECT {columns}, t.ROWID FROM {table} AS t JOIN anc ON t.ROWID = anc.id '
+            f'ORDER BY anc.depth',
+            (pk,)
+        ).fetchall()
+        result: dict[Any, T] = {}
+        for obj in self._make_objs(rows):
+            if obj.pk in result or obj.pk == pk:
+                break
+            result[obj.pk] = obj
+        return list(result.values())
+
+    def get_page(self, field: str, limit: int, cursor: Cursor | None = None,
+                 where: Where = None,
+                 descending: bool = True) -> tuple[list[T], Cursor | None]:
+        # сравнение пар (поле, ROWID) использует индекс по полю
+        # (если он объявлен в __indexes__), который содержит ROWID
+        # как последний столбец
+        column = self._column(field)
+        condition, params = self._conditions(where)
+        conditions = [f'{column} IS NOT NULL']
+        if condition:
+            conditions.append(f'({condition})')
+        if cursor is not None:
+            conditions.append(f'({column}, ROWID) {"<" if descending else ">"} (?, ?)')
+            params += cursor
+        order = ' DESC' if descending else ''
+        rows = self.connection.execute(
+            f'{self._select_sql} WHERE {" AND ".join(conditions)} '
+            f'ORDER BY {column}{order}, ROWID{order} LIMIT ?',
+            [*params, limit + 1]
+        ).fetchall()
+        self._remember(rows)
+        return paginate(list(self._make_objs(rows)), field, limit)
+
+    def aggregate(self, func: str, field: str,
+                  where: Where = None,
+                  group_by: str | None = None,
+                  between: tuple[str, Any, Any] | None = None) -> Any:
+        if func not in AGGREGATES:
+            raise ValueError(f'unknown aggregate function "{func}"')
+        expr = '*' if field == '*' and func == 'count' else self._column(field)
+        expr = f'{func.upper()}({expr})'
+        if func in ('sum', 'count'):
+            expr = f'coalesce({expr}, 0)'
+        group = None if group_by is None else self._column(group_by)
+        if group is not None:
+            expr = f'{group}, {expr}'
+        condition, params = self._conditions(where, between)
+        query = f'SELECT {expr} FROM {self.table_name}'
+        if condition:
+            query += f' WHERE {condition}'
+        if group is None:
+            return self.connection.execute(query, params).fetchone()[0]
+        rows = self.connection.execute(f'{query} GROUP BY {group}', params)
+        return dict(rows.fetchall())
 
     def update(self, obj: T) -> None:
-        fields = ", ".join([f"{f}=?" for f in self.fields.keys()])
-        values = [getattr(obj, f) for f in self.fields]
-        with sqlite3.connect(self.db_file) as con:
-            cur = con.cursor()
-            cur.execute(
-                f'UPDATE {self.table_name} SET {fields} '
-                + f'WHERE ROWID=={obj.pk}',
-                values
-            )
-            if cur.rowcount == 0:
-                raise ValueError('attempt to update object with unknown primary key')
-        con.close()
+        values = self._values(obj)
+        old = self._snapshots.get(obj.pk)  # type: ignore
+        changed = () if old is None else tuple(
+            i for i, (was, now) in enumerate(zip(old, values)) if was != now)
+        if old is None:
+            found = self.connection.execute(self._update_sql,
+                                            (*values, obj.pk)).rowcount
+        elif changed:
+            found = self.connection.execute(self._partial_update(changed),
+                                            [*(values[i] for i in changed),
+                                             obj.pk]).rowcount
+        else:
+            # записывать нечего, проверяется только наличие записи
+            found = self.connection.execute(self._exists_sql,
+                                            (obj.pk,)).fetchone() is not None
+        if not found:
+            self._snapshots.pop(obj.pk, None)  # type: ignore
+            raise ValueError('attempt to update object with unknown primary key')
+        self._remember([(*values, obj.pk)])
+
+    def _partial_update(self, changed: tuple[int, ...]) -> str:
+        """ Текст запроса, обновляющего только столбцы с номерами changed """
+        if changed not in self._partial_update_sql:
+            names = list(self.fields)
+            assignments = ', '.join(f'{names[i]}=?' for i in changed)
+            self._partial_update_sql[changed] = (
+                f'UPDATE {self.table_name} SET {assignments} WHERE ROWID == ?')
+        return self._partial_update_sql[changed]
 
     def delete(self, pk: int) -> None:
-        with sqlite3.connect(self.db_file) as con:
-            cur = con.cursor()
-            cur.execute(
-                f'DELETE FROM  {self.table_name} '
-                + f'WHERE ROWID=={pk}'
-            )
-            if cur.rowcount == 0:
+        cur = self.connection.execute(self._delete_sql, (pk,))
+        self._forget([pk])
+        if cur.rowcount == 0:
+            raise ValueError('attempt to delete object with unknown primary key')
+
+    def update_where(self, where: Where, values: dict[str, Any]) -> int:
+        if 'pk' in values:
+            raise ValueError('primary key cannot be updated')
+        if not values:
+            return 0
+        assignments = ', '.join(f'{self._column(f)}=?' for f in values)
+        condition, params = self._conditions(where)
+        query = f'UPDATE {self.table_name} SET {assignments}'
+        if condition:
+            query += f' WHERE {condition}'
+        cur = self.connection.execute(query, [*values.values(), *params])
+        self.clear_snapshots()
+        return cur.rowcount
+
+    def delete_where(self, where: Where) -> int:
+        condition, params = self._conditions(where)
+        query = f'DELETE FROM {self.table_name}'
+        if condition:
+            query += f' WHERE {condition}'
+        deleted = self.connection.execute(query, params).rowcount
+        self.clear_snapshots()
+        return deleted
+
+    def delete_many(self, pks: Iterable[int]) -> None:
+        pks = set(pks)
+        deleted = 0
+        with self._transaction() as cur:
+            for chunk in _chunks(pks, self.max_variables):
+                questions = ', '.join("?" * len(chunk))
+                cur.execute(
+                    f'DELETE FROM {self.table_name} WHERE ROWID IN ({questions})',
+                    chunk
+                )
+                deleted += cur.rowcount
+            self._forget(pks)
+            if deleted != len(pks):
                 raise ValueError('attempt to delete object with unknown primary key')
-        con.close()
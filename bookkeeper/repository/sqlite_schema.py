@@ -0,0 +1,119 @@
+"""
+Модуль описывает создание схемы базы данных SQLite по аннотациям модели
+"""
+
+import sqlite3
+from types import NoneType, UnionType
+from typing import Any, Iterable, Union, get_args, get_origin
+
+# соответствие типов Python типам столбцов (affinity) SQLite
+SQL_TYPES: dict[type, str] = {
+    bool: 'INTEGER',
+    int: 'INTEGER',
+    float: 'REAL',
+    str: 'TEXT',
+    bytes: 'BLOB',
+}
+
+
+def column_type(annotation: Any) -> str:
+    """
+    Возвращает тип столбца SQLite для аннотации поля модели.
+    Для необязательных полей (int | None) используется тип значения,
+    для неизвестных типов - пустая строка (столбец без типа).
+    """
+    if get_origin(annotation) in (Union, UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not NoneType]
+        if len(args) == 1:
+            return column_type(args[0])
+        return ''
+    return SQL_TYPES.get(annotation, '')
+
+
+def index_columns(index: str | Iterable[str]) -> tuple[str, ...]:
+    """
+    Возвращает столбцы индекса, заданного названием поля
+    или последовательностью названий (составной индекс)
+    """
+    if isinstance(index, str):
+        return (index,)
+    return tuple(index)
+
+
+def index_name(table_name: str, columns: Iterable[str]) -> str:
+    """ Возвращает название индекса по таблице и столбцам """
+    return f'{table_name}_{"_".join(columns)}_idx'
+
+
+def column_sql(name: str, annotation: Any, references: str | None = None) -> str:
+    """
+    Возвращает описание столбца name. Если задана таблица references,
+    столбец ссылается на ее первичный ключ, а при удалении записи,
+    на которую он ссылается, получает значение NULL.
+    """
+    sql = f'{name} {column_type(annotation)}'.rstrip()
+    if references is not None:
+        sql += f' REFERENCES {references}(pk) ON DELETE SET NULL'
+    return sql
+
+
+def create_table_sql(table_name: str, fields: dict[str, Any],
+                     foreign_keys: dict[str, str] | None = None) -> str:
+    """
+    Возвращает запрос создания таблицы table_name со столбцами fields
+    (название -> аннотация) и первичным ключом pk. foreign_keys -
+    внешние ключи (название поля -> таблица, на которую оно ссылается).
+    """
+    foreign_keys = foreign_keys or {}
+    columns = ['pk INTEGER PRIMARY KEY']
+    columns += [column_sql(name, ann, foreign_keys.get(name))
+                for name, ann in fields.items()]
+    return f'CREATE TABLE IF NOT EXISTS {table_name} ({", ".join(columns)})'
+
+
+def add_columns_sql(connection: sqlite3.Connection,
+                    table_name: str, fields: dict[str, Any],
+                    foreign_keys: dict[str, str] | None = None) -> list[str]:
+    """
+    Возвращает запросы добавления в существующую таблицу table_name
+    столбцов полей fields, которых в ней нет
+    """
+    foreign_keys = foreign_keys or {}
+    existing = {row[1] for row in connection.execute(f'PRAGMA table_info({table_name})')}
+    return [f'ALTER TABLE {table_name} ADD COLUMN '
+            f'{column_sql(name, ann, foreign_keys.get(name))}'
+            for name, ann in fields.items() if name not in existing]
+
+
+def create_index_sql(table_name: str, columns: tuple[str, ...]) -> str:
+    """ Возвращает запрос создания индекса по столбцам columns """
+    return (f'CREATE INDEX IF NOT EXISTS {index_name(table_name, columns)} '
+            f'ON {table_name} ({", ".join(columns)})')
+
+
+def create_schema(connection: sqlite3.Connection,
+                  table_name: str,
+                  fields: dict[str, Any],
+                  indexes: Iterable[str | Iterable[str]] = (),
+                  foreign_keys: dict[str, str] | None = None) -> None:
+    """
+    Создает таблицу и индексы, если их еще нет в базе данных.
+    В существующую таблицу добавляются недостающие столбцы
+    (для имеющихся записей - со значением NULL), остальные столбцы
+    не изменяются: внешние ключи foreign_keys появляются только
+    у новых таблиц и столбцов (SQLite не умеет добавлять ограничения
+    к существующим столбцам).
+    """
+    unknown = set(foreign_keys or ()) - fields.keys()
+    if unknown:
+        raise ValueError(f'unknown fields {sorted(unknown)} in foreign keys '
+                         f'of {table_name}')
+    connection.execute(create_table_sql(table_name, fields, foreign_keys))
+    for sql in add_columns_sql(connection, table_name, fields, foreign_keys):
+        connection.execute(sql)
+    for index in indexes:
+        columns = index_columns(index)
+        unknown = set(columns) - fields.keys()
+        if unknown:
+            raise ValueError(f'unknown fields {sorted(unknown)} in index of {table_name}')
+        connection.execute(create_index_sql(table_name, columns))
@@ -56,7 +56,8 @@ while True:
     elif cmd == 'бюджет':
         print(*budget_repo.get_all(), sep='\n')
     elif cmd == 'расходы':
-        print(*exp_repo.get_all(), sep='\n')
+        for exp in exp_repo.iter_all():
+            print(exp)
     elif cmd[0].isdecimal():
         amount, name = cmd.split(maxsplit=1)
         try:
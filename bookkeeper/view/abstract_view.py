@@ -3,6 +3,7 @@ from typing import Protocol, Iterable
 from collections.abc import Callable
 
 from bookkeeper.models.category import Category
+from bookkeeper.models.category_index import CategoryIndex
 from bookkeeper.models.expense import Expense
 from bookkeeper.models.budget import Budget
 
@@ -13,12 +14,27 @@ class AbstractView(Protocol):
     def set_categories(self, cats: list[Category]) -> None:
         """ устанавливает список категорий """
 
+    def set_category_index(self, index: CategoryIndex) -> None:
+        """ устанавливает общий индекс категорий по названию и id """
+
     def set_expenses(self, cats: list[Expense]) -> None:
         """ устанавливает список трат """
 
     def set_budgets(self, cats: list[Budget]) -> None:
         """ устанавливает список бюджетов """
 
+    def expense_added(self, exp: Expense) -> None:
+        """ сообщает о добавлении траты """
+
+    def expense_changed(self, old: Expense, new: Expense) -> None:
+        """ сообщает об изменении траты (old - прежний вариант) """
+
+    def expenses_removed(self, exps: list[Expense]) -> None:
+        """ сообщает об удалении трат """
+
+    def budget_changed(self, budget: Budget) -> None:
+        """ сообщает об изменении бюджета (в том числе потраченной суммы) """
+
     def set_cat_adder(self, handler: Callable[[str, str | None], None]) -> None:
         """ устанавливает функцию добавления категории """
 
@@ -43,5 +59,12 @@ class AbstractView(Protocol):
     def set_exp_modifier(self, handler: Callable[[int, str, str], None]) -> None:
         """ устанавливает функцию изменения траты """
 
+    def set_exp_pager(self, handler: Callable[['Expense | None'], list[Expense]]
+                      ) -> None:
+        """
+        устанавливает функцию получения следующей страницы трат
+        после заданной траты (None - первой страницы)
+        """
+
     def death(self) -> None:
         """ устанавливает функцию превышения бюджета """
\ No newline at end of file
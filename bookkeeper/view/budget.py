@@ -51,18 +51,23 @@ class BudgetTableWidget(QtWidgets.QTableWidget):
         """ Добавляет данные в таблицу """
         self.data = data
         for i_row, row in enumerate(data):
-            for j_col, text in enumerate(row[:-1]):
-                self.setItem(
-                    i_row, j_col,
-                    QtWidgets.QTableWidgetItem(text.capitalize())
-                )
-                self.item(i_row, j_col).setTextAlignment(Qt.AlignCenter)
-                if j_col == 0:
-                    self.item(i_row, j_col).setFlags(Qt.ItemIsEditable
-                                                     | Qt.ItemIsEnabled
-                                                     | Qt.ItemIsSelectable)
-                else:
-                    self.item(i_row, j_col).setFlags(Qt.ItemIsEnabled)
+            self.set_row(i_row, row)
+
+    def set_row(self, i_row: int, row: list[Any]) -> None:
+        """ Заполняет строку таблицы с номером i_row """
+        self.data[i_row] = row
+        for j_col, text in enumerate(row[:-1]):
+            self.setItem(
+                i_row, j_col,
+                QtWidgets.QTableWidgetItem(text.capitalize())
+            )
+            self.item(i_row, j_col).setTextAlignment(Qt.AlignCenter)
+            if j_col == 0:
+                self.item(i_row, j_col).setFlags(Qt.ItemIsEditable
+                                                 | Qt.ItemIsEnabled
+                                                 | Qt.ItemIsSelectable)
+            else:
+                self.item(i_row, j_col).setFlags(Qt.ItemIsEnabled)
 
 
 class BudgetTableGroup(QtWidgets.QGroupBox):
@@ -88,11 +93,22 @@ class BudgetTableGroup(QtWidgets.QGroupBox):
         self.table.clearContents()
         self.table.add_data(self.data)
 
+    def update_budget(self, budget: Budget) -> None:
+        """ Обновляет строку таблицы с бюджетом budget """
+        self.budgets = [bdg for bdg in self.budgets if bdg.pk != budget.pk]
+        self.budgets.append(budget)
+        if budget.category is not None or budget.period not in ["day", "week", "month"]:
+            return
+        i_row = ["day", "week", "month"].index(budget.period)
+        self.data[i_row] = self.budgets_to_data([budget])[i_row]
+        self.table.set_row(i_row, self.data[i_row])
+
     def budgets_to_data(self, budgets: list[Budget]) -> list[list[Any]]:
         """ Конвертирует объекты бюджетов в данные для таблицы """
         data = []
         for period in ["day", "week", "month"]:
-            bdgs = [bi for bi in budgets if bi.period == period]
+            # в таблице показываются бюджеты всех трат
+            bdgs = [bi for bi in budgets if bi.period == period and bi.category is None]
             if len(bdgs) == 0:
                 data.append(["- Не установлен -", "", "", None])
             else:
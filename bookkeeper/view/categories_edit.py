@@ -11,6 +11,7 @@ from bookkeeper.view.group_widgets import GroupLabel, \
     LabeledComboBoxInput, \
     LabeledLineInput
 from bookkeeper.models.category import Category
+from bookkeeper.models.category_tree import CategoryTree
 
 
 class CategoriesEditWindow(QtWidgets.QWidget):
@@ -62,6 +63,7 @@ class CategoriesEditWindow(QtWidgets.QWidget):
     def set_categories(self, cats: list[Category]) -> None:
         """ Устанавливает список категорий """
         self.categories = cats
+        self.tree = CategoryTree(cats)
         self.cat_names = [c.name for c in cats]
         top_items = self._find_children()
         self.cats_tree.clear()
@@ -114,10 +116,9 @@ class CategoriesEditWindow(QtWidgets.QWidget):
             -> list[QtWidgets.QTreeWidgetItem]:
         """ Находит подкатегории по pk родителя """
         items = []
-        children = [c for c in self.categories if c.parent == parent_pk]
-        for child in children:
-            item = QtWidgets.QTreeWidgetItem([child.name])
-            item.addChildren(self._find_children(parent_pk=child.pk))
+        for child in self.tree.children.get(parent_pk, []):
+            item = QtWidgets.QTreeWidgetItem([self.tree.categories[child].name])
+            item.addChildren(self._find_children(parent_pk=child))
             items.append(item)
         return items
 
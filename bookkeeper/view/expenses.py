@@ -2,28 +2,307 @@
 # pylint: disable=no-name-in-module
 # pylint: disable=c-extension-no-member
 # pylint: disable=too-many-instance-attributes
+# pylint: disable=invalid-name
 # mypy: disable-error-code="attr-defined"
+from bisect import bisect_left, bisect_right
 from typing import Any, Iterable
+from collections import OrderedDict
 from collections.abc import Callable
 from PySide6 import QtWidgets
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QPersistentModelIndex, \
+    QTimer
 
 from bookkeeper.view.group_widgets import GroupLabel
 from bookkeeper.models.expense import Expense
 
+# функция получения следующей страницы трат после траты (None - первой страницы)
+ExpensePager = Callable[['Expense | None'], list[Expense]]
+Index = QModelIndex | QPersistentModelIndex
+
+
+def _key(exp: Expense) -> tuple[str, int]:
+    """ Ключ порядка трат в таблице (по убыванию) """
+    return exp.expense_date, exp.pk
+
+
+class ExpensesTableModel(QAbstractTableModel):
+    """
+    Модель таблицы расходов, подгружающая траты страницами.
+    Первая страница устанавливается методом set_expenses, следующие
+    запрашиваются функцией pager (см. set_pager) по мере прокрутки:
+    представление вызывает canFetchMore/fetchMore, а следующая страница
+    подгружается заранее, когда запрашиваются строки последней страницы.
+    В памяти хранится не более max_pages страниц (вытесняются давно
+    не использованные); для каждой страницы запоминается только трата,
+    после которой она начинается, чтобы загрузить ее заново при обращении.
+    Изменения трат вносятся точечно (insert_expense, change_expense,
+    remove_expense): затрагиваются только строки измененных трат,
+    если они попадают в уже загруженную часть таблицы. У страницы,
+    вытесненной из памяти, меняется только размер: при обращении
+    она загружается заново уже с изменениями.
+    """
 
-class ExpensesTableWidget(QtWidgets.QTableWidget):
-    """ Виджет-таблица расходов """
     def __init__(self,
+                 catpk_to_name: Callable[[int], str],
                  exp_modifier: Callable[[int, str, str], None],
-                 *args: Any, **kwargs: Any):
+                 *args: Any, max_pages: int = 20, **kwargs: Any):
         super().__init__(*args, **kwargs)
-        self.data: list[list[Any]] = []
+        self.catpk_to_name = catpk_to_name
         self.exp_modifier = exp_modifier
-        self.setColumnCount(4)
-        self.setRowCount(50)
+        self.max_pages = max_pages
+        self.pager: ExpensePager | None = None
         self.headers = "Дата Сумма Категория Комментарий".split()
         self.col_to_attr = {0: "expense_date", 1: "amount", 2: "category", 3: "comment"}
-        self.setHorizontalHeaderLabels(self.headers)
+        self._starts: list[int] = []
+        self._afters: list[Expense | None] = []
+        self._pages: OrderedDict[int, list[Expense]] = OrderedDict()
+        self._rows = 0
+        self._last: Expense | None = None
+        self._more = False
+        # таймер принадлежит модели и не срабатывает после ее удаления
+        self._prefetch_timer = QTimer(self)
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.timeout.connect(self.fetchMore)
+
+    def set_pager(self, pager: ExpensePager) -> None:
+        """ Устанавливает функцию получения следующей страницы трат """
+        self.pager = pager
+
+    def set_expenses(self, exps: list[Expense]) -> None:
+        """ Устанавливает первую страницу трат, сбрасывая загруженные """
+        self.beginResetModel()
+        self._starts, self._afters, self._rows = [], [], 0
+        self._pages.clear()
+        self._last = None
+        self._more = self.pager is not None
+        if exps:
+            self._append_page(exps)
+        else:
+            self._more = False
+        self.endResetModel()
+
+    def _append_page(self, exps: list[Expense]) -> None:
+        """ Добавляет страницу трат в конец таблицы """
+        self._starts.append(self._rows)
+        self._afters.append(self._last)
+        self._store(len(self._starts) - 1, exps)
+        self._rows += len(exps)
+        self._last = exps[-1]
+
+    def _store(self, page: int, exps: list[Expense]) -> None:
+        """ Сохраняет страницу в памяти, вытесняя давно не использованные """
+        self._pages[page] = exps
+        self._pages.move_to_end(page)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+    def _size(self, page: int) -> int:
+        """ Количество строк на странице page """
+        end = self._starts[page + 1] if page + 1 < len(self._starts) else self._rows
+        return end - self._starts[page]
+
+    def _page(self, page: int) -> list[Expense]:
+        """ Возвращает страницу с номером page, загружая ее при необходимости """
+        exps = self._pages.get(page)
+        if exps is not None:
+            self._pages.move_to_end(page)
+            return exps
+        # размер страницы мог измениться после точечных изменений,
+        # поэтому траты запрашиваются, пока страница не заполнится
+        exps = []
+        size = self._size(page)
+        while self.pager is not None and len(exps) < size:
+            more = self.pager(exps[-1] if exps else self._afters[page])
+            if not more:
+                break
+            exps += more
+        del exps[size:]
+        self._store(page, exps)
+        return exps
+
+    def _find_page(self, key: tuple[str, int]) -> int:
+        """ Номер страницы, на которую попадает трата с ключом key """
+        low, high = 0, len(self._starts)
+        while high - low > 1:
+            mid = (low + high) // 2
+            if _key(self._afters[mid]) > key:  # type: ignore
+                low = mid
+            else:
+                high = mid
+        return low
+
+    def _is_loaded(self, exp: Expense) -> bool:
+        """ Попадает ли трата exp в загруженную часть таблицы """
+        if exp.expense_date is None or not self._starts:
+            return False
+        return not (self._more and self._last is not None
+                    and _key(exp) < _key(self._last))
+
+    def _locate(self, exp: Expense) -> tuple[int, int, list[Expense] | None]:
+        """
+        Возвращает страницу, на которую попадает трата exp,
+        позицию траты на странице и список трат страницы.
+        Если страница вытеснена из памяти, вместо списка возвращается None,
+        а вместо позиции - 0: страница не загружается, потому что
+        загруженная заново она уже содержала бы изменение
+        """
+        key = _key(exp)
+        page = self._find_page(key)
+        exps = self._pages.get(page)
+        if exps is None:
+            return page, 0, None
+        self._pages.move_to_end(page)
+        return page, bisect_left(exps, True, key=lambda e: _key(e) <= key), exps
+
+    def _shift(self, page: int, delta: int) -> None:
+        """ Сдвигает начала страниц после page на delta строк """
+        for i in range(page + 1, len(self._starts)):
+            self._starts[i] += delta
+        self._rows += delta
+
+    def insert_expense(self, exp: Expense) -> None:
+        """ Вставляет строку новой траты exp """
+        if not self._starts and exp.expense_date is not None:
+            self.beginInsertRows(QModelIndex(), 0, 0)
+            self._append_page([exp])
+            self.endInsertRows()
+            return
+        if not self._is_loaded(exp):
+            return
+        page, offset, exps = self._locate(exp)
+        row = self._starts[page] + offset
+        self.beginInsertRows(QModelIndex(), row, row)
+        if exps is not None:
+            exps.insert(offset, exp)
+        self._shift(page, 1)
+        self.endInsertRows()
+
+    def remove_expense(self, exp: Expense) -> None:
+        """ Удаляет строку траты exp """
+        if not self._is_loaded(exp):
+            return
+        page, offset, exps = self._locate(exp)
+        if exps is None:
+            if self._size(page) == 0:
+                return
+        elif offset == len(exps) or exps[offset].pk != exp.pk:
+            return
+        row = self._starts[page] + offset
+        self.beginRemoveRows(QModelIndex(), row, row)
+        if exps is not None:
+            del exps[offset]
+        self._shift(page, -1)
+        self.endRemoveRows()
+
+    def change_expense(self, old: Expense, new: Expense) -> None:
+        """
+        Заменяет строку траты old на ее новый вариант new;
+        если изменилась дата, строка перемещается
+        """
+        if old.expense_date != new.expense_date:
+            self.remove_expense(old)
+            self.insert_expense(new)
+            return
+        if not self._is_loaded(old):
+            return
+        page, offset, exps = self._locate(old)
+        if exps is None:
+            # страница будет загружена заново при отрисовке
+            first, last = self._starts[page], self._starts[page] + self._size(page) - 1
+        elif offset == len(exps) or exps[offset].pk != old.pk:
+            return
+        else:
+            exps[offset] = new
+            first = last = self._starts[page] + offset
+        if first <= last:
+            self.dataChanged.emit(self.index(first, 0),
+                                  self.index(last, self.columnCount() - 1))
+
+    def expense(self, row: int) -> Expense | None:
+        """ Возвращает трату в строке row (None, если ее больше нет) """
+        if not 0 <= row < self._rows:
+            return None
+        page = bisect_right(self._starts, row) - 1
+        exps = self._page(page)
+        offset = row - self._starts[page]
+        return exps[offset] if offset < len(exps) else None
+
+    def rowCount(self, parent: Index = QModelIndex()) -> int:
+        """ Количество загруженных строк """
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent: Index = QModelIndex()) -> int:
+        """ Количество столбцов """
+        return 0 if parent.isValid() else len(self.headers)
+
+    def canFetchMore(self, parent: Index = QModelIndex()) -> bool:
+        """ Есть ли еще не загруженные траты """
+        return not parent.isValid() and self._more
+
+    def fetchMore(self, parent: Index = QModelIndex()) -> None:
+        """ Загружает следующую страницу трат """
+        if not self.canFetchMore(parent) or self.pager is None:
+            return
+        exps = self.pager(self._last)
+        if not exps:
+            self._more = False
+            return
+        self.beginInsertRows(QModelIndex(), self._rows, self._rows + len(exps) - 1)
+        self._append_page(exps)
+        self.endInsertRows()
+
+    def _prefetch(self, row: int) -> None:
+        """
+        Планирует загрузку следующей страницы, если запрошена строка
+        последней страницы
+        """
+        if self._more and row >= self._starts[-1]:
+            self._prefetch_timer.start(0)
+
+    def data(self, index: Index, role: int = Qt.DisplayRole) -> Any:
+        """ Текст ячейки таблицы """
+        if role not in (Qt.DisplayRole, Qt.EditRole) or not index.isValid():
+            return None
+        self._prefetch(index.row())
+        exp = self.expense(index.row())
+        if exp is None:
+            return None
+        value = getattr(exp, self.col_to_attr[index.column()])
+        if not value:
+            return ""
+        if index.column() == 2:
+            value = self.catpk_to_name(value)
+        return str(value).capitalize()
+
+    def setData(self, index: Index, value: Any, role: int = Qt.EditRole) -> bool:
+        """ Обрабатывает изменение ячейки """
+        exp = self.expense(index.row())
+        if role != Qt.EditRole or exp is None:
+            return False
+        self.exp_modifier(exp.pk, self.col_to_attr[index.column()], str(value))
+        return True
+
+    def flags(self, index: Index) -> Qt.ItemFlag:
+        """ Ячейки можно выделять и изменять """
+        flags: Qt.ItemFlag = super().flags(index) | Qt.ItemIsEditable
+        return flags
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.DisplayRole) -> Any:
+        """ Заголовки столбцов """
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+
+class ExpensesTableView(QtWidgets.QTableView):  # pylint: disable=too-few-public-methods
+    """
+    Виджет-таблица расходов; отрисовывает только видимые строки модели
+    """
+    def __init__(self, model: ExpensesTableModel,
+                 *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.setModel(model)
         header = self.horizontalHeader()
         header.setSectionResizeMode(
             0, QtWidgets.QHeaderView.ResizeToContents)
@@ -33,32 +312,9 @@ class ExpensesTableWidget(QtWidgets.QTableWidget):
             2, QtWidgets.QHeaderView.ResizeToContents)
         header.setSectionResizeMode(
             3, QtWidgets.QHeaderView.Stretch)
+        self.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
         self.setEditTriggers(
             QtWidgets.QAbstractItemView.DoubleClicked)
-        self.cellDoubleClicked.connect(self.double_click)
-
-    # pylint: disable=unused-argument
-    def double_click(self, row: int, column: int) -> None:
-        """ Обрабатывает двойное нажатие на ячейку """
-        self.cellChanged.connect(self.cell_changed)
-
-    def cell_changed(self, row: int, column: int) -> None:
-        """ Обрабатывает изменение ячейки """
-        self.cellChanged.disconnect(self.cell_changed)
-        pk = int(self.data[row][-1])
-        new_val = self.item(row, column).text()
-        attr = self.col_to_attr[column]
-        self.exp_modifier(pk, attr, new_val)
-
-    def add_data(self, data: list[list[Any]]) -> None:
-        """ Добавляет данные в таблицу """
-        self.data = data
-        for i_row, row in enumerate(data):
-            for j_col, text in enumerate(row[:-1]):
-                self.setItem(
-                    i_row, j_col,
-                    QtWidgets.QTableWidgetItem(text.capitalize())
-                )
 
 
 class ExpensesTableGroup(QtWidgets.QGroupBox):
@@ -69,50 +325,43 @@ class ExpensesTableGroup(QtWidgets.QGroupBox):
                  exp_deleter: Callable[[Iterable[int]], None],
                  *args: Any, **kwargs: Any):
         super().__init__(*args, **kwargs)
-        self.data: list[list[Any]] = []
         self.expenses: list[Expense] = []
-        self.catpk_to_name = catpk_to_name
         self.exp_deleter = exp_deleter
         self.vbox = QtWidgets.QVBoxLayout()
         self.label = GroupLabel("<b>Последние траты</b>")
         self.vbox.addWidget(self.label)
-        self.table = ExpensesTableWidget(exp_modifier)
+        self.model = ExpensesTableModel(catpk_to_name, exp_modifier, parent=self)
+        self.table = ExpensesTableView(self.model)
         self.vbox.addWidget(self.table)
         self.del_button = QtWidgets.QPushButton('Удалить выбранные траты')
         self.del_button.clicked.connect(self.delete_expenses)
         self.vbox.addWidget(self.del_button)
         self.setLayout(self.vbox)
 
+    def set_pager(self, pager: ExpensePager) -> None:
+        """ Устанавливает функцию получения следующей страницы трат """
+        self.model.set_pager(pager)
+
     def set_expenses(self, exps: list[Expense]) -> None:
-        """ Устанавлиявает список трат """
+        """ Устанавлиявает первую страницу трат """
         self.expenses = exps
-        self.data = self.exps_to_data(self.expenses)
-        self.table.clearContents()
-        self.table.add_data(self.data)
+        self.model.set_expenses(exps)
+
+    def expense_added(self, exp: Expense) -> None:
+        """ Добавляет строку новой траты """
+        self.model.insert_expense(exp)
+
+    def expense_changed(self, old: Expense, new: Expense) -> None:
+        """ Обновляет строку измененной траты """
+        self.model.change_expense(old, new)
 
-    def exps_to_data(self, exps: list[Expense]) -> list[list[Any]]:
-        """ Конвертирует объекты трат в данные для таблицы """
-        data = []
+    def expenses_removed(self, exps: Iterable[Expense]) -> None:
+        """ Удаляет строки трат """
         for exp in exps:
-            item = ["", "", "", "", exp.pk]
-            if exp.expense_date:
-                item[0] = str(exp.expense_date)
-            if exp.amount:
-                item[1] = str(exp.amount)
-            if exp.category:
-                item[2] = str(
-                    self.catpk_to_name(exp.category))
-            if exp.comment:
-                item[3] = str(exp.comment)
-            data.append(item)
-        return data
+            self.model.remove_expense(exp)
 
     def delete_expenses(self) -> None:
         """ Вызывает удаление выделенных трат """
-        pks_to_del = []
-        chosen_ranges = self.table.selectedRanges()
-        for ch_range in chosen_ranges:
-            start = ch_range.topRow()
-            end = min(ch_range.bottomRow(), len(self.data))
-            pks_to_del += [i[-1] for i in self.data[start:end+1]]
-        self.exp_deleter(set(pks_to_del))
\ No newline at end of file
+        rows = {index.row() for index in self.table.selectedIndexes()}
+        exps = (self.model.expense(row) for row in rows)
+        self.exp_deleter({exp.pk for exp in exps if exp is not None})
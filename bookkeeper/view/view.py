@@ -10,6 +10,7 @@ from typing import Any, Iterable
 from PySide6 import QtWidgets
 
 from bookkeeper.models.category import Category
+from bookkeeper.models.category_index import CategoryIndex
 from bookkeeper.models.expense import Expense
 from bookkeeper.models.budget import Budget
 from bookkeeper.view.main_window import MainWindow
@@ -37,6 +38,7 @@ class View:
 
     def __init__(self) -> None:
         self.categories: list[Category] = []
+        self.category_index = CategoryIndex()
         self.expenses: list[Expense] = []
         self.budgets: list[Budget] = []
         self.config_app()
@@ -78,12 +80,13 @@ class View:
         self.new_expense.set_categories(self.categories)
         self.cats_edit_window.set_categories(self.categories)
 
+    def set_category_index(self, index: CategoryIndex) -> None:
+        """ Устанавливает индекс категорий (его обновляет presenter) """
+        self.category_index = index
+
     def catpk_to_name(self, pk: int) -> str:
         """ Возвращает название категории по id (pk) """
-        name = [c.name for c in self.categories if int(c.pk) == int(pk)]
-        if len(name):
-            return str(name[0])
-        return ""
+        return self.category_index.name(pk)
 
     def set_cat_adder(self, handler: Callable[[str, str | None], None]) -> None:
         """ Устанавливает метод добавления категории """
@@ -120,6 +123,18 @@ class View:
         self.expenses = exps
         self.expenses_table.set_expenses(self.expenses)
 
+    def expense_added(self, exp: Expense) -> None:
+        """ Добавляет в таблицу новую трату """
+        self.expenses_table.expense_added(exp)
+
+    def expense_changed(self, old: Expense, new: Expense) -> None:
+        """ Обновляет в таблице измененную трату """
+        self.expenses_table.expense_changed(old, new)
+
+    def expenses_removed(self, exps: list[Expense]) -> None:
+        """ Удаляет из таблицы траты """
+        self.expenses_table.expenses_removed(exps)
+
     def set_exp_adder(self, handler: Callable[[str, str, str], None]) -> None:
         """ Устанавливает метод добавления траты """
         self.exp_adder = handle_error(self.main_window, handler)
@@ -132,6 +147,11 @@ class View:
         """ Устанавливает метод изменения траты """
         self.exp_modifier = handle_error(self.main_window, handler)
 
+    def set_exp_pager(self, handler: Callable[['Expense | None'], list[Expense]]
+                      ) -> None:
+        """ Устанавливает метод получения следующей страницы трат """
+        self.expenses_table.set_pager(handler)
+
     def add_expense(self, amount: str, cat_name: str, comment: str = "") -> None:
         """ Вызывает функцию добавления траты """
         self.exp_adder(amount, cat_name, comment)
@@ -159,6 +179,12 @@ class View:
         self.budgets = budgets
         self.budget_table.set_budgets(self.budgets)
 
+    def budget_changed(self, budget: Budget) -> None:
+        """ Обновляет бюджет budget в таблице """
+        self.budgets = [bdg for bdg in self.budgets if bdg.pk != budget.pk]
+        self.budgets.append(budget)
+        self.budget_table.update_budget(budget)
+
     def set_bdg_modifier(self,
                          handler: Callable[['int | None', str, str], None]
                          ) -> None:
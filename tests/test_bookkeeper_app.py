@@ -5,9 +5,13 @@ from pytestqt.qt_compat import qt_api
 import pytest
 
 from bookkeeper.bookkeeper_app import Bookkeeper
+from bookkeeper.models.budget import Budget
+from bookkeeper.models.category import Category
+from bookkeeper.models.expense import Expense
 from bookkeeper.view.view import View
 from bookkeeper.repository.factory import repository_factory
 from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
 
 
 @pytest.fixture
@@ -159,4 +163,91 @@ def test_budgets(bkkpr):
     # delete
     bkkpr.modify_budget(b_day.pk, "", "day")
     b_day = bkkpr.budget_rep.get_all(where={"period": "day"})
-    assert len(b_day) == 0
\ No newline at end of file
+    assert len(b_day) == 0
+
+
+def test_category_budgets(bkkpr):
+    bkkpr.add_category("food", None)
+    bkkpr.add_category("fruit", "food")
+    food = bkkpr.category_rep.get_all(where={"name": "food"})[0]
+    bkkpr.budget_rep.add(Budget(150, "30d", category=food.pk))
+    bkkpr.modify_budget(None, "1000", "day")
+    bkkpr.add_expense("100", "fruit")
+    b_food = bkkpr.budget_rep.get_all(where={"category": food.pk})[0]
+    assert b_food.spent == 100
+
+    def test_death():
+        test_death.was_called = True
+    test_death.was_called = False
+    bkkpr.view.death = test_death
+    bkkpr.add_expense("100", "food")
+    assert test_death.was_called is True
+    b_food = bkkpr.budget_rep.get_all(where={"category": food.pk})[0]
+    b_day = bkkpr.budget_rep.get_all(where={"period": "day"})[0]
+    assert (b_food.spent, b_day.spent) == (200, 200)
+    exp = bkkpr.expense_rep.get_all()[0]
+    bkkpr.delete_expenses([exp.pk])
+    b_food = bkkpr.budget_rep.get_all(where={"category": food.pk})[0]
+    assert b_food.spent == 100
+    # бюджеты удаленной категории удаляются вместе с ней
+    bkkpr.delete_category("food")
+    assert bkkpr.budget_rep.get_all(where={"category": food.pk}) == []
+    assert [b.category for b in bkkpr.budgets] == [None]
+    assert bkkpr.budget_evaluator.budgets == []
+
+
+def test_category_names_ignore_case(bkkpr):
+    bkkpr.add_category("Food", None)
+    with pytest.raises(ValueError):
+        bkkpr.add_category("food", None)
+    bkkpr.add_category("meat", "FOOD")
+    food = bkkpr.category_index.find("food")
+    assert bkkpr.category_index.find("meat").parent == food.pk
+    bkkpr.add_expense("100", "MEAT")
+    exp = bkkpr.expense_rep.get_all()[0]
+    assert bkkpr.view.catpk_to_name(exp.category) == "meat"
+    bkkpr.modify_category("food", "FOOD", None)
+    assert bkkpr.view.catpk_to_name(food.pk) == "FOOD"
+    assert bkkpr.category_rep.get(food.pk).name == "FOOD"
+    bkkpr.delete_category("Food")
+    assert "food" not in bkkpr.category_index
+    assert bkkpr.category_index.find("meat").parent is None
+
+
+def test_delete_category_sqlite(tmp_path):
+    if qt_api.QtWidgets.QApplication.instance() is None:
+        qt_api.QtWidgets.QApplication()
+    # соединение не закрывается: view может запросить страницу трат позже
+    repo_gen = repository_factory(SQLiteRepository, db_file=str(tmp_path / 'app.db'))
+    bkkpr = Bookkeeper(View(), repo_gen)
+    bkkpr.add_category("food", None)
+    bkkpr.add_category("meat", "food")
+    bkkpr.add_category("beef", "meat")
+    food = bkkpr.category_index.find("food")
+    meat = bkkpr.category_index.find("meat")
+    bkkpr.expense_rep.add_many([Expense(1, meat.pk) for _ in range(500)])
+    bkkpr.budget_rep.add(Budget(100, "month", category=meat.pk))
+    bkkpr.delete_category("meat")
+    assert bkkpr.budget_rep.count() == 0
+    assert bkkpr.expense_rep.count({'category': meat.pk}) == 0
+    assert bkkpr.expense_rep.count({'category': None}) == 500
+    beef = bkkpr.category_index.find("beef")
+    assert beef.parent == food.pk
+    assert bkkpr.category_rep.get(beef.pk).parent == food.pk
+    assert bkkpr.category_tree.parent[beef.pk] == food.pk
+
+
+def test_existing_names_differing_in_case(tmp_path):
+    if qt_api.QtWidgets.QApplication.instance() is None:
+        qt_api.QtWidgets.QApplication()
+    db_file = str(tmp_path / 'app.db')
+    with SQLiteRepository(db_file, Category) as repo:
+        repo.add_many([Category("Food"), Category("food")])
+    repo_gen = repository_factory(SQLiteRepository, db_file=db_file)
+    bkkpr = Bookkeeper(View(), repo_gen)
+    assert bkkpr.find_category("FOOD").name == "Food"
+    bkkpr.delete_category("food")
+    assert bkkpr.find_category("FOOD").name == "food"
+    bkkpr.delete_category("food")
+    assert "food" not in bkkpr.category_index
+    assert bkkpr.category_rep.get_all() == []
@@ -70,4 +70,38 @@ def test_update_spent_week(repo):
             sep='\t', timespec='minutes'))
         repo.add(e)
     b.update_spent(repo)
-    assert b.spent == 700
\ No newline at end of file
+    assert b.spent == 700
+
+
+def test_period_bounds():
+    now = datetime(2023, 3, 15, 12, 30)  # среда
+    assert Budget(100, "day").period_bounds(now) == ("2023-03-15", "2023-03-16")
+    assert Budget(100, "week").period_bounds(now) == ("2023-03-13", "2023-03-20")
+    assert Budget(100, "month").period_bounds(now) == ("2023-03-", "2023-03.")
+
+
+def test_custom_periods():
+    now = datetime(2023, 11, 15, 12, 30)
+    assert Budget(100, "quarter").period_bounds(now) == ("2023-10-", "2024-01-")
+    assert Budget(100, "quarter").period_bounds(datetime(2023, 5, 1)) == \
+        ("2023-04-", "2023-07-")
+    assert Budget(100, "year").period_bounds(now) == ("2023-", "2023.")
+    assert Budget(100, "30d").period_bounds(now) == ("2023-10-17", "2023-11-16")
+    assert Budget(100, "1d").period_bounds(now) == ("2023-11-15", "2023-11-16")
+    with pytest.raises(ValueError):
+        Budget(100, "0d")
+    with pytest.raises(ValueError):
+        Budget(100, "d")
+
+
+def test_category_budget():
+    b = Budget(100, "month", category=3)
+    assert b.category == 3
+    assert Budget(100, "month").category is None
+
+
+def test_budget_is_compact():
+    budget = Budget(1000, "week", category=3)
+    assert not hasattr(budget, '__dict__')
+    with pytest.raises(ValueError):
+        Budget(1000, "fortnight")
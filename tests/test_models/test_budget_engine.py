@@ -0,0 +1,77 @@
+"""
+Тесты для движка бюджетов
+"""
+from datetime import datetime
+import pytest
+
+from bookkeeper.models.budget import Budget
+from bookkeeper.models.budget_engine import BudgetEngine
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.memory_repository import MemoryRepository
+
+NOW = datetime(2023, 3, 15, 12, 30)  # среда
+
+
+@pytest.fixture
+def repo():
+    repo = MemoryRepository()
+    for date in ['2023-02-28', '2023-03-01', '2023-03-13', '2023-03-15',
+                 '2023-03-15', '2023-03-16', '2023-03-22', '2023-04-01']:
+        repo.add(Expense(100, 1, expense_date=f'{date}\t10:00'))
+    return repo
+
+
+@pytest.fixture
+def engine(repo):
+    return BudgetEngine(repo, NOW)
+
+
+def test_rebuild(engine):
+    assert engine.spent('day') == 200
+    assert engine.spent('week') == 400
+    assert engine.spent('month') == 600
+
+
+def test_add_remove(engine):
+    exp = Expense(50, 1, expense_date='2023-03-15\t18:00')
+    engine.add(exp)
+    assert [engine.spent(p) for p in engine.periods] == [250, 450, 650]
+    engine.remove(exp)
+    assert [engine.spent(p) for p in engine.periods] == [200, 400, 600]
+    engine.add(Expense(50, 1, expense_date='2023-03-14\t18:00'))
+    assert [engine.spent(p) for p in engine.periods] == [200, 450, 650]
+    engine.add(Expense(50, 1, expense_date='2022-03-15\t18:00'))
+    assert [engine.spent(p) for p in engine.periods] == [200, 450, 650]
+
+
+def test_roll(engine, repo):
+    engine.roll(datetime(2023, 3, 15, 23, 59))
+    assert engine.spent('day') == 200
+    engine.roll(datetime(2023, 3, 16, 0, 1))
+    assert [engine.spent(p) for p in engine.periods] == [100, 400, 600]
+    engine.roll(datetime(2023, 3, 22))
+    assert [engine.spent(p) for p in engine.periods] == [100, 100, 600]
+    engine.roll(datetime(2023, 4, 1))
+    assert [engine.spent(p) for p in engine.periods] == [100, 100, 100]
+    assert min(engine.daily) >= '2023-03-27'
+    # переход назад во времени пересчитывает суммы по репозиторию
+    engine.roll(NOW)
+    assert [engine.spent(p) for p in engine.periods] == [200, 400, 600]
+
+
+def test_is_over(engine):
+    assert not engine.is_over()
+    engine.set_limits([Budget(200, 'day', pk=1), Budget(1000, 'month', pk=2),
+                       Budget(1, 'day', category=1, pk=3)])
+    assert set(engine.limits) == {1, 2}
+    assert not engine.is_over()
+    engine.add(Expense(1, 1, expense_date='2023-03-15\t18:00'))
+    assert engine.is_over()
+
+
+def test_is_over_with_same_period(engine):
+    # лимит второго бюджета на день не заменяет лимит первого
+    engine.set_limits([Budget(100, 'day', pk=1), Budget(1000, 'day', pk=2)])
+    assert engine.is_over()
+    engine.set_limits([Budget(1000, 'day', pk=2), Budget(100, 'day', pk=1)])
+    assert engine.is_over()
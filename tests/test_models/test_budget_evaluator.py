@@ -0,0 +1,71 @@
+"""
+Тесты для вычисления сумм множества бюджетов
+"""
+from datetime import datetime
+import pytest
+
+from bookkeeper.models.budget import Budget
+from bookkeeper.models.budget_evaluator import BudgetEvaluator
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.memory_repository import MemoryRepository
+
+NOW = datetime(2023, 3, 15, 12, 30)  # среда
+# категории: 1 -> 2 -> 3, 4
+PARENTS = {1: None, 2: 1, 3: 2, 4: None}
+
+
+@pytest.fixture
+def repo():
+    repo = MemoryRepository()
+    for category, date in [(1, '2022-12-31'), (3, '2023-01-10'), (2, '2023-03-01'),
+                           (3, '2023-03-15'), (4, '2023-03-15'), (None, '2023-03-14'),
+                           (4, '2023-04-01')]:
+        repo.add(Expense(100, category, expense_date=f'{date}\t10:00'))
+    return repo
+
+
+@pytest.fixture
+def budgets():
+    return [Budget(1000, 'day'), Budget(1000, 'month', category=1),
+            Budget(1000, 'month', category=2), Budget(1000, 'quarter', category=3),
+            Budget(1000, '30d', category=4), Budget(1000, 'year'),
+            Budget(1000, 'week', category=5)]
+
+
+def test_evaluate(repo, budgets):
+    evaluator = BudgetEvaluator(budgets, PARENTS, NOW)
+    assert evaluator.window == ('2023-', '2023.')
+    evaluator.evaluate(repo)
+    assert [b.spent for b in budgets] == [200, 200, 200, 200, 100, 600, 0]
+    # один проход по тратам дает те же суммы, что и запросы каждого бюджета
+    for budget in budgets:
+        if budget.category is None:
+            lower, upper = budget.period_bounds(NOW)
+            assert budget.spent == repo.sum('amount',
+                                            between=('expense_date', lower, upper))
+
+
+def test_apply(repo, budgets):
+    evaluator = BudgetEvaluator(budgets, PARENTS, NOW)
+    evaluator.evaluate(repo)
+    old = Expense(100, 3, expense_date='2023-03-15\t10:00')
+    new = Expense(300, 4, expense_date='2023-03-15\t10:00')
+    evaluator.apply([old], [new])
+    assert [b.spent for b in budgets] == [400, 100, 100, 100, 400, 800, 0]
+    assert not evaluator.is_over()
+    budgets[1].limitation = 50
+    assert evaluator.is_over()
+
+
+def test_members():
+    evaluator = BudgetEvaluator([Budget(0, 'day', category=1), Budget(0, 'day')],
+                                {1: 2, 2: 1})
+    assert evaluator.members(2) == [1, 0]
+    assert evaluator.members(None) == [1]
+
+
+def test_expired():
+    evaluator = BudgetEvaluator([], now=NOW)
+    assert not evaluator.expired(datetime(2023, 3, 15, 23, 59))
+    assert evaluator.expired(datetime(2023, 3, 16))
+    evaluator.evaluate(MemoryRepository())
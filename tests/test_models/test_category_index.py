@@ -0,0 +1,72 @@
+"""
+Тесты для индекса категорий
+"""
+from bookkeeper.models.category import Category
+from bookkeeper.models.category_index import CategoryIndex
+
+
+def test_lookups():
+    food = Category('Продукты', pk=1)
+    meat = Category('мясо', 1, pk=2)
+    index = CategoryIndex([food, meat])
+    assert len(index) == 2
+    assert list(index) == [food, meat]
+    assert index.get(2) is meat
+    assert index.get(None) is None
+    assert index.find('продукты') is food
+    assert index.find('МЯСО') is meat
+    assert 'Мясо' in index
+    assert 'рыба' not in index
+    assert 2 not in index
+    assert index.name(1) == 'Продукты'
+    assert index.name(3) == ''
+    assert index.name(None) == ''
+
+
+def test_mutations():
+    index = CategoryIndex()
+    index.add(Category('food', pk=1))
+    renamed = Category('Еда', pk=1)
+    index.update(renamed)
+    assert 'food' not in index
+    assert index.find('еда') is renamed
+    assert index.get(1) is renamed
+    index.remove(1)
+    index.remove(1)
+    assert len(index) == 0
+    assert 'еда' not in index
+
+
+def test_names_differing_in_case():
+    upper, lower = Category('Food', pk=1), Category('food', pk=2)
+    index = CategoryIndex([upper, lower])
+    assert index.find('FOOD') is upper
+    assert index.get(2) is lower
+    index.update(Category('FOOD', pk=1))
+    assert index.find('food').pk == 1
+    index.remove(2)
+    assert index.find('food').pk == 1
+    index.add(lower)
+    index.remove(1)
+    assert index.find('food') is lower
+    index.remove(2)
+    index.remove(2)
+    assert 'food' not in index and len(index) == 0
+    index = CategoryIndex([upper, lower])
+    index.update(Category('Еда', pk=1))
+    assert index.find('food') is lower
+    assert index.find('еда').pk == 1
+
+
+def test_rename_keeps_order():
+    cats = [Category(name, pk=pk) for pk, name in enumerate(['a', 'b', 'c'], 1)]
+    index = CategoryIndex(cats)
+    renamed = Category('z', pk=2)
+    index.update(renamed)
+    assert list(index) == [cats[0], renamed, cats[2]]
+    assert index.find('z') is renamed and 'b' not in index
+    index.update(Category('A', pk=3))
+    assert [c.pk for c in index] == [1, 2, 3]
+    assert index.find('a') is cats[0]
+    index.remove(1)
+    assert index.find('a').pk == 3
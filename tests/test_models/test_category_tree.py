@@ -0,0 +1,75 @@
+"""
+Тесты для дерева категорий
+"""
+import pytest
+
+from bookkeeper.models.category import Category
+from bookkeeper.models.category_tree import CategoryTree
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.rollup import DailyTotalRepository
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+
+@pytest.fixture
+def tree():
+    # 1 -> 2 -> 3, 1 -> 4, 5; 6 <-> 7 - цикл; 8 - ссылка на несуществующую
+    return CategoryTree([Category('1', None, 1), Category('2', 1, 2),
+                         Category('3', 2, 3), Category('4', 1, 4),
+                         Category('5', None, 5), Category('6', 7, 6),
+                         Category('7', 6, 7), Category('8', 100, 8)])
+
+
+def test_structure(tree):
+    assert tree.children[None] == [1, 5, 8]
+    assert tree.children[1] == [2, 4]
+    assert tree.depth == {1: 0, 2: 1, 3: 2, 4: 1, 5: 0, 8: 0}
+    assert tree.order == [1, 2, 3, 4, 5, 8]
+    assert 3 in tree
+    assert 6 not in tree
+
+
+def test_is_descendant(tree):
+    assert tree.is_descendant(3, 1)
+    assert tree.is_descendant(3, 2)
+    assert not tree.is_descendant(1, 1)
+    assert not tree.is_descendant(4, 2)
+    assert not tree.is_descendant(1, 3)
+    assert not tree.is_descendant(6, 7)
+
+
+def test_descendants_and_ancestors(tree):
+    assert tree.descendants(1) == [2, 3, 4]
+    assert tree.descendants(5) == []
+    assert tree.descendants(6) == []
+    assert tree.ancestors(3) == [2, 1]
+    assert tree.ancestors(1) == []
+    assert tree.ancestors(8) == []
+    assert tree.ancestors(6) == []
+    assert [c.name for c in tree.path(3)] == ['1', '2', '3']
+
+
+def test_deep_tree():
+    cats = [Category(str(i), i - 1 if i > 1 else None, i) for i in range(1, 5001)]
+    tree = CategoryTree(cats)
+    assert tree.depth[5000] == 4999
+    assert tree.is_descendant(5000, 1)
+    assert len(tree.descendants(1)) == 4999
+
+
+def test_rollup(tree):
+    totals = tree.rollup({1: 1, 2: 10, 3: 100, 5: 1000, 6: 5, None: 7})
+    assert totals == {1: 111, 2: 110, 3: 100, 4: 0, 5: 1000, 8: 0}
+
+
+def test_spent(tree, tmp_path):
+    db_file = str(tmp_path / 'spent.db')
+    with SQLiteRepository(db_file, Expense) as exp_repo:
+        for category, date in [(3, '2023-01-01'), (2, '2023-01-02'), (4, '2023-01-02'),
+                               (3, '2023-02-01'), (None, '2023-01-05')]:
+            exp_repo.add(Expense(10, category, expense_date=f'{date}\t10:00'))
+        assert tree.spent(exp_repo) == {1: 40, 2: 30, 3: 20, 4: 10, 5: 0, 8: 0}
+        january = tree.spent(exp_repo, '2023-01-', '2023-02-')
+        assert january == {1: 30, 2: 20, 3: 10, 4: 10, 5: 0, 8: 0}
+        totals_repo = DailyTotalRepository(db_file, exp_repo.connection)
+        assert tree.spent(totals_repo, '2023-01-', '2023-02-',
+                          date_field='day') == january
@@ -20,3 +20,64 @@ def test_can_create_subclass():
     t = Test()
     assert isinstance(t, AbstractRepository)
 
+
+def test_default_batch_methods():
+    class Test(AbstractRepository):
+        def __init__(self):
+            self.data = {}
+
+        def add(self, obj):
+            obj.pk = len(self.data) + 1
+            self.data[obj.pk] = obj
+            return obj.pk
+
+        def get(self, pk):
+            return self.data.get(pk)
+
+        def get_all(self, where=None):
+            return list(self.data.values())
+
+        def delete(self, pk):
+            del self.data[pk]
+
+        def get_all_like(self, like): pass
+        def update(self, obj): pass
+
+    class Custom:
+        pk = 0
+
+    t = Test()
+    objects = [Custom() for i in range(3)]
+    assert t.add_many(objects) == [1, 2, 3]
+    assert t.get_many([3, 1, 4]) == [objects[2], objects[0]]
+    t.delete_many([1, 2])
+    assert t.get_all() == [objects[2]]
+
+
+def test_default_get_page():
+    class Test(AbstractRepository):
+        def __init__(self, objs):
+            self.data = objs
+
+        def get_all(self, where=None, order_by=None, limit=None):
+            return self.data
+
+        def add(self, obj): pass
+        def get(self, pk): pass
+        def get_all_like(self, like): pass
+        def update(self, obj): pass
+        def delete(self, pk): pass
+
+    class Custom:
+        def __init__(self, date, pk):
+            self.date, self.pk = date, pk
+
+    objects = [Custom(d, pk) for pk, d in enumerate([2, 1, None, 2, 3], start=1)]
+    t = Test(objects)
+    page, cursor = t.get_page('date', 2)
+    assert page == [objects[4], objects[3]] and cursor == (2, 4)
+    page, cursor = t.get_page('date', 2, cursor)
+    assert page == [objects[0], objects[1]] and cursor is None
+    page, cursor = t.get_page('date', 3, descending=False)
+    assert page == [objects[1], objects[0], objects[3]] and cursor == (2, 4)
+    assert t.get_page('date', 3, cursor, descending=False) == ([objects[4]], None)
@@ -0,0 +1,101 @@
+import asyncio
+from dataclasses import dataclass
+
+from bookkeeper.repository import sqlite_repository
+from bookkeeper.repository.async_repository import AsyncMemoryRepository, \
+    AsyncSQLiteRepository
+from bookkeeper.repository.filters import Gt
+
+import pytest
+
+
+@dataclass
+class Custom:
+    f1: int
+    f2: str = 'f2_value'
+    pk: int = 0
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_repo(request, tmp_path):
+    if request.param == 'memory':
+        return AsyncMemoryRepository
+    return lambda: AsyncSQLiteRepository(str(tmp_path / 'test.db'), Custom, readers=2)
+
+
+def run(make_repo, scenario):
+    async def main():
+        async with make_repo() as repo:
+            return await scenario(repo)
+    return asyncio.run(main())
+
+
+def test_crud(make_repo):
+    async def scenario(repo):
+        obj = Custom(1)
+        pk = await repo.add(obj)
+        assert obj.pk == pk
+        assert await repo.get(pk) == obj
+        obj2 = Custom(2, pk=pk)
+        await repo.update(obj2)
+        assert await repo.get(pk) == obj2
+        await repo.delete(pk)
+        assert await repo.get(pk) is None
+    run(make_repo, scenario)
+
+
+def test_queries(make_repo):
+    async def scenario(repo):
+        objects = [Custom(i, f2=f'value {i}') for i in range(10)]
+        for obj in objects:
+            await repo.add(obj)
+        assert await repo.get_all() == objects
+        assert await repo.get_all(Gt('f1', 6), order_by='-f1', limit=2) == [
+            objects[9], objects[8]]
+        assert await repo.get_all({'f1': 3}) == [objects[3]]
+        assert await repo.get_all_like({'f2': '5'}) == [objects[5]]
+        assert await repo.aggregate('sum', 'f1') == 45
+        assert [obj async for obj in repo.aiter_all(batch_size=3)] == objects
+        assert [obj async for obj in repo.aiter_all(Gt('f1', 7))] == objects[8:]
+    run(make_repo, scenario)
+
+
+def test_concurrent_readers(make_repo):
+    async def scenario(repo):
+        for i in range(20):
+            await repo.add(Custom(i))
+        results = await asyncio.gather(*(repo.get(pk) for pk in range(1, 21)))
+        assert [obj.f1 for obj in results] == list(range(20))
+    run(make_repo, scenario)
+
+
+def test_sqlite_batches_and_early_exit(tmp_path):
+    async def main():
+        async with AsyncSQLiteRepository(str(tmp_path / 'test.db'), Custom) as repo:
+            objects = [Custom(i) for i in range(10)]
+            assert await repo.add_many(objects) == list(range(1, 11))
+            await repo.delete_many([1, 2])
+            async for obj in repo.aiter_all(batch_size=2):
+                assert obj == objects[2]
+                break
+            return await repo.get_all()
+    assert [obj.f1 for obj in asyncio.run(main())] == list(range(2, 10))
+
+
+def test_sqlite_creates_schema_once(tmp_path, monkeypatch):
+    calls = []
+    create_schema = sqlite_repository.create_schema
+
+    def counting(*args, **kwargs):
+        calls.append(args[1])
+        create_schema(*args, **kwargs)
+    monkeypatch.setattr(sqlite_repository, 'create_schema', counting)
+
+    async def main():
+        async with AsyncSQLiteRepository(str(tmp_path / 'test.db'), Custom,
+                                         readers=3) as repo:
+            await repo.add_many([Custom(i) for i in range(5)])
+            await asyncio.gather(*(repo.get(pk) for pk in range(1, 6)))
+            return [obj.f1 async for obj in repo.aiter_all()]
+    assert asyncio.run(main()) == list(range(5))
+    assert calls == ['custom']
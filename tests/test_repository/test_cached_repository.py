@@ -0,0 +1,203 @@
+from dataclasses import dataclass
+
+from bookkeeper.repository.cached_repository import CachedRepository
+from bookkeeper.repository.filters import Eq, Gt
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+from bookkeeper.repository.factory import repository_factory
+from bookkeeper.models.category import Category
+
+import pytest
+
+
+@dataclass
+class Custom:
+    name: str = ''
+    value: int = 0
+    pk: int = 0
+
+
+class CountingRepository(MemoryRepository[Custom]):
+    def __init__(self):
+        super().__init__()
+        self.queries = 0
+
+    def get(self, pk):
+        self.queries += 1
+        return super().get(pk)
+
+    def get_all(self, where=None, order_by=None, limit=None):
+        self.queries += 1
+        return super().get_all(where, order_by, limit)
+
+
+@pytest.fixture
+def inner():
+    inner = CountingRepository()
+    for i in range(5):
+        inner.add(Custom(name=f'n{i}', value=i))
+    inner.queries = 0
+    return inner
+
+
+@pytest.fixture
+def repo(inner):
+    return CachedRepository(inner)
+
+
+def test_get_is_cached(repo, inner):
+    assert repo.get(1) == inner.get(1)
+    inner.queries = 0
+    assert repo.get(1).name == 'n0'
+    assert repo.get(100) is None
+    assert repo.get(100) is None
+    assert inner.queries == 1
+    assert (repo.hits, repo.misses) == (2, 2)
+
+
+def test_get_all_is_cached(repo, inner):
+    assert repo.get_all({'name': 'n1'}) == [inner.get(2)]
+    assert repo.get_all(Eq('name', 'n1')) == [inner.get(2)]
+    assert repo.get_all(Gt('value', 2), order_by='-value') == [
+        inner.get(5), inner.get(4)]
+    assert repo.get_all(Gt('value', 2), order_by='-value', limit=1) == [inner.get(5)]
+    inner.queries = 0
+    repo.get_all({'name': 'n1'})
+    repo.get_all(Gt('value', 2), order_by='-value')
+    assert inner.queries == 0
+    assert repo.hits == 2
+
+
+def test_returns_copies(repo):
+    obj = repo.get(1)
+    obj.name = 'changed'
+    repo.get_all()[0].name = 'changed'
+    assert repo.get(1).name == 'n0'
+    assert repo.get_all()[0].name == 'n0'
+
+
+def test_invalidation(repo, inner):
+    repo.get(1)
+    repo.get(2)
+    repo.get_all({'name': 'n9'})
+    repo.get_all(Gt('value', 3))
+    repo.get_all()
+    # новый объект попадает под условие запросов name == 'n9' и всех объектов
+    repo.add(Custom(name='n9', value=0))
+    assert len(repo) == 3
+    assert [o.pk for o in repo.get_all({'name': 'n9'})] == [6]
+    assert len(repo.get_all()) == 6
+    # измененный объект был в результате запроса и начал подходить под условие
+    obj = repo.get(1)
+    obj.value = 10
+    repo.update(obj)
+    assert [o.pk for o in repo.get_all(Gt('value', 3))] == [1, 5]
+    assert repo.get(1).value == 10
+    inner.queries = 0
+    repo.get(2)
+    assert inner.queries == 0
+    repo.delete(2)
+    assert repo.get(2) is None
+    assert len(repo.get_all()) == 5
+    repo.delete_many([3, 4])
+    assert [o.pk for o in repo.get_all()] == [1, 5, 6]
+    repo.add_many([Custom(name='n9'), Custom(name='n8')])
+    assert [o.pk for o in repo.get_all({'name': 'n9'})] == [6, 7]
+
+
+def test_get_many(repo, inner):
+    repo.get(1)
+    inner.queries = 0
+    assert [o.pk for o in repo.get_many([3, 1, 100, 2])] == [3, 1, 2]
+    assert [o.pk for o in repo.get_many([3, 1, 2])] == [3, 1, 2]
+    assert inner.queries == 0
+
+
+def test_lru_eviction(inner):
+    repo = CachedRepository(inner, max_entries=2)
+    repo.get(1)
+    repo.get(2)
+    repo.get(1)
+    repo.get(3)
+    assert len(repo) == 2
+    inner.queries = 0
+    repo.get(1)
+    repo.get(3)
+    assert inner.queries == 0
+    repo.get(2)
+    assert inner.queries == 1
+
+
+def test_byte_eviction(inner):
+    repo = CachedRepository(inner, max_entries=None, max_bytes=1)
+    repo.get(1)
+    assert len(repo) == 0 and repo.size == 0
+    repo = CachedRepository(inner, max_entries=None, max_bytes=10**6)
+    repo.get_all()
+    repo.get(1)
+    assert len(repo) == 2 and 0 < repo.size <= 10**6
+    repo.clear()
+    assert len(repo) == 0 and repo.size == 0
+
+
+def test_passthrough_queries(repo):
+    assert repo.sum('value') == 10
+    assert [o.pk for o in repo.get_between('value', 1, 3)] == [2, 3]
+    assert [o.pk for o in repo.iter_all(Gt('value', 2))] == [4, 5]
+    assert [o.pk for o in repo.get_all_like({'name': '3'})] == [4]
+
+
+def test_sqlite_factory(tmp_path):
+    with repository_factory(SQLiteRepository, db_file=str(tmp_path / 'db.sqlite'),
+                            cache_size=16) as repo_gen:
+        repo = repo_gen(Category)
+        assert isinstance(repo, CachedRepository)
+        assert repo.max_entries == 16
+        cat = Category('name')
+        repo.add(cat)
+        assert repo.get_all({'name': 'name'}) == [cat]
+        cat.name = 'other'
+        repo.update(cat)
+        assert repo.get_all({'name': 'name'}) == []
+        assert repo.get(cat.pk) == cat
+    assert not isinstance(repository_factory(MemoryRepository)(Category),
+                          CachedRepository)
+
+
+def test_bulk_changes_invalidate(repo, inner):
+    assert [o.pk for o in repo.get_all(Gt('value', 2))] == [4, 5]
+    assert repo.get(1).value == 0
+    assert repo.update_where(Eq('value', 0), {'value': 10}) == 1
+    assert [o.pk for o in repo.get_all(Gt('value', 2))] == [1, 4, 5]
+    assert repo.get(1).value == 10
+    assert repo.delete_where(Gt('value', 3)) == 2
+    assert [o.pk for o in repo.get_all(Gt('value', 2))] == [4]
+    assert repo.get(5) is None
+
+
+def test_returns_copies_of_slotted_objects():
+    repo = CachedRepository(MemoryRepository[Category]())
+    cat = Category('name', 5)
+    repo.add(cat)
+    obj = repo.get(cat.pk)
+    assert obj == cat and obj is not repo.get(cat.pk)
+    obj.name = 'changed'
+    assert repo.get(cat.pk).name == 'name'
+
+
+@pytest.mark.parametrize('many', [False, True])
+def test_delete_follows_foreign_key_cascade(tmp_path, many):
+    with SQLiteRepository(db_file=str(tmp_path / 'fk.db'), cls=Category) as inner:
+        repo = CachedRepository(inner)
+        parent = Category('parent')
+        repo.add(parent)
+        child = Category('child', parent.pk)
+        repo.add(child)
+        assert repo.get(child.pk).parent == parent.pk
+        assert repo.get_all({'name': 'child'})[0].parent == parent.pk
+        if many:
+            repo.delete_many([parent.pk])
+        else:
+            repo.delete(parent.pk)
+        assert repo.get(child.pk).parent is None
+        assert repo.get_all({'name': 'child'})[0].parent is None
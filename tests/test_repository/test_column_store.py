@@ -0,0 +1,133 @@
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from bookkeeper.models.expense import Expense  # noqa: E402
+from bookkeeper.repository.column_store import ExpenseColumnStore  # noqa: E402
+from bookkeeper.repository.filters import Eq, In, Lt, Le, Gt, Ge, Between, \
+    Prefix, Contains, IsNull, And  # noqa: E402
+from bookkeeper.repository.memory_repository import MemoryRepository  # noqa: E402
+
+
+def make_expenses(n, seed=0):
+    rnd = random.Random(seed)
+    exps = []
+    for i in range(n):
+        day = f'2023-{rnd.randint(1, 3):02}-{rnd.randint(1, 28):02}'
+        time = rnd.choice(['', '\t10:00', '\t23:59', ' 08:30'])
+        exps.append(Expense(rnd.randint(1, 500), rnd.choice([None, 0, 1, 2, 3]),
+                            expense_date=day + time, added_date=f'2023-04-0{i % 3 + 1}',
+                            comment=rnd.choice(['', 'milk', 'bread', 'milkshake'])))
+    return exps
+
+
+def copies(exps):
+    return [Expense(e.amount, e.category, e.expense_date, e.added_date, e.comment)
+            for e in exps]
+
+
+@pytest.fixture
+def stores():
+    exps = make_expenses(500)
+    store, memory = ExpenseColumnStore(capacity=16), MemoryRepository()
+    store.add_many(copies(exps))
+    memory.add_many(copies(exps))
+    for pk in (3, 50, 51, 400):
+        store.delete(pk)
+        memory.delete(pk)
+    return store, memory
+
+
+def test_crud():
+    store = ExpenseColumnStore()
+    exp = Expense(100, 1, '2023-01-05\t10:00', comment='test')
+    pk = store.add(exp)
+    assert exp.pk == pk == 1
+    assert store.get(pk) == exp
+    exp.amount, exp.category, exp.expense_date = 200, None, '2023-02-01'
+    store.update(exp)
+    assert store.get(pk) == exp
+    assert store.get(2) is None and store.get(0) is None
+    store.delete(pk)
+    assert store.get(pk) is None
+    with pytest.raises(ValueError):
+        store.update(exp)
+    with pytest.raises(ValueError):
+        store.delete(pk)
+    with pytest.raises(ValueError):
+        store.add(exp)
+    with pytest.raises(ValueError):
+        store.add(Expense(1, 1, '05.01.2023'))
+
+
+@pytest.mark.parametrize('flt', [
+    None,
+    Eq('category', 2), IsNull('category'), In('category', [1, None]),
+    Gt('amount', 250), Between('amount', 10, 100), Le('pk', 100),
+    Ge('category', 1),
+    Eq('expense_date', '2023-01-05'), Eq('expense_date', '2023-01-05\t10:00'),
+    Lt('expense_date', '2023-02-10'), Le('expense_date', '2023-02-10\t10:00'),
+    Gt('expense_date', '2023-02-10'), Ge('expense_date', '2023-02-10 08:30'),
+    Between('expense_date', '2023-02-', '2023-03-'),
+    Between('expense_date', '2023-01-15', '2023-02-15\t12:00'),
+    Prefix('expense_date', '2023-02'), Prefix('expense_date', ''),
+    In('expense_date', ['2023-01-05', '2023-03-01\t23:59']),
+    Contains('comment', 'milk'), Eq('added_date', '2023-04-02'),
+    Contains('expense_date', '10:00'),
+    And(Eq('category', 1), Ge('expense_date', '2023-02-01'), Contains('comment', 'a')),
+])
+def test_queries_match_memory_repository(stores, flt):
+    store, memory = stores
+    assert store.get_all(flt) == memory.get_all(flt)
+    assert store.filter(flt).tolist() == [e.pk for e in memory.get_all(flt)]
+    assert store.get_all(flt, order_by=['-amount', 'expense_date'], limit=7) == \
+        memory.get_all(flt, order_by=['-amount', 'expense_date'], limit=7)
+    assert list(store.iter_all(flt, batch_size=10)) == memory.get_all(flt)
+
+
+@pytest.mark.parametrize('func', ['sum', 'count', 'min', 'max', 'avg'])
+@pytest.mark.parametrize('group_by', [None, 'category', 'expense_date', 'comment'])
+def test_aggregates_match_memory_repository(stores, func, group_by):
+    store, memory = stores
+    where = Ge('expense_date', '2023-02-01')
+    for field in ('amount', '*') if func == 'count' else ('amount', 'category'):
+        expected = memory.aggregate(func, field, where, group_by)
+        result = store.aggregate(func, field, where, group_by)
+        if func == 'avg':
+            assert result == pytest.approx(expected)
+        else:
+            assert result == expected
+
+
+def test_totals_by_day(stores):
+    store, memory = stores
+    expected = {}
+    for exp in memory.get_all(Eq('category', 1)):
+        day = exp.expense_date[:10]
+        expected[day] = expected.get(day, 0) + exp.amount
+    assert store.totals_by_day(Eq('category', 1)) == expected
+    assert store.sum('amount', between=('expense_date', '2023-02-', '2023-03-')) == \
+        memory.sum('amount', between=('expense_date', '2023-02-', '2023-03-'))
+
+
+def test_bulk_changes(stores):
+    store, memory = stores
+    where = And(Eq('category', 1), Lt('expense_date', '2023-02-01'))
+    values = {'category': None, 'comment': 'moved', 'expense_date': '2023-05-01\t12:00'}
+    assert store.update_where(where, values) == memory.update_where(where, values)
+    assert store.get_all() == memory.get_all()
+    assert store.delete_where(Contains('comment', 'milk')) == \
+        memory.delete_where(Contains('comment', 'milk'))
+    assert store.get_all() == memory.get_all()
+    pks = store.filter().tolist()[:2]
+    store.delete_many(pks)
+    memory.delete_many(pks)
+    assert store.count() == memory.count()
+    with pytest.raises(ValueError):
+        store.delete_many(pks)
+    with pytest.raises(ValueError):
+        store.update_where(None, {'pk': 1})
+    with pytest.raises(ValueError):
+        store.get_all(Eq('unknown', 1))
@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+
+import pytest
+
+from bookkeeper.repository.filters import Eq, IsNull, In, Lt, Le, Gt, Ge, Between, \
+    Prefix, Contains, And, to_filter, order_fields, prefix_bounds, select
+
+
+@dataclass
+class Custom:
+    name: str | None
+    value: int | None
+    pk: int = 0
+
+
+def column(field):
+    if field == 'unknown':
+        raise ValueError(field)
+    return field
+
+
+@pytest.fixture
+def objects():
+    return [Custom('a', 3, 1), Custom('ab', None, 2), Custom('b', 1, 3),
+            Custom(None, 2, 4), Custom('abc', 1, 5)]
+
+
+def test_prefix_bounds():
+    assert prefix_bounds('2023-01-') == ('2023-01-', '2023-01.')
+    with pytest.raises(ValueError):
+        prefix_bounds('')
+
+
+@pytest.mark.parametrize('flt, sql, params, pks', [
+    (Eq('value', 1), 'value = ?', [1], [3, 5]),
+    (Eq('value', None), 'value IS NULL', [], [2]),
+    (IsNull('name'), 'name IS NULL', [], [4]),
+    (In('value', [1, 3]), 'value IN (?, ?)', [1, 3], [1, 3, 5]),
+    (In('value', []), '0', [], []),
+    (Lt('value', 2), 'value < ?', [2], [3, 5]),
+    (Le('value', 2), 'value <= ?', [2], [3, 4, 5]),
+    (Gt('value', 2), 'value > ?', [2], [1]),
+    (Ge('value', 2), 'value >= ?', [2], [1, 4]),
+    (Between('value', 1, 3), 'value >= ? AND value < ?', [1, 3], [3, 4, 5]),
+    (Prefix('name', 'ab'), 'name >= ? AND name < ?', ['ab', 'ac'], [2, 5]),
+    (Prefix('name', ''), 'name >= ?', [''], [1, 2, 3, 5]),
+    (Contains('name', 'b'), 'name LIKE ?', ['%b%'], [2, 3, 5]),
+    (Prefix('name', 'a') & Eq('value', 1),
+     'name >= ? AND name < ? AND value = ?', ['a', 'b', 1], [5]),
+    (And(), '1', [], [1, 2, 3, 4, 5]),
+])
+def test_filters(objects, flt, sql, params, pks):
+    condition, flt_params = flt.to_sql(column)
+    assert condition == sql
+    assert sorted(flt_params, key=str) == sorted(params, key=str)
+    objs = [o for o in objects if o.name is not None or not isinstance(flt, Contains)]
+    assert [o.pk for o in objs if flt.match(o)] == pks
+
+
+def test_unknown_field():
+    with pytest.raises(ValueError):
+        Eq('unknown', 1).to_sql(column)
+
+
+def test_and_is_flat():
+    flt = Eq('a', 1) & Eq('b', 2) & Eq('c', 3)
+    assert flt == And(Eq('a', 1), Eq('b', 2), Eq('c', 3))
+    assert flt.fields() == {'a', 'b', 'c'}
+    assert hash(flt) == hash(And(Eq('a', 1), Eq('b', 2), Eq('c', 3)))
+
+
+def test_to_filter():
+    assert to_filter(None) is None
+    flt = Eq('a', 1)
+    assert to_filter(flt) is flt
+    assert to_filter({'a': 1, 'b': None}) == And(Eq('a', 1), Eq('b', None))
+
+
+def test_order_fields():
+    assert order_fields(None) == []
+    assert order_fields('-a') == [('a', True)]
+    assert order_fields(['a', '-b']) == [('a', False), ('b', True)]
+
+
+def test_select(objects):
+    assert [o.pk for o in select(objects, order_by='value')] == [2, 3, 5, 4, 1]
+    assert [o.pk for o in select(objects, order_by=['-value', '-pk'])] == \
+        [1, 4, 5, 3, 2]
+    assert [o.pk for o in select(objects, {'value': 1}, limit=1)] == [3]
@@ -1,4 +1,11 @@
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from bookkeeper.repository.filters import Eq, IsNull, In, Lt, Le, Gt, Ge, Between, \
+    Prefix
+from bookkeeper.models.category import Category
 from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
 from bookkeeper.repository.factory import repository_factory
 
 import pytest
@@ -87,4 +94,255 @@ def test_get_like(repo, custom_class):
 def test_factory(custom_class):
     repo_gen = repository_factory(MemoryRepository)
     rep = repo_gen(custom_class)
-    test_crud(rep, custom_class)
\ No newline at end of file
+    test_crud(rep, custom_class)
+
+
+def test_add_many(repo, custom_class):
+    objects = [custom_class() for i in range(5)]
+    pks = repo.add_many(objects)
+    assert pks == [o.pk for o in objects]
+    assert len(set(pks)) == 5
+    assert repo.get_all() == objects
+
+
+def test_cannot_add_many_with_pk(repo, custom_class):
+    objects = [custom_class() for i in range(3)]
+    objects[1].pk = 1
+    with pytest.raises(ValueError):
+        repo.add_many(objects)
+    assert repo.get_all() == []
+
+
+def test_get_many(repo, custom_class):
+    objects = [custom_class() for i in range(5)]
+    pks = repo.add_many(objects)
+    assert repo.get_many([pks[3], pks[0], -1]) == [objects[3], objects[0]]
+
+
+def test_delete_many(repo, custom_class):
+    objects = [custom_class() for i in range(5)]
+    pks = repo.add_many(objects)
+    repo.delete_many(pks[1:3])
+    assert repo.get_all() == [objects[0], *objects[3:]]
+    with pytest.raises(KeyError):
+        repo.delete_many([pks[0], -1])
+    assert repo.get(pks[0]) is objects[0]
+
+
+def test_get_between(repo, custom_class):
+    objects = []
+    for i in [5, 1, 4, None, 2, 3]:
+        o = custom_class()
+        o.value = i
+        repo.add(o)
+        objects.append(o)
+    assert [o.value for o in repo.get_between('value', 2, 5)] == [2, 3, 4]
+    # индекс поддерживается при изменении и удалении
+    objects[0].value = 3
+    repo.update(objects[0])
+    repo.delete(objects[2].pk)
+    o = custom_class()
+    o.value = 2
+    repo.add(o)
+    assert [o.value for o in repo.get_between('value', 2, 5)] == [2, 2, 3, 3]
+    repo.delete_many([objects[4].pk, o.pk])
+    assert repo.get_between('value', 2, 5) == [objects[0], objects[5]]
+
+
+def test_iter_all(repo, custom_class):
+    objects = []
+    for i in range(5):
+        o = custom_class()
+        o.name = str(i % 2)
+        repo.add(o)
+        objects.append(o)
+    gen = repo.iter_all()
+    assert isinstance(gen, Iterator)
+    assert list(gen) == objects
+    assert list(repo.iter_all({'name': '1'})) == [objects[1], objects[3]]
+    # изменение репозитория во время перебора допустимо
+    for o in repo.iter_all():
+        repo.delete(o.pk)
+    assert repo.get_all() == []
+
+
+def test_aggregate(repo, custom_class):
+    for i in range(6):
+        o = custom_class()
+        o.amount = i
+        o.group = i % 2
+        repo.add(o)
+    assert repo.sum('amount') == 15
+    assert repo.count() == 6
+    assert repo.aggregate('min', 'amount') == 0
+    assert repo.aggregate('max', 'amount', where={'group': 0}) == 4
+    assert repo.aggregate('avg', 'amount') == 2.5
+    assert repo.sum('amount', group_by='group') == {0: 6, 1: 9}
+    assert repo.count(group_by='group', between=('amount', 1, 4)) == {1: 2, 0: 1}
+    assert repo.sum('amount', where={'group': 1}, between=('amount', 1, 4)) == 4
+    assert repo.sum('amount', between=('amount', 10, 20)) == 0
+    assert repo.aggregate('max', 'amount', where={'group': 2}) is None
+    with pytest.raises(ValueError):
+        repo.aggregate('median', 'amount')
+
+
+def test_get_all_with_filters(repo, custom_class):
+    objects = []
+    for i in range(6):
+        o = custom_class()
+        o.value = i
+        o.name = f"name{i % 3}"
+        repo.add(o)
+        objects.append(o)
+    assert repo.get_all(In('value', [1, 4])) == [objects[1], objects[4]]
+    assert repo.get_all(Prefix('name', 'name1') & Ge('value', 2)) == [objects[4]]
+    assert repo.get_all(Lt('value', 3), order_by='-value', limit=2) == \
+        [objects[2], objects[1]]
+    assert list(repo.iter_all(order_by=['name', '-pk'], limit=3)) == \
+        [objects[3], objects[0], objects[4]]
+    assert repo.count(Ge('value', 3)) == 3
+
+
+@pytest.fixture
+def indexed_repo(custom_class):
+    repo = MemoryRepository(hash_indexes=['group'], sorted_indexes=['date'])
+    objects = []
+    for i in range(10):
+        o = custom_class()
+        o.group = i % 3
+        o.date = f"2023-01-{i + 10}" if i != 5 else None
+        repo.add(o)
+        objects.append(o)
+    return repo, objects
+
+
+def full_scan(objects, flt):
+    return [o for o in objects if flt.match(o)]
+
+
+@pytest.mark.parametrize('flt', [
+    Eq('group', 1), In('group', [0, 2]), Eq('group', 5), Eq('date', '2023-01-12'),
+    IsNull('date'), Between('date', '2023-01-12', '2023-01-15'),
+    Prefix('date', '2023-01-1'), Lt('date', '2023-01-13'), Le('date', '2023-01-13'),
+    Gt('date', '2023-01-17'), Ge('date', '2023-01-17'),
+    Eq('group', 0) & Ge('date', '2023-01-13'),
+])
+def test_indexed_queries(indexed_repo, flt):
+    repo, objects = indexed_repo
+    assert repo.get_all(flt) == full_scan(objects, flt)
+
+
+def test_index_is_used(indexed_repo):
+    repo, objects = indexed_repo
+    flt = Eq('group', 1) & Between('date', '2023-01-10', '2023-01-14')
+    # выбирается самый избирательный индекс: по group
+    assert list(repo._candidates(flt)) == [objects[1], objects[4], objects[7]]
+    assert list(repo._candidates(Eq('other', 1))) == objects
+
+
+def test_indexes_are_maintained(indexed_repo, custom_class):
+    repo, objects = indexed_repo
+    objects[0].group = 1
+    objects[0].date = "2023-01-30"
+    repo.update(objects[0])
+    repo.delete(objects[1].pk)
+    repo.delete_many([objects[4].pk, objects[7].pk])
+    o = custom_class()
+    o.group = 1
+    o.date = "2023-01-12"
+    repo.add(o)
+    alive = [objects[0], objects[2], objects[3], objects[5], objects[6],
+             objects[8], objects[9], o]
+    for flt in [Eq('group', 1), Ge('date', '2023-01-12'), Eq('group', 0)]:
+        assert repo.get_all(flt) == full_scan(alive, flt)
+    repo.create_index('group', kind='sorted')
+    assert repo.get_all(Gt('group', 0)) == full_scan(alive, Gt('group', 0))
+    with pytest.raises(ValueError):
+        repo.create_index('group', kind='btree')
+
+
+def test_factory_transaction_is_noop(custom_class):
+    repo_gen = repository_factory(MemoryRepository)
+    repo = repo_gen(custom_class)
+    with repo_gen.transaction():
+        with repo_gen.transaction():
+            repo.add(custom_class())
+    assert len(repo.get_all()) == 1
+
+
+@pytest.mark.parametrize('where', [None, {'f2': 'even'}])
+@pytest.mark.parametrize('descending', [True, False])
+def test_get_page(repo, where, descending):
+    @dataclass
+    class Custom:
+        f1: int | None
+        f2: str = ''
+        pk: int = 0
+
+    custom_class = Custom
+    objects = [custom_class(f1=i % 4, f2='even' if i % 2 == 0 else 'odd')
+               for i in range(11)]
+    objects.append(custom_class(f1=None))
+    repo.add_many(objects)
+    expected = sorted((o for o in objects if o.f1 is not None
+                       and (where is None or o.f2 == where['f2'])),
+                      key=lambda o: (o.f1, o.pk), reverse=descending)
+    pages = []
+    cursor = None
+    while True:
+        page, cursor = repo.get_page('f1', 3, cursor, where, descending)
+        pages.append(page)
+        if cursor is None:
+            break
+        assert cursor == (page[-1].f1, page[-1].pk)
+    assert [o for page in pages for o in page] == expected
+    assert all(len(page) == 3 for page in pages[:-1]) and pages[-1]
+
+
+def test_hierarchy_queries():
+    repo = MemoryRepository()
+    # 1 -> 2 -> 3 -> 4, 2 -> 5, 6
+    cats = [Category(str(i)) for i in range(1, 7)]
+    repo.add_many(cats)
+    for child, parent in [(2, 1), (3, 2), (4, 3), (5, 2)]:
+        cats[child - 1].parent = parent
+    assert repo.get_descendants(1) == cats[1:5]
+    assert repo.get_descendants(6) == []
+    assert repo.get_ancestors(4) == [cats[2], cats[1], cats[0]]
+    assert repo.get_ancestors(100) == []
+    cats[0].parent = 4
+    assert repo.get_descendants(1) == cats[1:5]
+    assert repo.get_ancestors(4) == [cats[2], cats[1], cats[0]]
+
+
+def test_update_and_delete_where():
+    repo = MemoryRepository(hash_indexes=['parent'])
+    cats = [Category(str(i), i % 2 or None) for i in range(6)]
+    repo.add_many(cats)
+    assert repo.update_where({'parent': 1}, {'parent': 7}) == 3
+    assert [c.name for c in repo.get_all({'parent': 7})] == ['1', '3', '5']
+    assert repo.get_all({'parent': 1}) == []
+    with pytest.raises(ValueError):
+        repo.update_where(None, {'pk': 1})
+    assert repo.delete_where(IsNull('parent')) == 3
+    assert [c.name for c in repo.get_all()] == ['1', '3', '5']
+
+
+@pytest.mark.parametrize('repo_type', [MemoryRepository, SQLiteRepository])
+def test_unknown_field(repo_type, tmp_path):
+    repo_gen = repository_factory(repo_type, db_file=None if repo_type is MemoryRepository
+                                  else str(tmp_path / 'test.db'))
+    repo = repo_gen(Category)
+    repo.add(Category('a'))
+    for query in (lambda: repo.get_all(Eq('unknown', 1)),
+                  lambda: repo.get_all({'name': 'a', 'unknown': 1}),
+                  lambda: repo.get_all(order_by=['name', '-unknown']),
+                  lambda: repo.get_between('unknown', 0, 1),
+                  lambda: repo.get_page('unknown', 10),
+                  lambda: repo.sum('unknown'),
+                  lambda: repo.count(group_by='unknown'),
+                  lambda: repo.get_descendants(1, parent_field='unknown'),
+                  lambda: repo.update_where(None, {'unknown': 1})):
+        with pytest.raises(ValueError):
+            query()
+    assert repo.get_all(Eq('pk', 1), order_by='-name') == [Category('a', pk=1)]
@@ -0,0 +1,144 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from bookkeeper.models.budget import Budget
+from bookkeeper.models.budget_engine import BudgetEngine
+from bookkeeper.models.budget_evaluator import BudgetEvaluator
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.factory import repository_factory
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.rollup import DailyTotalRepository, main
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    return str(tmp_path / 'rollup.db')
+
+
+def expected(exp_repo):
+    totals = {}
+    for exp in exp_repo.get_all():
+        if exp.expense_date is None:
+            continue
+        key = (exp.expense_date[:10], exp.category)
+        amount, count = totals.get(key, (0, 0))
+        totals[key] = (amount + exp.amount, count + 1)
+    return totals
+
+
+def actual(totals_repo):
+    return {(t.day, t.category): (t.amount, t.count) for t in totals_repo.get_all()}
+
+
+def random_expense(rnd):
+    date = rnd.choice([None, *(f'2023-01-0{day}\t10:00' for day in range(1, 6))])
+    return Expense(rnd.randint(1, 100), rnd.choice([None, 1, 2]), expense_date=date)
+
+
+def test_triggers_keep_totals_in_sync(db_file):
+    rnd = random.Random(1)
+    with SQLiteRepository(db_file, Expense) as exp_repo:
+        totals_repo = DailyTotalRepository(db_file, exp_repo.connection)
+        exp_repo.add_many(random_expense(rnd) for _ in range(50))
+        assert actual(totals_repo) == expected(exp_repo)
+        for _ in range(100):
+            exps = exp_repo.get_all()
+            action = rnd.random()
+            if action < 0.3 or len(exps) < 3:
+                exp_repo.add(random_expense(rnd))
+            elif action < 0.7:
+                exp = rnd.choice(exps)
+                new = random_expense(rnd)
+                exp.amount, exp.category, exp.expense_date = \
+                    new.amount, new.category, new.expense_date
+                exp_repo.update(exp)
+            else:
+                exp_repo.delete_many(exp.pk for exp in rnd.sample(exps, 3))
+            assert actual(totals_repo) == expected(exp_repo)
+
+
+def test_expenses_without_date_are_skipped(db_file):
+    with SQLiteRepository(db_file, Expense) as exp_repo:
+        exp_repo.add(Expense(5, 1, expense_date=None))
+        totals_repo = DailyTotalRepository(db_file, exp_repo.connection)
+        assert actual(totals_repo) == {}
+        exp = Expense(10, 1, expense_date=None)
+        exp_repo.add(exp)
+        assert actual(totals_repo) == {}
+        exp.expense_date = '2023-01-01\t10:00'
+        exp_repo.update(exp)
+        assert actual(totals_repo) == {('2023-01-01', 1): (10, 1)}
+        exp.expense_date = None
+        exp_repo.update(exp)
+        assert actual(totals_repo) == {}
+        exp_repo.delete(exp.pk)
+        assert totals_repo.count() == 0
+
+
+def test_install_replaces_old_triggers(db_file):
+    with SQLiteRepository(db_file, Expense) as exp_repo:
+        DailyTotalRepository(db_file, exp_repo.connection)
+        con = exp_repo.connection
+        con.execute('DROP TRIGGER dailytotal_insert')
+        con.execute('CREATE TRIGGER dailytotal_insert AFTER INSERT ON expense '
+                    'BEGIN INSERT INTO dailytotal (day, category) VALUES (NULL, 0); END')
+        exp_repo.add(Expense(5, 1, expense_date='2023-01-01\t10:00'))
+        totals_repo = DailyTotalRepository(db_file, con)
+        assert actual(totals_repo) == {('2023-01-01', 1): (5, 1)}
+        exp_repo.add(Expense(5, 1, expense_date='2023-01-01\t12:00'))
+        assert actual(totals_repo) == {('2023-01-01', 1): (10, 2)}
+        assert not totals_repo.install()
+
+
+def test_rebuild_existing_database(db_file, capsys):
+    with SQLiteRepository(db_file, Expense) as exp_repo:
+        exp_repo.add_many([Expense(10, 1, expense_date='2023-01-01\t10:00'),
+                           Expense(20, 1, expense_date='2023-01-01\t12:00'),
+                           Expense(30, None, expense_date='2023-01-02\t10:00')])
+        totals_repo = DailyTotalRepository(db_file, exp_repo.connection)
+        assert actual(totals_repo) == {('2023-01-01', 1): (30, 2),
+                                       ('2023-01-02', None): (30, 1)}
+        exp_repo.connection.execute('DELETE FROM dailytotal')
+        exp_repo.connection.commit()
+    main(['rollup', db_file])
+    assert '2 daily totals rebuilt' in capsys.readouterr().out
+    with DailyTotalRepository(db_file) as totals_repo:
+        assert totals_repo.sum('amount', group_by='day') == {'2023-01-01': 30,
+                                                             '2023-01-02': 30}
+    with pytest.raises(SystemExit):
+        main(['rollup'])
+
+
+def test_factory_daily_totals(db_file):
+    assert repository_factory(MemoryRepository, rollup=True).daily_totals() is None
+    with repository_factory(SQLiteRepository, db_file=db_file) as repo_gen:
+        repo_gen(Expense).add(Expense(10, 1, expense_date='2023-01-01\t09:00'))
+        assert repo_gen.daily_totals() is None
+        # без rollup=True триггеры не замедляют запись трат
+        triggers = repo_gen.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall()
+        assert triggers == []
+    with repository_factory(SQLiteRepository, db_file=db_file, cache_size=10,
+                            rollup=True) as repo_gen:
+        exp_repo = repo_gen(Expense)
+        totals_repo = repo_gen.daily_totals()
+        with repo_gen.transaction():
+            exp_repo.add(Expense(10, 1, expense_date='2023-01-01\t10:00'))
+        assert actual(totals_repo) == {('2023-01-01', 1): (20, 2)}
+
+
+def test_budgets_from_totals(db_file):
+    now = datetime(2023, 1, 3)
+    with SQLiteRepository(db_file, Expense) as exp_repo:
+        totals_repo = DailyTotalRepository(db_file, exp_repo.connection)
+        exp_repo.add_many(random_expense(random.Random(2)) for _ in range(50))
+        budgets = [Budget(0, 'day'), Budget(0, 'week', category=1), Budget(0, '3d')]
+        BudgetEvaluator(budgets, now=now).evaluate(exp_repo)
+        from_expenses = [b.spent for b in budgets]
+        BudgetEvaluator(budgets, now=now).evaluate(exp_repo, totals_repo)
+        assert [b.spent for b in budgets] == from_expenses
+        engine = BudgetEngine(exp_repo, now)
+        assert BudgetEngine(exp_repo, now, totals_repo).totals == engine.totals
@@ -1,23 +1,24 @@
 import pytest
 import sqlite3
-from dataclasses import dataclass
-
-from bookkeeper.repository.sqlite_repository import SQLiteRepository
+from collections.abc import Iterator
+from dataclasses import dataclass, make_dataclass
+
+from bookkeeper.models.category import Category
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.filters import Eq, In, Lt, Gt, Ge, Between, Prefix, IsNull
+from bookkeeper.repository.sqlite_repository import SQLiteRepository, \
+    _positional_init, _trusted_init
 from bookkeeper.repository.factory import repository_factory
 
 
-DB_FILE = "database/test_sqlrepo.db"
-
-
 @pytest.fixture
-def create_bd():
-    with sqlite3.connect(DB_FILE) as con:
-        cur = con.cursor()
-        cur.execute("DROP TABLE custom")
-    with sqlite3.connect(DB_FILE) as con:
+def db_file(tmp_path):
+    db_file = str(tmp_path / "test_sqlrepo.db")
+    with sqlite3.connect(db_file) as con:
         cur = con.cursor()
         cur.execute("CREATE TABLE custom(f1, f2)")
     con.close()
+    return db_file
 
 
 @pytest.fixture
@@ -31,8 +32,10 @@ def custom_class():
 
 
 @pytest.fixture
-def repo(custom_class, create_bd):
-    return SQLiteRepository(db_file=DB_FILE, cls=custom_class)
+def repo(custom_class, db_file):
+    repo = SQLiteRepository(db_file=db_file, cls=custom_class)
+    yield repo
+    repo.close()
 
 
 def test_row2obj(repo):
@@ -127,7 +130,478 @@ def test_get_all_like(repo, custom_class):
     assert objects == repo.get_all_like({'f2': 'test'})
 
 
-def test_factory(custom_class, create_bd):
-    repo_gen = repository_factory(SQLiteRepository, db_file=DB_FILE)
+def test_factory(custom_class, db_file):
+    repo_gen = repository_factory(SQLiteRepository, db_file=db_file)
     rep = repo_gen(custom_class)
     test_crud(rep, custom_class)
+    repo_gen.close()
+
+
+def test_connection_is_persistent(repo, custom_class):
+    con = repo.connection
+    repo.add(custom_class(f1=1))
+    repo.get_all()
+    assert repo.connection is con
+    mode = con.execute('PRAGMA journal_mode').fetchone()[0]
+    assert mode.lower() == 'wal'
+    assert con.execute('PRAGMA foreign_keys').fetchone()[0] == 1
+
+
+def test_close(custom_class, db_file):
+    with SQLiteRepository(db_file=db_file, cls=custom_class) as rep:
+        rep.add(custom_class(f1=1))
+    with pytest.raises(sqlite3.ProgrammingError):
+        rep.get_all()
+
+
+def test_factory_shares_connection(custom_class, db_file):
+    with repository_factory(SQLiteRepository, db_file=db_file) as repo_gen:
+        rep1 = repo_gen(custom_class)
+        rep2 = repo_gen(custom_class)
+        assert rep1.connection is rep2.connection
+        pk = rep1.add(custom_class(f1=1))
+        assert rep2.get(pk) is not None
+        rep1.close()
+        assert rep2.get(pk) is not None
+    with pytest.raises(sqlite3.ProgrammingError):
+        rep2.get_all()
+
+
+def test_add_many(repo, custom_class):
+    objects = [custom_class(f1=i) for i in range(5)]
+    pks = repo.add_many(objects)
+    assert pks == [o.pk for o in objects]
+    assert len(set(pks)) == 5
+    assert objects == repo.get_all()
+    assert repo.add_many([]) == []
+
+
+def test_cannot_add_many_with_pk(repo, custom_class):
+    objects = [custom_class(f1=i) for i in range(3)]
+    objects[1].pk = 1
+    with pytest.raises(ValueError):
+        repo.add_many(objects)
+    assert repo.get_all() == []
+
+
+def test_get_many(repo, custom_class):
+    repo.max_variables = 2
+    objects = [custom_class(f1=i) for i in range(5)]
+    pks = repo.add_many(objects)
+    assert repo.get_many([pks[4], pks[0], pks[2], -1]) == \
+        [objects[4], objects[0], objects[2]]
+
+
+def test_delete_many(repo, custom_class):
+    repo.max_variables = 2
+    objects = [custom_class(f1=i) for i in range(5)]
+    pks = repo.add_many(objects)
+    repo.delete_many(pks[:3])
+    assert repo.get_all() == objects[3:]
+    with pytest.raises(ValueError):
+        repo.delete_many([pks[3], -1])
+    assert repo.get_all() == objects[3:]
+
+
+def test_get_between(repo, custom_class):
+    objects = [custom_class(f1=i, f2=f"2023-01-0{i}\t12:00") for i in [5, 1, 4, 2, 3]]
+    repo.add_many(objects)
+    between = repo.get_between('f2', '2023-01-02', '2023-01-05')
+    assert [o.f1 for o in between] == [2, 3, 4]
+    # запрос на чтение не создает индексы, не объявленные в модели
+    indexes = [r[1] for r in repo.connection.execute('PRAGMA index_list(custom)')]
+    assert 'custom_f2_idx' not in indexes
+    with pytest.raises(ValueError):
+        repo.get_between('unknown', 0, 1)
+
+
+def test_iter_all(repo, custom_class):
+    objects = [custom_class(f1=i, f2=str(i % 2)) for i in range(5)]
+    repo.add_many(objects)
+    gen = repo.iter_all(batch_size=2)
+    assert isinstance(gen, Iterator)
+    assert next(gen) == objects[0]
+    assert list(gen) == objects[1:]
+    assert list(repo.iter_all({'f2': '1'}, batch_size=1)) == [objects[1], objects[3]]
+
+
+def test_aggregate(repo, custom_class):
+    repo.add_many([custom_class(f1=i, f2=str(i % 2)) for i in range(6)])
+    assert repo.sum('f1') == 15
+    assert repo.count() == 6
+    assert repo.aggregate('min', 'f1') == 0
+    assert repo.aggregate('max', 'f1', where={'f2': '0'}) == 4
+    assert repo.aggregate('avg', 'f1') == 2.5
+    assert repo.sum('f1', group_by='f2') == {'0': 6, '1': 9}
+    assert repo.count(group_by='f2', between=('f1', 1, 4)) == {'1': 2, '0': 1}
+    assert repo.sum('f1', group_by='pk', between=('f1', 4, 6)) == {5: 4, 6: 5}
+    assert repo.sum('f1', where={'f2': '1'}, between=('f1', 1, 4)) == 4
+    assert repo.sum('f1', between=('f1', 10, 20)) == 0
+    assert repo.aggregate('max', 'f1', where={'f2': '2'}) is None
+    with pytest.raises(ValueError):
+        repo.aggregate('median', 'f1')
+    with pytest.raises(ValueError):
+        repo.sum('f1; DROP TABLE custom')
+    with pytest.raises(ValueError):
+        repo.sum('f1', group_by='unknown')
+
+
+def test_get_all_with_filters(repo, custom_class):
+    objects = [custom_class(f1=i, f2=f"name{i % 3}") for i in range(6)]
+    objects.append(custom_class(f1=None, f2="none"))
+    repo.add_many(objects)
+    assert repo.get_all(In('f1', [1, 4])) == [objects[1], objects[4]]
+    assert repo.get_all(Prefix('f2', 'name1') & Ge('f1', 2)) == [objects[4]]
+    assert repo.get_all(IsNull('f1')) == [objects[6]]
+    assert repo.get_all(Eq('pk', objects[2].pk)) == [objects[2]]
+    assert repo.get_all(Lt('f1', 3), order_by='-f1', limit=2) == [objects[2], objects[1]]
+    assert repo.get_all(order_by=['f2', '-pk'], limit=3) == \
+        [objects[3], objects[0], objects[4]]
+    assert list(repo.iter_all(Gt('f1', 3), batch_size=1, order_by='-pk')) == \
+        [objects[5], objects[4]]
+    with pytest.raises(ValueError):
+        repo.get_all(Eq('unknown', 1))
+    with pytest.raises(ValueError):
+        repo.iter_all({'unknown': 1})
+    with pytest.raises(ValueError):
+        repo.get_all(order_by='unknown')
+
+
+def test_where_is_equality(repo, custom_class):
+    objects = [custom_class(f1=1, f2="Test"), custom_class(f1=2, f2="test%")]
+    repo.add_many(objects)
+    assert repo.get_all({'f2': 'test'}) == []
+    assert repo.get_all({'f2': 'test%'}) == [objects[1]]
+
+
+def test_index_is_used(tmp_path):
+    with SQLiteRepository(db_file=str(tmp_path / "test.db"), cls=Expense) as rep:
+        for flt in [Eq('category', 1), In('category', [1, 2]),
+                    Between('expense_date', '2023-01-01', '2023-02-01'),
+                    Prefix('expense_date', '2023-01')]:
+            condition, params = flt.to_sql(rep._column)
+            plan = rep.connection.execute(
+                f'EXPLAIN QUERY PLAN SELECT * FROM expense WHERE {condition}', params
+            ).fetchall()
+            assert 'USING INDEX' in plan[0][-1]
+
+
+def test_factory_transaction(tmp_path):
+    db_file = str(tmp_path / "test.db")
+    with repository_factory(SQLiteRepository, db_file=db_file) as repo_gen:
+        cat_rep = repo_gen(Category)
+        exp_rep = repo_gen(Expense)
+        with repo_gen.transaction():
+            cat = Category('name')
+            cat_rep.add(cat)
+            exp_rep.add_many([Expense(1, cat.pk), Expense(2, cat.pk)])
+            with repo_gen.transaction():
+                exp_rep.delete_many([1])
+            assert repo_gen.connection.in_transaction
+        assert not repo_gen.connection.in_transaction
+        with pytest.raises(KeyError):
+            with repo_gen.transaction():
+                cat_rep.delete(cat.pk)
+                exp_rep.delete(2)
+                raise KeyError
+        assert cat_rep.get(cat.pk) == cat
+        assert [exp.amount for exp in exp_rep.get_all()] == [2]
+
+
+def test_batch_is_atomic_inside_factory_transaction(tmp_path):
+    db_file = str(tmp_path / "test.db")
+    with repository_factory(SQLiteRepository, db_file=db_file) as repo_gen:
+        exp_rep = repo_gen(Expense)
+        exp_rep.max_variables = 1
+        pks = exp_rep.add_many([Expense(i, 1) for i in range(3)])
+        with repo_gen.transaction():
+            exp_rep.delete(pks[0])
+            with pytest.raises(ValueError):
+                exp_rep.delete_many([pks[1], 100])
+        assert [exp.pk for exp in exp_rep.get_all()] == pks[1:]
+
+
+def test_factory_transaction_clears_cache(tmp_path):
+    db_file = str(tmp_path / "test.db")
+    with repository_factory(SQLiteRepository, db_file=db_file,
+                            cache_size=16) as repo_gen:
+        cat_rep = repo_gen(Category)
+        cat = Category('name')
+        cat_rep.add(cat)
+        with pytest.raises(KeyError):
+            with repo_gen.transaction():
+                cat.name = 'other'
+                cat_rep.update(cat)
+                assert cat_rep.get(cat.pk).name == 'other'
+                raise KeyError
+        assert cat_rep.get(cat.pk).name == 'name'
+
+
+def test_positional_init(custom_class):
+    class KeywordOnly:
+        def __init__(self, *, f1, f2='', pk=0):
+            self.f1, self.f2, self.pk = f1, f2, pk
+
+    assert _positional_init(custom_class, ['f1', 'f2', 'pk'])
+    assert not _positional_init(custom_class, ['f2', 'f1', 'pk'])
+    assert not _positional_init(custom_class, ['f1', 'f2', 'pk', 'f3'])
+    assert not _positional_init(KeywordOnly, ['f1', 'f2', 'pk'])
+
+
+def test_trusted_init(tmp_path):
+    @dataclass(slots=True)
+    class Checked:
+        f1: int
+        pk: int = 0
+
+        def __post_init__(self):
+            if self.f1 < 0:
+                raise ValueError('f1 < 0')
+
+    assert _trusted_init(Expense, ['amount']) is Expense
+    make = _trusted_init(Checked, ['f1', 'pk'])
+    obj = make(-1, 5)
+    assert type(obj) is Checked
+    assert (obj.f1, obj.pk) == (-1, 5)
+    with pytest.raises(ValueError):
+        Checked(-1)
+    with SQLiteRepository(db_file=str(tmp_path / 'trusted.db'), cls=Checked) as rep:
+        rep.connection.execute('INSERT INTO checked (f1) VALUES (-1)')
+        obj = rep.get(1)
+        assert type(obj) is Checked
+        assert (obj.f1, obj.pk) == (-1, 1)
+        assert not hasattr(obj, '__dict__')
+
+
+@pytest.mark.parametrize('slots', [True, False])
+def test_trusted_init_field_names(slots):
+    # имена полей совпадают с именами, которые могли бы использоваться
+    # внутри функции создания объекта
+    @dataclass(slots=slots)
+    class Names:
+        new: int
+        cls: str
+        obj: int
+        make: int = 0
+        pk: int = 0
+
+        def __post_init__(self):
+            raise ValueError
+
+    obj = _trusted_init(Names, ['new', 'cls', 'obj', 'make', 'pk'])(1, 'a', 2, 3, 4)
+    assert type(obj) is Names
+    assert (obj.new, obj.cls, obj.obj, obj.make, obj.pk) == (1, 'a', 2, 3, 4)
+    for name in ('_obj', '_new', '_cls', '_0'):
+        named = make_dataclass('Named', [(name, int), ('pk', int, 0)], slots=slots,
+                               namespace={'__post_init__': lambda self: None})
+        obj = _trusted_init(named, [name, 'pk'])(1, 2)
+        assert type(obj) is named
+        assert (getattr(obj, name), obj.pk) == (1, 2)
+
+
+def test_keyword_model(tmp_path):
+    class Reordered:
+        f1: int
+        f2: str
+        pk: int
+
+        def __init__(self, f2='', f1=0):
+            self.f1, self.f2, self.pk = f1, f2, 0
+
+    with SQLiteRepository(db_file=str(tmp_path / "test.db"), cls=Reordered) as rep:
+        obj = Reordered(f2='a', f1=1)
+        rep.add(obj)
+        obj.f2 = 'b'
+        rep.update(obj)
+        (got,) = rep.get_all()
+        assert (got.f1, got.f2, got.pk) == (1, 'b', obj.pk)
+        assert rep.get(obj.pk).f2 == 'b'
+
+
+@pytest.mark.parametrize('where', [None, {'f2': 'even'}])
+@pytest.mark.parametrize('descending', [True, False])
+def test_get_page(repo, custom_class, where, descending):
+    objects = [custom_class(f1=i % 4, f2='even' if i % 2 == 0 else 'odd')
+               for i in range(11)]
+    objects.append(custom_class(f1=None))
+    repo.add_many(objects)
+    expected = sorted((o for o in objects if o.f1 is not None
+                       and (where is None or o.f2 == where['f2'])),
+                      key=lambda o: (o.f1, o.pk), reverse=descending)
+    pages = []
+    cursor = None
+    while True:
+        page, cursor = repo.get_page('f1', 3, cursor, where, descending)
+        pages.append(page)
+        if cursor is None:
+            break
+        assert cursor == (page[-1].f1, page[-1].pk)
+    assert [o for page in pages for o in page] == expected
+    assert all(len(page) == 3 for page in pages[:-1]) and pages[-1]
+
+
+def test_get_page_uses_index(tmp_path):
+    with SQLiteRepository(db_file=str(tmp_path / "test.db"), cls=Expense) as rep:
+        rep.add_many([Expense(i, 1, expense_date=f'2023-01-{i % 28 + 1:02}')
+                      for i in range(100)])
+        page, cursor = rep.get_page('expense_date', 10)
+        assert [e.expense_date[-2:] for e in page] == ['28'] * 3 + ['27'] * 3 \
+            + ['26'] * 3 + ['25']
+        plan = rep.connection.execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM expense WHERE expense_date IS NOT NULL '
+            'AND (expense_date, ROWID) < (?, ?) ORDER BY expense_date DESC, ROWID DESC',
+            cursor).fetchall()
+        assert 'USING INDEX' in plan[0][-1]
+        assert all('TEMP B-TREE' not in row[-1] for row in plan)
+
+
+def test_hierarchy_queries(tmp_path):
+    with SQLiteRepository(db_file=str(tmp_path / 'tree.db'), cls=Category) as repo:
+        # 1 -> 2 -> 3 -> 4, 2 -> 5, 6
+        pks = [repo.add(Category(str(i))) for i in range(1, 7)]
+        for child, parent in [(2, 1), (3, 2), (4, 3), (5, 2)]:
+            repo.update(Category(str(child), parent, pk=pks[child - 1]))
+        names = lambda cats: [c.name for c in cats]  # noqa: E731
+        assert names(repo.get_descendants(pks[0])) == ['2', '3', '4', '5']
+        assert names(repo.get_descendants(pks[2])) == ['4']
+        assert repo.get_descendants(pks[5]) == []
+        assert names(repo.get_ancestors(pks[3])) == ['3', '2', '1']
+        assert repo.get_ancestors(pks[0]) == []
+        assert repo.get_ancestors(100) == []
+        # цикл ссылок не зацикливает запросы
+        repo.update(Category('1', pks[3], pk=pks[0]))
+        assert names(repo.get_descendants(pks[0])) == ['2', '3', '4', '5']
+        assert names(repo.get_ancestors(pks[3])) == ['3', '2', '1']
+        with pytest.raises(ValueError):
+            repo.get_descendants(pks[0], parent_field='unknown')
+
+
+def test_update_and_delete_where(tmp_path):
+    with SQLiteRepository(db_file=str(tmp_path / 'bulk.db'), cls=Expense) as repo:
+        repo.add_many([Expense(i, i % 3) for i in range(9)])
+        assert repo.update_where({'category': 1}, {'category': None, 'comment': 'x'}) == 3
+        assert repo.count(IsNull('category')) == 3
+        assert {e.comment for e in repo.get_all(IsNull('category'))} == {'x'}
+        assert repo.update_where(Eq('category', 1), {'comment': 'y'}) == 0
+        assert repo.update_where(Gt('amount', 6), {}) == 0
+        assert repo.delete_where(In('category', [0, 2])) == 6
+        assert sorted(e.amount for e in repo.get_all()) == [1, 4, 7]
+        with pytest.raises(ValueError):
+            repo.update_where(None, {'pk': 1})
+        with pytest.raises(ValueError):
+            repo.update_where(None, {'unknown': 1})
+        assert repo.delete_where(None) == 3
+        assert repo.get_all() == []
+
+
+def test_category_parent_foreign_key(tmp_path):
+    with SQLiteRepository(db_file=str(tmp_path / 'fk.db'), cls=Category) as repo:
+        root = Category('root')
+        repo.add(root)
+        child = Category('child', root.pk)
+        repo.add(child)
+        with pytest.raises(sqlite3.IntegrityError):
+            repo.add(Category('orphan', 100))
+        repo.delete(root.pk)
+        assert repo.get(child.pk).parent is None
+
+
+def test_update_writes_only_changed_columns(tmp_path):
+    with SQLiteRepository(db_file=str(tmp_path / 'dirty.db'), cls=Expense) as repo:
+        repo.track_changes = True
+        statements = []
+        repo.connection.set_trace_callback(statements.append)
+        exp = Expense(100, 1, comment='a')
+        repo.add(exp)
+        statements.clear()
+        # без изменений только проверяется наличие записи
+        repo.update(exp)
+        assert statements == ['SELECT 1 FROM expense WHERE ROWID == 1']
+        statements.clear()
+        exp.amount = 200
+        repo.update(exp)
+        assert statements == ['UPDATE expense SET amount=200 WHERE ROWID == 1']
+        statements.clear()
+        loaded = repo.get_all()[0]
+        loaded.comment = 'b'
+        repo.update(loaded)
+        assert [s for s in statements if s.startswith('UPDATE')] == \
+            ["UPDATE expense SET comment='b' WHERE ROWID == 1"]
+        assert repo.get(exp.pk) == Expense(200, 1, exp.expense_date, exp.added_date,
+                                           'b', pk=exp.pk)
+        # значения неизвестного репозиторию объекта записываются целиком
+        repo.clear_snapshots()
+        statements.clear()
+        repo.update(loaded)
+        assert len(statements) == 1 and 'amount=' in statements[0]
+        repo.delete(exp.pk)
+        with pytest.raises(ValueError):
+            repo.update(loaded)
+
+
+def test_snapshots_follow_rollback_and_cascades(tmp_path):
+    with repository_factory(SQLiteRepository,
+                            db_file=str(tmp_path / 'dirty.db')) as repo_gen:
+        repo = repo_gen(Category)
+        repo.track_changes = True
+        root, child = Category('root'), Category('child')
+        repo.add(root)
+        repo.add(child)
+        child.parent = root.pk
+        with pytest.raises(RuntimeError):
+            with repo_gen.transaction():
+                repo.update(child)
+                raise RuntimeError
+        assert repo.get(child.pk).parent is None
+        repo.update(child)
+        assert repo.get(child.pk).parent == root.pk
+        # каскад внешнего ключа обнуляет ссылку в базе данных: прежнее
+        # значение записывается заново (и нарушает ограничение), а не пропускается
+        repo.delete(root.pk)
+        with pytest.raises(sqlite3.IntegrityError):
+            repo.update(child)
+
+
+def test_update_is_not_lost_after_external_changes(tmp_path):
+    db_file = str(tmp_path / 'dirty.db')
+    for track_changes in (False, True):
+        with SQLiteRepository(db_file, Expense) as repo, \
+                SQLiteRepository(db_file, Expense) as other:
+            repo.track_changes = track_changes
+            exp = Expense(100, 1, comment='a')
+            repo.add(exp)
+            changed = other.get(exp.pk)
+            changed.amount = 300
+            other.update(changed)
+            repo.update(exp)
+            # неизмененный объект с отслеживанием изменений не записывается
+            assert other.get(exp.pk).amount == (300 if track_changes else 100)
+            other.delete(exp.pk)
+            with pytest.raises(ValueError):
+                repo.update(exp)
+    assert not SQLiteRepository.track_changes
+
+
+def test_factory_track_changes(tmp_path):
+    for track_changes in (False, True):
+        with repository_factory(SQLiteRepository, db_file=str(tmp_path / 'track.db'),
+                                track_changes=track_changes) as repo_gen:
+            assert repo_gen(Expense).track_changes is track_changes
+
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_get_page_skips_null_values(tmp_path, descending):
+    with SQLiteRepository(db_file=str(tmp_path / 'null.db'), cls=Expense) as repo:
+        dated = [Expense(i, 1, expense_date=f'2023-01-0{i}') for i in range(1, 6)]
+        undated = [Expense(i, 1, expense_date=None) for i in range(3)]
+        repo.add_many(dated[:2] + undated + dated[2:])
+        found = []
+        cursor = None
+        while True:
+            page, cursor = repo.get_page('expense_date', 2, cursor,
+                                         descending=descending)
+            found += page
+            if cursor is None:
+                break
+        assert found == (dated[::-1] if descending else dated)
+        assert repo.count(IsNull('expense_date')) == len(undated)
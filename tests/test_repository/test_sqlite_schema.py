@@ -0,0 +1,90 @@
+import sqlite3
+
+import pytest
+
+from bookkeeper.models.budget import Budget
+from bookkeeper.models.category import Category
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+from bookkeeper.repository.sqlite_schema import column_type, create_table_sql, \
+    create_schema
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    return str(tmp_path / "schema.db")
+
+
+def test_column_type():
+    assert column_type(int) == 'INTEGER'
+    assert column_type(bool) == 'INTEGER'
+    assert column_type(float) == 'REAL'
+    assert column_type(str) == 'TEXT'
+    assert column_type(int | None) == 'INTEGER'
+    assert column_type(int | str) == ''
+    assert column_type(list[int]) == ''
+
+
+def test_create_table_sql():
+    sql = create_table_sql('custom', {'f1': int, 'f2': str | None})
+    assert sql == ('CREATE TABLE IF NOT EXISTS custom '
+                   '(pk INTEGER PRIMARY KEY, f1 INTEGER, f2 TEXT)')
+    sql = create_table_sql('custom', {'f1': int | None}, foreign_keys={'f1': 'other'})
+    assert sql == ('CREATE TABLE IF NOT EXISTS custom (pk INTEGER PRIMARY KEY, '
+                   'f1 INTEGER REFERENCES other(pk) ON DELETE SET NULL)')
+
+
+def test_create_schema_unknown_index_field(db_file):
+    with sqlite3.connect(db_file) as con:
+        with pytest.raises(ValueError):
+            create_schema(con, 'custom', {'f1': int}, indexes=['f2'])
+        with pytest.raises(ValueError):
+            create_schema(con, 'custom', {'f1': int}, foreign_keys={'f2': 'other'})
+    con.close()
+
+
+def test_repository_creates_schema(db_file):
+    with SQLiteRepository(db_file=db_file, cls=Expense) as repo:
+        con = repo.connection
+        columns = {r[1]: (r[2], r[5]) for r in con.execute('PRAGMA table_info(expense)')}
+        assert columns == {
+            'pk': ('INTEGER', 1),
+            'amount': ('INTEGER', 0),
+            'category': ('INTEGER', 0),
+            'expense_date': ('TEXT', 0),
+            'added_date': ('TEXT', 0),
+            'comment': ('TEXT', 0),
+        }
+        indexes = {r[1] for r in con.execute('PRAGMA index_list(expense)')}
+        assert indexes == {'expense_expense_date_idx', 'expense_category_idx'}
+        exp = Expense(100, 1, comment='test')
+        pk = repo.add(exp)
+        assert repo.get(pk) == exp
+        assert repo.get_all() == [exp]
+    # повторное создание репозитория не меняет существующую схему
+    with SQLiteRepository(db_file=db_file, cls=Expense) as repo:
+        assert repo.get_all() == [exp]
+
+
+def test_category_indexes(db_file):
+    with SQLiteRepository(db_file=db_file, cls=Category) as repo:
+        indexes = {r[1] for r in repo.connection.execute('PRAGMA index_list(category)')}
+        assert indexes == {'category_name_idx', 'category_parent_idx'}
+        plan = repo.connection.execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM category WHERE name = ?', ('x',)
+        ).fetchall()
+        assert 'category_name_idx' in plan[0][-1]
+
+
+def test_missing_columns_are_added(db_file):
+    con = sqlite3.connect(db_file)
+    con.execute('CREATE TABLE budget (pk INTEGER PRIMARY KEY, limitation INTEGER, '
+                'period TEXT, spent INTEGER)')
+    con.execute("INSERT INTO budget (limitation, period, spent) VALUES (100, 'day', 5)")
+    con.commit()
+    con.close()
+    with SQLiteRepository(db_file=db_file, cls=Budget) as repo:
+        info = repo.connection.execute('PRAGMA table_info(budget)')
+        columns = {r[1]: r[2] for r in info}
+        assert columns['category'] == 'INTEGER'
+        assert repo.get_all() == [Budget(100, 'day', 5, pk=1)]
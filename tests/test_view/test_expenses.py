@@ -0,0 +1,216 @@
+from pytestqt.qt_compat import qt_api
+import pytest
+
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.view.expenses import ExpensesTableModel, ExpensesTableGroup
+
+PAGE_SIZE = 10
+
+
+@pytest.fixture
+def app(qapp):
+    return qapp
+
+
+@pytest.fixture
+def repo():
+    repo = MemoryRepository()
+    repo.add_many(Expense(i, i % 3, expense_date=f'2023-01-{i % 28 + 1:02}',
+                          comment=f'comment {i}')
+                  for i in range(1, 96))
+    return repo
+
+
+@pytest.fixture
+def pager(repo):
+    def pager(after):
+        pager.calls += 1
+        cursor = None if after is None else (after.expense_date, after.pk)
+        return repo.get_page('expense_date', PAGE_SIZE, cursor)[0]
+    pager.calls = 0
+    return pager
+
+
+@pytest.fixture
+def model(app, pager):
+    modified = []
+    model = ExpensesTableModel(lambda pk: f'cat{pk}',
+                               lambda *args: modified.append(args),
+                               max_pages=3)
+    model.modified = modified
+    model.set_pager(pager)
+    model.set_expenses(pager(None))
+    return model
+
+
+def all_expenses(repo):
+    return repo.get_page('expense_date', 1000)[0]
+
+
+def test_fetch_more(model, repo):
+    assert model.rowCount() == PAGE_SIZE
+    assert model.columnCount() == 4
+    while model.canFetchMore():
+        model.fetchMore()
+    assert model.rowCount() == 95
+    assert [model.expense(i) for i in range(95)] == all_expenses(repo)
+    assert model.expense(95) is None
+
+
+def test_memory_is_bounded(model, pager, repo):
+    while model.canFetchMore():
+        model.fetchMore()
+    assert len(model._pages) == 3
+    calls = pager.calls
+    expected = all_expenses(repo)
+    assert model.expense(0) == expected[0]
+    assert pager.calls == calls + 1
+    assert model.expense(5) == expected[5]
+    assert pager.calls == calls + 1
+    assert model.expense(42) == expected[42]
+    assert len(model._pages) == 3
+
+
+def test_data(model, repo):
+    exp = all_expenses(repo)[0]
+    index = model.index(0, 0)
+    assert model.data(index) == exp.expense_date
+    assert model.data(model.index(0, 1)) == str(exp.amount)
+    category = model.data(model.index(0, 2))
+    assert category == ('' if exp.category == 0 else f'Cat{exp.category}')
+    assert model.data(model.index(0, 3)) == exp.comment.capitalize()
+    assert model.headerData(0, qt_api.QtCore.Qt.Horizontal) == 'Дата'
+    assert model.setData(model.index(0, 1), '100')
+    assert model.modified == [(exp.pk, 'amount', '100')]
+
+
+def test_prefetch(model, app):
+    model.data(model.index(0, 0))
+    app.processEvents()
+    assert model.rowCount() == 2 * PAGE_SIZE
+    model.data(model.index(2, 0))
+    app.processEvents()
+    assert model.rowCount() == 2 * PAGE_SIZE
+
+
+def test_reset(model):
+    model.fetchMore()
+    model.set_expenses([])
+    assert model.rowCount() == 0
+    assert not model.canFetchMore()
+
+
+def test_group_delete(app, pager, repo):
+    deleted = []
+    group = ExpensesTableGroup(str, lambda *args: None, deleted.append)
+    group.set_pager(pager)
+    group.set_expenses(pager(None))
+    group.table.selectRow(1)
+    group.delete_expenses()
+    assert deleted == [{all_expenses(repo)[1].pk}]
+
+
+def loaded(model):
+    return [model.expense(i) for i in range(model.rowCount())]
+
+
+def test_insert_expense(model, repo):
+    model.fetchMore()
+    model.fetchMore()
+    rows = model.rowCount()
+    exp = Expense(7, 1, expense_date='2023-01-20', comment='new')
+    repo.add(exp)
+    model.insert_expense(exp)
+    assert model.rowCount() == rows + 1
+    assert loaded(model) == all_expenses(repo)[:rows + 1]
+    old = Expense(7, 1, expense_date='2000-01-01')
+    repo.add(old)
+    model.insert_expense(old)
+    assert model.rowCount() == rows + 1
+    while model.canFetchMore():
+        model.fetchMore()
+    assert loaded(model) == all_expenses(repo)
+
+
+def test_insert_into_empty(app):
+    model = ExpensesTableModel(str, lambda *args: None)
+    exp = Expense(7, 1, expense_date='2023-01-20', pk=1)
+    model.insert_expense(exp)
+    assert loaded(model) == [exp]
+
+
+def test_remove_expense(model, repo):
+    model.fetchMore()
+    model.fetchMore()
+    rows = model.rowCount()
+    removed = all_expenses(repo)[3:rows:PAGE_SIZE - 1]
+    for exp in removed:
+        repo.delete(exp.pk)
+        model.remove_expense(exp)
+    rows -= len(removed)
+    assert model.rowCount() == rows
+    # страницы, вытесненные из памяти, загружаются заново с новым размером
+    model.set_pager(lambda after: repo.get_page(
+        'expense_date', PAGE_SIZE,
+        None if after is None else (after.expense_date, after.pk))[0])
+    model._pages.clear()
+    assert loaded(model) == all_expenses(repo)[:rows]
+
+
+def test_change_expense(model, repo):
+    model.fetchMore()
+    old = all_expenses(repo)[4]
+    new = Expense(old.amount, old.category, expense_date=old.expense_date,
+                  comment='changed', pk=old.pk)
+    repo.update(new)
+    model.change_expense(old, new)
+    assert model.expense(4) is new
+    assert model.data(model.index(4, 3)) == 'Changed'
+    moved = Expense(old.amount, old.category, expense_date='2023-01-02',
+                    comment='moved', pk=old.pk)
+    repo.update(moved)
+    model.change_expense(new, moved)
+    assert loaded(model) == all_expenses(repo)[:model.rowCount()]
+
+
+@pytest.mark.parametrize('change', ['insert', 'remove', 'change'])
+def test_change_evicted_page(model, repo, change):
+    while model.canFetchMore():
+        model.fetchMore()
+    assert 0 not in model._pages
+    rows = model.rowCount()
+    target = all_expenses(repo)[3]
+    if change == 'insert':
+        exp = Expense(7, 1, expense_date=target.expense_date, comment='new')
+        repo.add(exp)
+        model.insert_expense(exp)
+    elif change == 'remove':
+        repo.delete(target.pk)
+        model.remove_expense(target)
+    else:
+        new = Expense(target.amount, target.category, expense_date=target.expense_date,
+                      comment='changed', pk=target.pk)
+        repo.update(new)
+        model.change_expense(target, new)
+    assert 0 not in model._pages
+    assert model.rowCount() == rows + {'insert': 1, 'remove': -1, 'change': 0}[change]
+    assert loaded(model) == all_expenses(repo)
+
+
+def test_changes_after_scrolling_past_max_pages(model, repo):
+    for _ in range(5):
+        model.fetchMore()
+    for row in range(model.rowCount()):
+        model.data(model.index(row, 0))
+    assert len(model._pages) == model.max_pages
+    exp = Expense(7, 1, expense_date=all_expenses(repo)[2].expense_date)
+    repo.add(exp)
+    model.insert_expense(exp)
+    removed = model.expense(model.rowCount() - 5)
+    repo.delete(removed.pk)
+    model.remove_expense(removed)
+    pks = [model.expense(row).pk for row in range(model.rowCount())]
+    assert len(set(pks)) == len(pks)
+    page, _ = repo.get_page('expense_date', model.rowCount())
+    assert pks == [e.pk for e in page]